@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark CPU time của pipeline /signal (market state + strategies + builder)
+khi mỗi thành phần tự tính indicator so với dùng chung IndicatorContext.
+
+Chạy: python benchmarks/bench_indicator_context.py [--bars 1000] [--repeat 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.market_state import MarketStateService
+from src.services.strategy_engine import StrategyEngine
+from src.services.trade.trade_signal_builder import TradeSignalBuilder
+from src.strategies.indicators import IndicatorContext
+from src.strategies.registry import STRATEGY_REGISTRY
+
+STRATEGIES = ["smc", "order_block", "wyckoff"]
+
+
+def synthetic_candles(bars=1000, seed=42):
+    """
+    Nến 1 phút giả lập (random walk, bước giá 0.05), index theo time
+    (pandas_ta.vwap của smc cần DatetimeIndex để neo theo ngày)
+    """
+    rng = np.random.default_rng(seed)
+    time_index = pd.date_range("2025-12-15 09:15", periods=bars, freq="1min", tz="Asia/Ho_Chi_Minh")
+    close = 25 + np.cumsum(rng.choice([-0.1, -0.05, 0, 0.05, 0.1], size=bars))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = rng.choice([0, 0.05, 0.1], size=(2, bars))
+    return pd.DataFrame({
+        "time": time_index,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread[0],
+        "low": np.minimum(open_, close) - spread[1],
+        "close": close,
+        "volume": rng.integers(1, 200, size=bars) * 100,
+    }, index=time_index.rename(None))
+
+
+def run_isolated(df, market_state, builder):
+    """Mỗi thành phần 1 context riêng → indicator bị tính lại như trước"""
+    market_state.analyze(df, IndicatorContext(df))
+    results = {}
+    for name in STRATEGIES:
+        results[name] = STRATEGY_REGISTRY[name]().apply(df, {}, IndicatorContext(df))
+    builder.build(df, results, ctx=IndicatorContext(df))
+
+
+def run_shared(df, engine, builder):
+    """1 context cho cả lần chạy (như TradeService.generate_signal)"""
+    ctx = IndicatorContext(df)
+    results = engine.run(df, STRATEGIES, ctx=ctx)
+    builder.build(df, results.get("signals", {}), ctx=ctx)
+    return ctx
+
+
+def measure(func, repeat):
+    func()  # warm-up
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    df = synthetic_candles(args.bars)
+    market_state = MarketStateService()
+    engine = StrategyEngine()
+    builder = TradeSignalBuilder()
+
+    isolated_ms = measure(lambda: run_isolated(df, market_state, builder), args.repeat)
+    shared_ms = measure(lambda: run_shared(df, engine, builder), args.repeat)
+    stats = run_shared(df, engine, builder).stats()
+
+    print(f"Bars: {args.bars} | Repeat: {args.repeat}")
+    print(f"Isolated indicators : {isolated_ms:8.2f} ms CPU / run")
+    print(f"Shared context      : {shared_ms:8.2f} ms CPU / run")
+    print(f"CPU time giảm       : {(1 - shared_ms / isolated_ms) * 100:8.1f} %")
+    print(f"Context             : {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Benchmark offline pipeline /signal trên dữ liệu giả lập (seed cố định)
+
+Đo: build OHLC từ tick, normalize time, apply từng strategy, StrategyEngine.run,
+TradeSignalBuilder.build và generate_signal end-to-end với provider giả lập
+(không gọi vnstock / XNO). Kết quả ghi JSON để so sánh giữa các commit.
+
+Chạy:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json --threshold 0.15
+    python benchmarks/run_benchmarks.py --filter strategy --repeat 50
+
+Exit code 1 khi có case lỗi hoặc (với --compare) chậm hơn baseline quá threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.providers.fake_provider import FakeMarket, FakeVnStockProvider, FaultInjector
+from src.providers.upstream_gateway import UpstreamGateway
+from src.providers.vnstock_provider import TICK_CACHE, VnStockProvider
+from src.services.backtest.backtester import VectorizedBacktester
+from src.services.stock_service import StockService
+from src.services.strategy_engine import StrategyEngine
+from src.services.trade.trade_service import TradeService
+from src.services.trade.trade_signal_builder import TradeSignalBuilder
+from src.strategies.indicators import IndicatorContext
+from src.strategies.registry import STRATEGY_REGISTRY
+from src.utils.df_utils import normalize_df_time
+from src.utils.synthetic_market import synthetic_candles, synthetic_ticks
+
+STRATEGIES = list(STRATEGY_REGISTRY)
+SYMBOL = "BENCH"
+
+
+# ==================================================
+# HARNESS
+# ==================================================
+def measure(func, repeat, warmup=2, setup=None):
+    """Thời gian (giây) từng lần chạy func(); setup() chạy trước mỗi lần, không tính giờ"""
+    for _ in range(warmup):
+        func(setup() if setup else None)
+
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    return {
+        "repeat": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "median_ms": round(median * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "stdev_ms": round(statistics.stdev(ordered) * 1000, 4) if len(ordered) > 1 else 0.0,
+        "ops_per_sec": round(1 / median, 2) if median else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+# ==================================================
+# CASES
+# ==================================================
+def build_cases(args):
+    """{tên: (func(arg), setup hoặc None, params)}"""
+    ticks = synthetic_ticks(args.ticks, seed=args.seed)
+    raw = synthetic_candles(args.bars, seed=args.seed)
+    naive = raw.assign(time=raw["time"].dt.tz_localize(None))
+    # Index theo time như VectorizedBacktester (pandas_ta.vwap của smc cần DatetimeIndex)
+    candles = VectorizedBacktester.prepare(raw)
+    provider = VnStockProvider.__new__(VnStockProvider)
+    engine = StrategyEngine()
+    builder = TradeSignalBuilder()
+    results = engine.run(candles, STRATEGIES, ctx=IndicatorContext(candles)).get("signals", {})
+
+    cases = {
+        "build_ohlc_from_ticks": (
+            lambda df: provider._build_ohlc_from_ticks(df, "1T"),
+            lambda: ticks[["time", "price", "volume"]].copy(),
+            {"ticks": len(ticks), "interval": "1T"},
+        ),
+        "normalize_df_time": (
+            normalize_df_time,
+            naive.copy,
+            {"bars": len(naive)},
+        ),
+    }
+    for name in STRATEGIES:
+        strategy = STRATEGY_REGISTRY[name]()
+        cases[f"strategy.{name}.apply"] = (
+            lambda ctx, s=strategy: s.apply(candles, {}, ctx),
+            lambda: IndicatorContext(candles),
+            {"bars": len(candles)},
+        )
+    cases["strategy_engine.run"] = (
+        lambda ctx: engine.run(candles, STRATEGIES, ctx=ctx),
+        lambda: IndicatorContext(candles),
+        {"bars": len(candles), "strategies": STRATEGIES},
+    )
+    cases["trade_signal_builder.build"] = (
+        lambda ctx: builder.build(candles, results, ctx=ctx),
+        lambda: IndicatorContext(candles),
+        {"bars": len(candles), "strategies": list(results)},
+    )
+
+    # End-to-end: tick cache bị xoá mỗi lần → fetch (giả lập) + build nến + strategy + builder + payload
+    market = FakeMarket(day="2025-12-15", ticks=args.ticks, seed=args.seed, data_dir="")
+    fake = FakeVnStockProvider(market, FaultInjector(latency=0, jitter=0, error_rate=0), source="BENCH")
+    fake.gateway = UpstreamGateway("bench", rate=0, burst=1)
+    service = TradeService(stock_service=StockService(provider=fake, xno=object(), engine=engine))
+    cases["trade_service.generate_signal"] = (
+        lambda _: service.generate_signal(SYMBOL, STRATEGIES, minutes=120),
+        lambda: TICK_CACHE.invalidate((SYMBOL, fake.source)),
+        {"ticks": len(market.ticks(SYMBOL)), "minutes": 120, "strategies": STRATEGIES},
+    )
+    return cases
+
+
+def run(args):
+    results = {}
+    for name, (func, setup, params) in build_cases(args).items():
+        if args.filter and not any(f in name for f in args.filter):
+            continue
+        try:
+            stats = summarize(measure(func, args.repeat, args.warmup, setup))
+        except Exception as e:
+            # Case lỗi (vd thiếu dependency) không chặn các case còn lại
+            results[name] = {"error": f"{type(e).__name__}: {e}", "params": params}
+            print(f"{name:<36} error {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        results[name] = {**stats, "params": params}
+        print(f"{name:<36} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """In bảng median hiện tại / baseline; trả list case chậm hơn threshold hoặc lỗi mà baseline chạy được"""
+    regressions = []
+    print(f"\n{'case':<36} {'baseline':>12} {'current':>12} {'ratio':>8}", file=sys.stderr)
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if "error" in stats:
+            if base and "median_ms" in base:
+                regressions.append(name)
+                print(f"{name:<36} {base['median_ms']:>10.3f}ms {'error':>12}  ← regression", file=sys.stderr)
+            continue
+        if not base or "median_ms" not in base or "median_ms" not in stats:
+            continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        flag = "  ← regression" if ratio > 1 + threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<36} {base['median_ms']:>10.3f}ms {stats['median_ms']:>10.3f}ms {ratio:>7.2f}x{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=10000, help="Số tick giả lập (1 ngày)")
+    parser.add_argument("--bars", type=int, default=1000, help="Số nến cho strategy / builder")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--filter", action="append", help="Chỉ chạy case chứa chuỗi này (lặp lại được)")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file (mặc định in ra stdout)")
+    parser.add_argument("--compare", help="File JSON baseline để so sánh median")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Chậm hơn baseline quá tỷ lệ này = regression")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    failed = False
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+        if regressions:
+            print(f"\nRegression: {', '.join(regressions)}", file=sys.stderr)
+            failed = True
+
+    # Case lỗi không được coi là pass (vd strategy không chạy được → không đo được gì)
+    errors = [name for name, stats in report["results"].items() if "error" in stats]
+    if errors:
+        print(f"\nError: {', '.join(errors)}", file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
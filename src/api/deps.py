@@ -1,5 +1,9 @@
+import threading
+
 from fastapi import HTTPException
 
+from src.config import Config
+
 def handle_service_error(data):
     if isinstance(data, dict) and "error" in data:
         raise HTTPException(
@@ -7,3 +11,178 @@ def handle_service_error(data):
             detail=data["error"]
         )
     return data
+
+
+# ==================================================
+# CONTAINER
+# ==================================================
+class Container:
+    """
+    Provider / service dùng chung trong process
+
+    - Mỗi object build lazy đúng 1 lần (Vnstock client, XNO client(apikey=...),
+      StrategyEngine, ...) rồi inject vào service cần nó
+    - Route lấy object qua Depends(get_...); test thay bằng fake qua
+      container.override(name, fake) hoặc app.dependency_overrides
+    - startup / shutdown gắn vào lifecycle của FastAPI
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, factory):
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    def override(self, name, value):
+        with self._lock:
+            self._instances[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._instances.clear()
+
+    # ==================================================
+    # PROVIDERS
+    # ==================================================
+    def provider(self):
+        if Config.FAKE_PROVIDER or Config.REPLAY_ENABLED:
+            from src.providers.fake_provider import FakeVnStockProvider
+            return self._get("provider", lambda: FakeVnStockProvider(self.fake_market(), source=self._fake_source()))
+        from src.providers.vnstock_provider import VnStockProvider
+        return self._get("provider", VnStockProvider)
+
+    def xno(self):
+        if Config.FAKE_PROVIDER or Config.REPLAY_ENABLED:
+            from src.providers.fake_provider import FakeXnoAPIProvider
+            return self._get("xno", lambda: FakeXnoAPIProvider(self.fake_market()))
+        from src.providers.xnoapi_provider import XnoAPIProvider
+        return self._get("xno", XnoAPIProvider)
+
+    def fake_market(self):
+        # 2 provider giả lập dùng chung dữ liệu → price depth khớp với tick;
+        # replay: dữ liệu đọc từ thư mục capture
+        if Config.REPLAY_ENABLED:
+            from src.providers.capture import ReplayMarket
+            return self._get("fake_market", ReplayMarket)
+        from src.providers.fake_provider import FakeMarket
+        return self._get("fake_market", FakeMarket)
+
+    @staticmethod
+    def _fake_source():
+        return "REPLAY" if Config.REPLAY_ENABLED else "FAKE"
+
+    # ==================================================
+    # SERVICES
+    # ==================================================
+    def engine(self):
+        from src.services.strategy_engine import StrategyEngine
+        return self._get("engine", StrategyEngine)
+
+    def stock_service(self):
+        from src.services.stock_service import StockService
+        return self._get(
+            "stock_service",
+            lambda: StockService(provider=self.provider(), xno=self.xno(), engine=self.engine())
+        )
+
+    def async_stock_service(self):
+        from src.services.async_stock_service import AsyncStockService
+        return self._get("async_stock_service", lambda: AsyncStockService(self.stock_service()))
+
+    def trade_service(self):
+        from src.services.trade.trade_service import TradeService
+        return self._get(
+            "trade_service",
+            lambda: TradeService(stock_service=self.stock_service(), engine=self.engine())
+        )
+
+    def async_trade_service(self):
+        from src.services.trade.async_trade_service import AsyncTradeService
+        return self._get("async_trade_service", lambda: AsyncTradeService(self.trade_service()))
+
+    def dca_service(self):
+        from src.services.calculator.dca_service import DCAService
+        return self._get("dca_service", lambda: DCAService(self.xno()))
+
+    def backtest_service(self):
+        from src.services.backtest.backtest_service import BacktestService
+        return self._get("backtest_service", lambda: BacktestService(self.provider()))
+
+    def stream_hub(self):
+        from src.services.stream_service import StreamHub
+        return self._get("stream_hub", lambda: StreamHub(self.provider()))
+
+    def poller(self):
+        # Provider gắn lúc startup → GET /poller không cần khởi tạo client
+        from src.services.market_poller import MarketDataPoller
+        return self._get("poller", MarketDataPoller)
+
+    # ==================================================
+    # LIFECYCLE
+    # ==================================================
+    def startup(self):
+        if Config.POLLER_ENABLED:
+            poller = self.poller()
+            # Poller ghi cache bằng chính provider của container
+            poller.provider = poller.provider or self.provider()
+            poller.xno = poller.xno or self.xno()
+            poller.start()
+
+    def shutdown(self):
+        with self._lock:
+            instances = dict(self._instances)
+        if "poller" in instances:
+            instances["poller"].shutdown()
+        if "trade_service" in instances:
+            instances["trade_service"].shutdown()
+
+        # Ghi nốt response upstream còn trong queue capture
+        from src.providers.capture import CAPTURE
+        if CAPTURE is not None:
+            CAPTURE.close()
+
+
+container = Container()
+
+
+# ==================================================
+# FASTAPI DEPENDENCIES
+# ==================================================
+def get_stock_service():
+    return container.stock_service()
+
+
+def get_async_stock_service():
+    return container.async_stock_service()
+
+
+def get_trade_service():
+    return container.trade_service()
+
+
+def get_async_trade_service():
+    return container.async_trade_service()
+
+
+def get_dca_service():
+    return container.dca_service()
+
+
+def get_backtest_service():
+    return container.backtest_service()
+
+
+def get_stream_hub():
+    return container.stream_hub()
+
+
+def get_poller():
+    return container.poller()
+
+
+def get_provider():
+    return container.provider()
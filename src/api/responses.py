@@ -0,0 +1,16 @@
+from fastapi.responses import JSONResponse
+
+from src.utils.metrics import stage
+from src.utils.serialization import json_dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response không qua jsonable_encoder của FastAPI
+    Dùng orjson nếu có (NaN → null), không thì json.dumps
+    Route trả thẳng FastJSONResponse(content) để bỏ qua bước encode lại.
+    """
+
+    def render(self, content) -> bytes:
+        with stage("serialization"):
+            return json_dumps(content)
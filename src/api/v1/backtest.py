@@ -0,0 +1,140 @@
+import json
+
+from fastapi import APIRouter, Depends, Query, HTTPException
+
+from src.api.deps import get_backtest_service
+from src.api.responses import FastJSONResponse
+from src.services.backtest.backtest_service import BacktestService
+from src.utils.log_utils import get_logger
+
+router = APIRouter()
+log = get_logger(__name__)
+
+
+@router.get("/backtest")
+def backtest(
+    symbol: str = Query(...),
+    strategy: str = Query("order_block", description="Tên strategy trong STRATEGY_REGISTRY"),
+    start: str = Query(..., description="vd 2020-01-01"),
+    end: str = Query(..., description="vd 2025-12-31"),
+    interval: str = Query("1d"),
+    inputs: str = Query(None, description='Inputs JSON của strategy, vd {"volume_mult": 1.5}'),
+    rr_min: float = Query(2.0),
+    capital: float = Query(100_000_000.0),
+    risk_pct: float = Query(2.0, description="% vốn rủi ro mỗi lệnh"),
+    lot_size: int = Query(100),
+    fee_pct: float = Query(0.15, description="% phí mỗi chiều"),
+    sell_tax_pct: float = Query(0.1, description="% thuế khi bán"),
+    entry_bars: int = Query(5, description="Số nến chờ khớp lệnh limit"),
+    max_hold: int = Query(50, description="Số nến giữ tối đa"),
+    max_points: int = Query(None, description="Số điểm equity curve tối đa"),
+    format: str = Query("records", regex="^(records|columnar)$"),
+    backtest_service: BacktestService = Depends(get_backtest_service)
+):
+    """
+    📈 Backtest strategy trên nến lịch sử (entry / SL / TP như /signal)
+    """
+    try:
+        parsed = json.loads(inputs) if inputs else {}
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"inputs không phải JSON hợp lệ: {e}")
+
+    try:
+        result = backtest_service.run(
+            symbol.upper(), strategy, start, end, interval,
+            inputs=parsed,
+            max_points=max_points,
+            fmt=format,
+            capital=capital,
+            risk_pct=risk_pct,
+            lot_size=lot_size,
+            fee_pct=fee_pct,
+            sell_tax_pct=sell_tax_pct,
+            rr_min=rr_min,
+            entry_bars=entry_bars,
+            max_hold=max_hold,
+        )
+        return FastJSONResponse(result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.exception("Unhandled error in /backtest", extra={"route": "/backtest"})
+
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": str(e),
+                "type": type(e).__name__,
+                "symbol": symbol,
+                "strategy": strategy
+            }
+        )
+
+
+@router.post("/optimize")
+def optimize(
+    symbols: str = Query(..., description="Danh sách mã, vd: FPT,VNM"),
+    strategy: str = Query("smc", description="Tên strategy trong STRATEGY_REGISTRY"),
+    grid: str = Query(..., description='Lưới inputs JSON, vd {"bos_window": [5, 8, 12], "rvol": [1.2, 1.5]}'),
+    start: str = Query(..., description="vd 2020-01-01"),
+    end: str = Query(..., description="vd 2025-12-31"),
+    interval: str = Query("1d"),
+    mode: str = Query("grid", regex="^(grid|random)$"),
+    samples: int = Query(50, description="Số bộ inputs khi mode=random"),
+    splits: int = Query(3, ge=1, description="Số fold walk-forward"),
+    metric: str = Query("return_pct", regex="^(return_pct|net_pnl|win_rate|profit_factor|trades)$"),
+    seed: int = Query(None),
+    top: int = Query(20),
+    rr_min: float = Query(2.0),
+    capital: float = Query(100_000_000.0),
+    risk_pct: float = Query(2.0),
+    lot_size: int = Query(100),
+    fee_pct: float = Query(0.15),
+    sell_tax_pct: float = Query(0.1),
+    entry_bars: int = Query(5),
+    max_hold: int = Query(50),
+    backtest_service: BacktestService = Depends(get_backtest_service)
+):
+    """
+    🧪 Tối ưu inputs strategy (grid / random search, walk-forward) trên nhiều mã
+    """
+    try:
+        parsed = json.loads(grid)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"grid không phải JSON hợp lệ: {e}")
+
+    symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    try:
+        result = backtest_service.optimize(
+            symbol_list, strategy, start, end, parsed,
+            interval=interval,
+            mode=mode,
+            samples=samples,
+            splits=splits,
+            metric=metric,
+            seed=seed,
+            top=top,
+            capital=capital,
+            risk_pct=risk_pct,
+            lot_size=lot_size,
+            fee_pct=fee_pct,
+            sell_tax_pct=sell_tax_pct,
+            rr_min=rr_min,
+            entry_bars=entry_bars,
+            max_hold=max_hold,
+        )
+        return FastJSONResponse(result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.exception("Unhandled error in /optimize", extra={"route": "/optimize"})
+
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": str(e),
+                "type": type(e).__name__,
+                "symbols": symbols,
+                "strategy": strategy
+            }
+        )
@@ -1,11 +1,11 @@
 # src/controllers/dca_controller.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional
+from src.api.deps import get_dca_service
 from src.services.calculator.dca_service import DCAService
 
 router = APIRouter()
-dca_service = DCAService()  # Dùng XnoAPIProvider mặc định
 
 # ================================
 # Schema request
@@ -36,7 +36,7 @@ def calculate_dca(request: DCACalcRequest = DCACalcRequest(
     current_qty=2000,
     additional_qty=4000,
     additional_price=21850
-)):
+), dca_service: DCAService = Depends(get_dca_service)):
     """
     Tính toán DCA (VND Cost Averaging)
     
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.utils.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    📏 Metrics dạng Prometheus text (latency route / pipeline / upstream, lỗi, cache)
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query
+from src.api.deps import get_poller
+from src.services.market_poller import MarketDataPoller
+from src.providers.vnstock_provider import TICK_CACHE
+from src.providers.xnoapi_provider import FOREIGN_CACHE, DEPTH_CACHE
+
+router = APIRouter()
+
+
+def _parse_symbols(symbols: str):
+    return [s.strip().upper() for s in symbols.split(",") if s.strip()]
+
+
+@router.get("/poller")
+def get_poller_stats(poller: MarketDataPoller = Depends(get_poller)):
+    """
+    🔄 Trạng thái poller nền + thống kê cache được làm nóng
+    """
+    return {
+        **poller.stats(),
+        "caches": [TICK_CACHE.stats(), FOREIGN_CACHE.stats(), DEPTH_CACHE.stats()]
+    }
+
+
+@router.post("/poller/subscribe")
+def subscribe(
+    symbols: str = Query(..., description="Danh sách mã, vd: FPT,VNM"),
+    poller: MarketDataPoller = Depends(get_poller)
+):
+    """
+    ➕ Thêm mã vào watchlist của poller
+    """
+    return {"running": poller.running, "symbols": poller.subscribe(_parse_symbols(symbols))}
+
+
+@router.post("/poller/unsubscribe")
+def unsubscribe(
+    symbols: str = Query(..., description="Danh sách mã, vd: FPT,VNM"),
+    poller: MarketDataPoller = Depends(get_poller)
+):
+    """
+    ➖ Bỏ mã khỏi watchlist của poller
+    """
+    return {"running": poller.running, "symbols": poller.unsubscribe(_parse_symbols(symbols))}
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
+from src.api.deps import get_provider
+from src.providers.vnstock_provider import VnStockProvider
 from src.services.calculator.position_calculator import AutoPositionCalculator
 from src.services.calculator.position_sizer import PositionSizer
 
@@ -32,6 +34,7 @@ def manual_trade_calculate(
     quantity: int = Query(..., gt=0, example=100),
     rr: float = Query(2.0, gt=0, example=2.0),
     account_balance: float = Query(..., gt=0, example=3000),
+    provider: VnStockProvider = Depends(get_provider)
 ):
     return AutoPositionCalculator.calculate(
         symbol=symbol,
@@ -40,6 +43,7 @@ def manual_trade_calculate(
         quantity=quantity,
         rr=rr,
         account_balance=account_balance,
+        provider=provider,
     )
 
 @router.get("/suggest-quantity", summary="Gợi ý quantity theo rule 2%", response_model=dict)
@@ -1,39 +1,55 @@
-from fastapi import APIRouter, Query
-from src.services.stock_service import StockService
+import asyncio
+from fastapi import APIRouter, Depends, Query, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from src.config import Config
+from src.services.async_stock_service import AsyncStockService
+from src.services.stream_service import StreamHub
+from src.providers.vnstock_provider import TICK_CACHE
+from src.api.deps import get_async_stock_service, get_stream_hub
+from src.api.responses import FastJSONResponse
+
+FORMAT_QUERY = Query("records", regex="^(records|columnar)$", description="Format nến: records | columnar")
 
 router = APIRouter()
-service = StockService()
 
 
 @router.get("/live")
-def get_live(symbol: str = Query(..., description="Mã cổ phiếu")):
+async def get_live(
+    symbol: str = Query(..., description="Mã cổ phiếu"),
+    async_service: AsyncStockService = Depends(get_async_stock_service)
+):
     """
     📊 Giá realtime hiện tại
     """
-    return service.snapshot(symbol)
+    return await async_service.snapshot(symbol)
 
 
 @router.get("/history")
-def get_history(
+async def get_history(
     symbol: str = Query(..., description="Mã cổ phiếu"),
     start: str = Query(..., description="Thời gian bắt đầu"),
     end: str = Query(..., description="Thời gian kết thúc"),
-    interval: str = Query("1d", description="Khung thời gian: 1m, 1h, 1d")
+    interval: str = Query("1d", description="Khung thời gian: 1m, 1h, 1d"),
+    format: str = FORMAT_QUERY,
+    async_service: AsyncStockService = Depends(get_async_stock_service)
 ):
     """
     📈 Dữ liệu lịch sử (chart)
     """
-    return service.history(symbol, start, end, interval)
+    result = await async_service.history(symbol, start, end, interval, fmt=format)
+    return FastJSONResponse(result)
 
 
 @router.get("/tick")
-def get_tick(
+async def get_tick(
     symbol: str = Query(..., description="Mã cổ phiếu"),
     start: str = Query(..., description="Thời gian bắt đầu"),
     end: str = Query(..., description="Thời gian kết thúc"),
     limit: int = Query(1000, description="Số lượng tick tối đa"),
     strategies: str = Query(None, description="Danh sách strategy: order_block, wyckoff, smc"),
-    interval: str = Query("1T", description="Khung nến: 1T (1min), 5T (5min), 15T, 1H")
+    interval: str = Query("1T", description="Khung nến: 1T (1min), 5T (5min), 15T, 1H"),
+    format: str = FORMAT_QUERY,
+    async_service: AsyncStockService = Depends(get_async_stock_service)
 ):
     """
     🧠 Tick + Strategy Engine
@@ -41,27 +57,31 @@ def get_tick(
     Lấy dữ liệu intraday và chạy chiến lược (Order Block / Wyckoff / SMC).
     
     **Luôn trả về:**
-    - `records`: Dữ liệu OHLCV chi tiết
+    - `records`: Dữ liệu OHLCV chi tiết (`format=columnar` → `columns`)
     - `signals`: Tín hiệu từ các chiến lược (nếu có)
     - `count`: Số lượng nến
     """
-    return service.tick(
+    result = await async_service.tick(
         symbol=symbol,
         start=start,
         end=end,
         limit=limit,
         strategies=strategies,
-        interval=interval
+        interval=interval,
+        fmt=format
     )
+    return FastJSONResponse(result)
 
 
 @router.get("/lastMin")
-def get_last_5_min(
+async def get_last_5_min(
     symbol: str = Query(..., description="Mã cổ phiếu"),
     minutes: int = Query(5, description="Số phút gần nhất"),
     limit: int = Query(10000, description="Số lượng tick tối đa"),
     strategies: str = Query(None, description="Strategy chạy realtime"),
-    interval: str = Query("1T", description="Khung nến: 1T (1min), 5T (5min)")
+    interval: str = Query("1T", description="Khung nến: 1T (1min), 5T (5min)"),
+    format: str = FORMAT_QUERY,
+    async_service: AsyncStockService = Depends(get_async_stock_service)
 ):
     """
     ⚡ N phút gần nhất (Scalping)
@@ -69,16 +89,108 @@ def get_last_5_min(
     Lấy dữ liệu N phút gần nhất + optional Strategy Engine.
     
     **Luôn trả về:**
-    - `records`: Dữ liệu OHLCV chi tiết
+    - `records`: Dữ liệu OHLCV chi tiết (`format=columnar` → `columns`)
     - `signals`: Tín hiệu từ các chiến lược (nếu có)
     - `count`: Số lượng nến
     """
-    return service.last_minutes(
+    result = await async_service.last_minutes(
+        symbol=symbol,
+        minutes=minutes,
+        limit=limit,
+        strategies=strategies,
+        interval=interval,
+        fmt=format
+    )
+    return FastJSONResponse(result)
+
+
+@router.get("/multi")
+async def get_multi_timeframe(
+    symbol: str = Query(..., description="Mã cổ phiếu"),
+    intervals: str = Query("1T,5T,15T", description="Danh sách khung nến: 1T, 5T, 15T, 1H"),
+    minutes: int = Query(None, description="Chỉ lấy N phút gần nhất"),
+    start: str = Query(None, description="Thời gian bắt đầu"),
+    end: str = Query(None, description="Thời gian kết thúc"),
+    limit: int = Query(10000, description="Số lượng tick tối đa"),
+    strategies: str = Query(None, description="Danh sách strategy: order_block, wyckoff, smc"),
+    format: str = FORMAT_QUERY,
+    async_service: AsyncStockService = Depends(get_async_stock_service)
+):
+    """
+    🗂️ Nhiều khung nến từ 1 lần lấy tick
+
+    Tick chỉ fetch 1 lần, nến 5T / 15T / 1H gộp từ nến 1T.
+
+    **Luôn trả về:**
+    - `timeframes`: Mỗi interval có `records` (hoặc `columns`), `count` (+ `signals` nếu có strategy)
+    """
+    result = await async_service.multi_timeframe(
         symbol=symbol,
+        intervals=intervals,
         minutes=minutes,
+        start=start,
+        end=end,
         limit=limit,
         strategies=strategies,
-        interval=interval
+        fmt=format
     )
+    return FastJSONResponse(result)
+
+
+@router.get("/stream")
+async def stream_candles(
+    request: Request,
+    symbol: str = Query(..., description="Mã cổ phiếu"),
+    interval: str = Query("1T", description="Khung nến: 1T (1min), 5T (5min), 15T, 1H"),
+    strategies: str = Query(None, description="Strategy chạy realtime: order_block, wyckoff, smc"),
+    stream_hub: StreamHub = Depends(get_stream_hub)
+):
+    """
+    📡 Stream nến + tín hiệu realtime (Server-Sent Events)
+
+    Mọi client cùng symbol / interval dùng chung 1 vòng fetch upstream.
+
+    **Events:**
+    - `snapshot`: Nến trong cửa sổ gần nhất + tín hiệu hiện có (khi kết nối / resync)
+    - `candles`: Chỉ các nến mới hoặc vừa thay đổi
+    - `signal`: Tín hiệu strategy mới
+    """
+    try:
+        sub = await stream_hub.subscribe(symbol, interval, strategies)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    async def events():
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), timeout=Config.STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    frame = b": ping\n\n"
+                yield frame
+        finally:
+            stream_hub.unsubscribe(sub)
 
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/streamStats")
+def get_stream_stats(stream_hub: StreamHub = Depends(get_stream_hub)):
+    """
+    📡 Thống kê stream: số feed, client, update
+    """
+    return stream_hub.stats()
+
+
+@router.get("/cacheStats")
+def get_cache_stats():
+    """
+    🗄️ Thống kê tick cache (hits / misses / evictions)
+    """
+    return TICK_CACHE.stats()
@@ -1,29 +1,36 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException
 from src.services.trade.trade_service import TradeService
-import traceback
+from src.services.trade.async_trade_service import AsyncTradeService
+from src.config import Config
+from src.api.deps import get_trade_service, get_async_trade_service
+from src.api.responses import FastJSONResponse
+from src.utils.log_utils import get_logger
 
 router = APIRouter(tags=["Trade"])
-trade_service = TradeService()
+log = get_logger(__name__)
 
 
 @router.get("/signal")
-def trade_signal(
+async def trade_signal(
     symbol: str = Query(...),
     minutes: int = Query(120),
     strategies: str = Query("smc,order_block,wyckoff"),
-    rr_min: float = Query(2.0)
+    rr_min: float = Query(2.0),
+    format: str = Query("records", regex="^(records|columnar)$"),
+    detail: str = Query("full", regex="^(summary|signals|full)$"),
+    async_trade_service: AsyncTradeService = Depends(get_async_trade_service)
 ):
     try:
-        result = trade_service.generate_signal(symbol, strategies, rr_min, minutes)
-        return {
+        result = await async_trade_service.generate_signal(
+            symbol, strategies, rr_min, minutes, fmt=format, detail=detail
+        )
+        return FastJSONResponse({
             "symbol": symbol,
             "minutes": minutes,
             **result
-        }
+        })
     except Exception as e:
-        # Log full traceback
-        print(f"❌ ERROR in /signal:")
-        print(traceback.format_exc())
+        log.exception("Unhandled error in /signal", extra={"route": "/signal"})
         
         # Return detailed error
         raise HTTPException(
@@ -42,13 +49,18 @@ def scan_signals(
     symbols: str = Query(...),
     timeframe: str = Query("5m"),
     strategies: str = Query("smc,order_block,wyckoff"),
-    rr_min: float = Query(2.0)
+    rr_min: float = Query(2.0),
+    trade_service: TradeService = Depends(get_trade_service)
 ):
+    # Route sync có chủ đích: scan_signals là vòng điều phối blocking (wait() theo
+    # deadline trên scan pool riêng SCAN_MAX_WORKERS), bản async cũng chỉ bọc nó
+    # bằng to_thread. Mỗi request giữ 1 thread Starlette tối đa SCAN_TOTAL_TIMEOUT giây;
+    # worker upstream treo không giữ thread này (xem TradeService._track_stuck).
     try:
-        symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+        symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
 
-        if len(symbol_list) > 10:
-            return {"status": "error", "error": "Maximum 10 symbols per scan"}
+        if len(symbol_list) > Config.SCAN_MAX_SYMBOLS:
+            return {"status": "error", "error": f"Maximum {Config.SCAN_MAX_SYMBOLS} symbols per scan"}
 
         result = trade_service.scan_signals(symbol_list, strategies, rr_min)
 
@@ -59,8 +71,7 @@ def scan_signals(
             **result
         }
     except Exception as e:
-        print(f"❌ ERROR in /scan:")
-        print(traceback.format_exc())
+        log.exception("Unhandled error in /scan", extra={"route": "/scan"})
         
         raise HTTPException(
             status_code=500,
@@ -73,17 +84,17 @@ def scan_signals(
 
 
 @router.get("/validate")
-def validate_signal(
+async def validate_signal(
     symbol: str = Query(...),
     entry: float = Query(...),
     sl: float = Query(...),
-    tp: float = Query(...)
+    tp: float = Query(...),
+    async_trade_service: AsyncTradeService = Depends(get_async_trade_service)
 ):
     try:
-        return trade_service.validate_trade(symbol, entry, sl, tp)
+        return await async_trade_service.validate_trade(symbol, entry, sl, tp)
     except Exception as e:
-        print(f"❌ ERROR in /validate:")
-        print(traceback.format_exc())
+        log.exception("Unhandled error in /validate", extra={"route": "/validate"})
         
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from src.providers.upstream_gateway import GATEWAYS
+from src.providers.vnstock_provider import TICK_CACHE
+from src.providers.xnoapi_provider import FOREIGN_CACHE, DEPTH_CACHE
+
+router = APIRouter()
+
+
+@router.get("/upstream")
+def get_upstream_stats():
+    """
+    🛡️ Trạng thái gateway upstream (circuit breaker, rate limiter) + cache
+    """
+    return {
+        "gateways": [g.stats() for g in GATEWAYS.values()],
+        "caches": [TICK_CACHE.stats(), FOREIGN_CACHE.stats(), DEPTH_CACHE.stats()]
+    }
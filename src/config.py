@@ -1,10 +1,46 @@
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from pathlib import Path
 
 # Load biến môi trường từ file .env
 load_dotenv()
 
+# Thư mục gốc project (chứa src/)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_path(name, default):
+    """Đường dẫn tương đối tính từ thư mục gốc project (không phụ thuộc CWD lúc chạy)"""
+    path = Path(os.getenv(name) or default)
+    return str(path if path.is_absolute() else PROJECT_ROOT / path)
+
+
+def _env_list(name, default=""):
+    return [s.strip().upper() for s in (os.getenv(name) or default).split(",") if s.strip()]
+
+
 class Config:
     # Default values (nếu không truyền query thì dùng giá trị này)
     DEFAULT_SOURCE = os.getenv("DEFAULT_SOURCE", "VCI")
@@ -18,6 +54,111 @@ class Config:
     DEFAULT_START_DATE = os.getenv("DEFAULT_START_DATE", "2025-12-15 09:00:00")
     DEFAULT_END_DATE = os.getenv("DEFAULT_END_DATE", "2025-12-15 15:00:00")
 
+    # Tick cache dùng chung cho VnStockProvider.intraday
+    TICK_CACHE_TTL = _env_float("TICK_CACHE_TTL", 2.0)        # giây
+    TICK_CACHE_MAXSIZE = _env_int("TICK_CACHE_MAXSIZE", 256)  # số (symbol, source)
+    BAR_AGGREGATOR_MAXSIZE = _env_int("BAR_AGGREGATOR_MAXSIZE", 512)
+
+    # Scan nhiều mã song song (/scan)
+    SCAN_MAX_WORKERS = _env_int("SCAN_MAX_WORKERS", 8)
+    SCAN_MAX_SYMBOLS = _env_int("SCAN_MAX_SYMBOLS", 50)
+    SCAN_SYMBOL_TIMEOUT = _env_float("SCAN_SYMBOL_TIMEOUT", 10.0)   # giây / mã
+    SCAN_TOTAL_TIMEOUT = _env_float("SCAN_TOTAL_TIMEOUT", 30.0)     # giây / request
+    # Worker còn chạy sau khi mã đã timeout (upstream treo); pool đạt ngưỡng này thì
+    # thay pool mới cho các lần scan sau. 0 = nửa SCAN_MAX_WORKERS
+    SCAN_MAX_STUCK = _env_int("SCAN_MAX_STUCK", 0)
+
+    # Async provider: pool thread cho lời gọi upstream blocking + retry backoff
+    UPSTREAM_MAX_WORKERS = _env_int("UPSTREAM_MAX_WORKERS", 16)
+    UPSTREAM_RETRY = _env_int("UPSTREAM_RETRY", 2)
+    UPSTREAM_RETRY_BASE_DELAY = _env_float("UPSTREAM_RETRY_BASE_DELAY", 0.25)
+    UPSTREAM_RETRY_MAX_DELAY = _env_float("UPSTREAM_RETRY_MAX_DELAY", 2.0)
+
+    # Upstream gateway: token bucket (request / giây, burst) + circuit breaker
+    VNSTOCK_RATE_LIMIT = _env_float("VNSTOCK_RATE_LIMIT", 10.0)
+    VNSTOCK_RATE_BURST = _env_int("VNSTOCK_RATE_BURST", 20)
+    XNO_RATE_LIMIT = _env_float("XNO_RATE_LIMIT", 10.0)
+    XNO_RATE_BURST = _env_int("XNO_RATE_BURST", 20)
+    UPSTREAM_ACQUIRE_TIMEOUT = _env_float("UPSTREAM_ACQUIRE_TIMEOUT", 5.0)   # giây chờ token tối đa
+    UPSTREAM_HTTP_TIMEOUT = _env_float("UPSTREAM_HTTP_TIMEOUT", 10.0)        # giây / HTTP request, 0 = tắt
+    BREAKER_FAILURE_THRESHOLD = _env_int("BREAKER_FAILURE_THRESHOLD", 5)     # lỗi liên tiếp → open
+    BREAKER_RESET_TIMEOUT = _env_float("BREAKER_RESET_TIMEOUT", 30.0)        # giây open trước khi thử lại
+
+    # /live: deadline từng nguồn (giây), quá hạn thì trả stale / missing
+    SNAPSHOT_INTRADAY_DEADLINE = _env_float("SNAPSHOT_INTRADAY_DEADLINE", 2.0)
+    SNAPSHOT_FOREIGN_DEADLINE = _env_float("SNAPSHOT_FOREIGN_DEADLINE", 1.0)
+    SNAPSHOT_DEPTH_DEADLINE = _env_float("SNAPSHOT_DEPTH_DEADLINE", 1.0)
+    SNAPSHOT_STALE_MAX_AGE = _env_float("SNAPSHOT_STALE_MAX_AGE", 60.0)
+    SNAPSHOT_STALE_MAXSIZE = _env_int("SNAPSHOT_STALE_MAXSIZE", 1024)
+
+    # Cache khối ngoại / price depth (XNO), dùng chung cho mọi XnoAPIProvider
+    XNO_CACHE_TTL = _env_float("XNO_CACHE_TTL", 2.0)        # giây
+    XNO_CACHE_MAXSIZE = _env_int("XNO_CACHE_MAXSIZE", 256)  # số symbol
+
+    # Poller nền (APScheduler): làm nóng cache cho watchlist trong giờ giao dịch
+    POLLER_ENABLED = _env_bool("POLLER_ENABLED", False)
+    POLLER_SYMBOLS = _env_list("POLLER_SYMBOLS")
+    POLLER_INTERVAL = _env_float("POLLER_INTERVAL", 2.0)          # giây / vòng poll
+    POLLER_TICK_LIMIT = _env_int("POLLER_TICK_LIMIT", 10000)      # page_size tick
+    POLLER_CACHE_TTL = _env_float("POLLER_CACHE_TTL", 10.0)       # TTL entry do poller ghi
+    POLLER_MARKET_HOURS_ONLY = _env_bool("POLLER_MARKET_HOURS_ONLY", True)
+
+    # Stream nến / tín hiệu (SSE /stream): 1 vòng fetch / (symbol, interval)
+    STREAM_POLL_INTERVAL = _env_float("STREAM_POLL_INTERVAL", 1.0)    # giây
+    STREAM_TICK_LIMIT = _env_int("STREAM_TICK_LIMIT", 10000)
+    STREAM_WINDOW_MINUTES = _env_int("STREAM_WINDOW_MINUTES", 120)    # snapshot + strategy
+    STREAM_QUEUE_SIZE = _env_int("STREAM_QUEUE_SIZE", 100)            # frame chờ / client
+    STREAM_HEARTBEAT = _env_float("STREAM_HEARTBEAT", 15.0)           # giây
+    STREAM_MAX_FEEDS = _env_int("STREAM_MAX_FEEDS", 200)
+    STREAM_CLOSED_POLL_INTERVAL = _env_float("STREAM_CLOSED_POLL_INTERVAL", 30.0)  # ngoài phiên
+
+    # Backtest (/backtest): nến lịch sử cache lâu, equity curve lấy mẫu đều
+    BACKTEST_DATA_TTL = _env_float("BACKTEST_DATA_TTL", 3600.0)     # giây
+    BACKTEST_CACHE_MAXSIZE = _env_int("BACKTEST_CACHE_MAXSIZE", 64)
+    BACKTEST_MAX_POINTS = _env_int("BACKTEST_MAX_POINTS", 2000)     # điểm equity trả về
+
+    # Optimizer inputs strategy (/optimize): process pool + shared memory
+    OPTIMIZER_WORKERS = _env_int("OPTIMIZER_WORKERS", 0)            # 0 = số CPU
+    OPTIMIZER_MAX_COMBOS = _env_int("OPTIMIZER_MAX_COMBOS", 500)    # số bộ inputs tối đa / lần
+    OPTIMIZER_START_METHOD = os.getenv("OPTIMIZER_START_METHOD", "spawn")
+
+    # Store nến lịch sử trên đĩa (.npy theo symbol / interval / tháng)
+    HISTORY_STORE_ENABLED = _env_bool("HISTORY_STORE_ENABLED", True)
+    HISTORY_STORE_DIR = _env_path("HISTORY_STORE_DIR", "data/history")  # tương đối → từ gốc project
+    HISTORY_FETCH_WORKERS = _env_int("HISTORY_FETCH_WORKERS", 4)   # khoảng thiếu fetch song song
+
+    # File lịch nghỉ (1 ngày YYYY-MM-DD / dòng), rỗng = src/utils/vn_holidays.txt
+    MARKET_HOLIDAYS_FILE = os.getenv("MARKET_HOLIDAYS_FILE", "")
+    # Ngày nghỉ thêm ngoài file lịch (vd nghỉ bù / đột xuất), YYYY-MM-DD
+    MARKET_HOLIDAYS = _env_list("MARKET_HOLIDAYS")
+    # TTL tối đa cho cache realtime (tick / khối ngoại / depth) ngoài phiên khớp lệnh
+    MARKET_CLOSED_CACHE_TTL = _env_float("MARKET_CLOSED_CACHE_TTL", 300.0)
+
+    # Logging: level, format (json | text), queue non-blocking, lấy mẫu lỗi upstream lặp lại
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_QUEUE_SIZE = _env_int("LOG_QUEUE_SIZE", 10000)          # record chờ ghi, đầy thì bỏ
+    LOG_SAMPLE_WINDOW = _env_float("LOG_SAMPLE_WINDOW", 60.0)   # giây / 1 log cho cùng lỗi
+
+    # Provider giả lập (load test offline, không gọi vnstock / XNO)
+    FAKE_PROVIDER = _env_bool("FAKE_PROVIDER", False)
+    FAKE_DATA_DIR = os.getenv("FAKE_DATA_DIR", "")              # <SYMBOL>.csv(.gz) tick đã ghi
+    FAKE_MARKET_DAY = os.getenv("FAKE_MARKET_DAY", "")          # rỗng = ngày giao dịch gần nhất
+    FAKE_TICKS = _env_int("FAKE_TICKS", 10000)                  # tick / symbol / ngày
+    FAKE_SEED = _env_int("FAKE_SEED", 42)
+    FAKE_LATENCY = _env_float("FAKE_LATENCY", 0.0)              # giây / lời gọi upstream
+    FAKE_LATENCY_JITTER = _env_float("FAKE_LATENCY_JITTER", 0.0)
+    FAKE_ERROR_RATE = _env_float("FAKE_ERROR_RATE", 0.0)        # 0–1, lỗi ConnectionError
+
+    # Capture response upstream (gzip JSONL append-only) / replay lại qua provider giả lập
+    CAPTURE_ENABLED = _env_bool("CAPTURE_ENABLED", False)
+    CAPTURE_DIR = os.getenv("CAPTURE_DIR", "data/capture")
+    CAPTURE_QUEUE_SIZE = _env_int("CAPTURE_QUEUE_SIZE", 1000)   # response chờ ghi, đầy thì bỏ
+    REPLAY_ENABLED = _env_bool("REPLAY_ENABLED", False)
+    REPLAY_DIR = os.getenv("REPLAY_DIR", "")                    # rỗng = CAPTURE_DIR
+    REPLAY_AT = os.getenv("REPLAY_AT", "")                      # giờ thị trường cố định, rỗng = chạy theo đồng hồ
+    REPLAY_SPEED = _env_float("REPLAY_SPEED", 1.0)              # tốc độ đồng hồ replay
+
     # Optional: validate định dạng ngày/giờ
     @staticmethod
     def validate_datetime(date_str: str):
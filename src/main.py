@@ -1,10 +1,19 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 
 from src.api.v1.stock import router as stock_router
 from src.api.v1.trade import router as trade_router
 from src.api.v1.position import router as position_router 
 from src.api.v1.dca_controller import router as dca_router
+from src.api.v1.poller import router as poller_router
+from src.api.v1.backtest import router as backtest_router
+from src.api.v1.upstream import router as upstream_router
+from src.api.v1.metrics import router as metrics_router
+from src.api.deps import container
+from src.utils.log_utils import REQUEST_ID, set_request_id, setup_logging, shutdown_logging
+from src.utils.metrics import HTTP_REQUEST_SECONDS
 app = FastAPI(
     title="VN Stock API",
     version="1.0.0",
@@ -32,6 +41,75 @@ app.include_router(
     prefix="/api/v1",
     tags=["DCA"]
 )
+app.include_router(
+    poller_router,
+    prefix="/api/v1",
+    tags=["Poller"]
+)
+app.include_router(
+    backtest_router,
+    prefix="/api/v1",
+    tags=["Backtest"]
+)
+app.include_router(
+    upstream_router,
+    prefix="/api/v1",
+    tags=["Upstream"]
+)
+app.include_router(
+    metrics_router,
+    tags=["Metrics"]
+)
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    streaming = False
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # SSE (/stream): response trả về ngay khi mở stream, phiên kéo dài tới khi
+        # client ngắt → không đo vào HTTP_REQUEST_SECONDS (xem /streamStats)
+        streaming = response.headers.get("content-type", "").startswith("text/event-stream")
+        return response
+    finally:
+        # Label theo route template (vd /tick), không theo URL thật → số series cố định
+        route = request.scope.get("route")
+        if not streaming:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                request.method,
+                getattr(route, "path", "unmatched"),
+                str(status),
+            )
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Request ID (nhận từ client / proxy hoặc tự sinh) gắn vào mọi log của request
+    token = set_request_id(request.headers.get("x-request-id"))
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = REQUEST_ID.get()
+        return response
+    finally:
+        REQUEST_ID.reset(token)
+
+
+@app.on_event("startup")
+def startup():
+    setup_logging()
+    container.startup()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    container.shutdown()
+    shutdown_logging()
+
+
 # Root → Swagger
 @app.get("/", include_in_schema=False)
 def root():
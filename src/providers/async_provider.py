@@ -0,0 +1,164 @@
+# providers/async_provider.py
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import Config
+from src.providers.upstream_gateway import UpstreamGateway, retry_delay
+from src.utils.log_utils import bind_context, get_logger, log_upstream_error
+from src.utils.metrics import UPSTREAM_RETRIES
+from src.utils.trading_calendar import cache_ttl
+from src.providers.vnstock_provider import VnStockProvider
+from src.providers.xnoapi_provider import XnoAPIProvider, FOREIGN_CACHE, DEPTH_CACHE, records_or_none
+
+log = get_logger(__name__)
+
+# vnstock / xnoapi là thư viện sync (requests) → chạy trên pool riêng,
+# upstream chậm không chiếm threadpool của Starlette
+UPSTREAM_EXECUTOR = ThreadPoolExecutor(
+    max_workers=Config.UPSTREAM_MAX_WORKERS,
+    thread_name_prefix="upstream"
+)
+
+
+async def run_upstream(func, *args, **kwargs):
+    """Chạy 1 lời gọi upstream blocking trên UPSTREAM_EXECUTOR (giữ context / request_id)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        UPSTREAM_EXECUTOR, bind_context(func, *args, **kwargs)
+    )
+
+
+def _upstream_name(func):
+    """Tên upstream của func (gateway.call hoặc method của provider có .gateway)"""
+    owner = getattr(func, "__self__", None)
+    if isinstance(owner, UpstreamGateway):
+        return owner.name
+    return getattr(getattr(owner, "gateway", None), "name", "unknown")
+
+
+async def retry_async(func, *args, retries=None, **kwargs):
+    """
+    Gọi upstream với retry, cùng chính sách retry_delay với UpstreamGateway.retry
+    nhưng chờ bằng asyncio.sleep (không block event loop): breaker mở,
+    hết token hay lỗi input thì raise ngay.
+    """
+    for attempt in itertools.count():
+        try:
+            return await run_upstream(func, *args, **kwargs)
+        except Exception as e:
+            delay = retry_delay(e, attempt, retries)
+            if delay is None:
+                raise
+            UPSTREAM_RETRIES.inc(_upstream_name(func))
+            await asyncio.sleep(delay)
+
+
+class AsyncVnStockProvider:
+    """
+    Async interface cho VnStockProvider
+    - Fetch tick / history: chạy trên UPSTREAM_EXECUTOR, retry async
+      (history đi qua HistoryStore nếu bật)
+    - Build nến (CPU): asyncio.to_thread
+    """
+
+    def __init__(self, provider=None):
+        self.sync = provider or VnStockProvider()
+
+    async def intraday(self, symbol, limit, interval='1T'):
+        try:
+            df = await retry_async(self.sync._ticks, symbol, limit)
+            return await asyncio.to_thread(self.sync.candles_from_ticks, symbol, limit, df, interval)
+        except Exception as e:
+            log_upstream_error(log, "intraday", e, symbol=symbol, interval=interval)
+            return None
+
+    async def intraday_multi(self, symbol, limit, intervals, base_interval='1T'):
+        try:
+            df = await retry_async(self.sync._ticks, symbol, limit)
+            return await asyncio.to_thread(
+                self.sync.multi_candles_from_ticks, symbol, limit, df, intervals, base_interval
+            )
+        except Exception as e:
+            log_upstream_error(log, "intraday_multi", e, symbol=symbol)
+            return None
+
+    async def history(self, symbol, start, end, interval):
+        try:
+            # Có HistoryStore: đọc store, chỉ fetch khoảng thiếu
+            fetch = self.sync._stored_history if self.sync.store is not None else self.sync._fetch_history
+            df = await retry_async(fetch, symbol, start, end, interval)
+            return self.sync.history_columns(symbol, df)
+        except Exception as e:
+            log_upstream_error(log, "history", e, symbol=symbol, start=start, end=end, interval=interval)
+            return None
+
+
+class AsyncXnoAPIProvider:
+    """
+    Async interface cho XnoAPIProvider (intraday / history / foreign / depth)
+    Retry bằng asyncio.sleep thay cho time.sleep của XnoAPIProvider._retry
+    """
+
+    def __init__(self, provider=None):
+        self.sync = provider or XnoAPIProvider()
+        # (tên cache, symbol) → task đang fetch (single-flight trên event loop)
+        self._inflight = {}
+
+    async def intraday(self, symbol, limit=100):
+        try:
+            df = await retry_async(self.sync.gateway.call, self.sync._quote_intraday, symbol, limit, retries=self.sync.retry)
+            return self.sync._ohlcv(df)
+        except Exception as e:
+            log_upstream_error(log, "xno_intraday", e, symbol=symbol)
+            return None
+
+    async def history(self, symbol, start, end, interval="1d"):
+        try:
+            df = await retry_async(
+                self.sync.gateway.call, self.sync._quote_history, symbol, start, end, interval,
+                retries=self.sync.retry
+            )
+            return self.sync._ohlcv(df)
+        except Exception as e:
+            log_upstream_error(log, "xno_history", e, symbol=symbol)
+            return None
+
+    async def _load(self, cache, symbol, func, *args):
+        data = records_or_none(await retry_async(self.sync.gateway.call, func, *args, retries=self.sync.retry))
+        cache.put(symbol, data, ttl=cache_ttl(Config.XNO_CACHE_TTL))
+        return data
+
+    async def _cached(self, cache, symbol, func, *args):
+        """
+        Đọc cache (vd do poller làm nóng), miss thì fetch upstream rồi ghi lại
+
+        Single-flight như UpstreamCache.get_or_load: nhiều miss đồng thời cho cùng
+        symbol chờ chung 1 task (lỗi được raise cho mọi request đang chờ)
+        """
+        data = cache.get(symbol)
+        if data is not None:
+            return data or []
+
+        key = (cache.name, symbol)
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._load(cache, symbol, func, *args))
+            self._inflight[key] = flight
+            flight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 1 request bị huỷ không huỷ lần fetch của các request khác
+        return await asyncio.shield(flight) or []
+
+    async def foreign_trading(self, symbol):
+        try:
+            return await self._cached(FOREIGN_CACHE, symbol, self.sync._quote_foreign_trading, symbol)
+        except Exception as e:
+            log_upstream_error(log, "xno_foreign_trading", e, symbol=symbol)
+            return []
+
+    async def price_depth(self, symbol):
+        try:
+            return await self._cached(DEPTH_CACHE, symbol, self.sync._quote_price_depth, symbol)
+        except Exception as e:
+            log_upstream_error(log, "xno_price_depth", e, symbol=symbol)
+            return []
@@ -0,0 +1,271 @@
+# providers/bar_aggregator.py
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+NS_PER_DAY = 86_400 * 10**9
+
+
+def interval_to_ns(interval):
+    """'1T' / '5T' / '15T' / '1H' / '1min' → số nanosecond của 1 nến"""
+    try:
+        return pd.Timedelta(to_offset(interval)).value
+    except (ValueError, TypeError):
+        return None
+
+
+def supports_interval(interval):
+    """Chỉ hỗ trợ khung chia hết 1 ngày (giống bin của resample origin='start_day')"""
+    step = interval_to_ns(interval)
+    return bool(step) and NS_PER_DAY % step == 0
+
+
+class BarAggregator:
+    """
+    Build nến OHLC tăng dần từ tick data của 1 symbol / 1 interval
+
+    - Giữ các nến đã build + nến đang mở
+    - Nhớ timestamp tick cuối cùng đã thấy (và số tick tại timestamp đó)
+    - Mỗi lần update chỉ fold phần tick mới vào nến đang mở → O(tick mới)
+
+    Output giống hệt `df.set_index('time')['price'].resample(interval).ohlc()`
+    + volume sum + dropna như VnStockProvider._build_ohlc_from_ticks.
+    """
+
+    def __init__(self, interval='1T'):
+        if not supports_interval(interval):
+            raise ValueError(f"Interval không hỗ trợ build incremental: {interval}")
+
+        self.interval = interval
+        self.step = interval_to_ns(interval)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.origin = None
+        self.tz = None
+        self.unit = None
+
+        # Cửa sổ tick đã fold: tick đầu / cuối và số tick trùng timestamp
+        self.first_time = None
+        self.first_count = 0
+        self.last_time = None
+        self.last_count = 0
+
+        # Nến (cả nến chưa có giá hợp lệ, lọc ra khi xuất)
+        self._time = []
+        self._open = []
+        self._high = []
+        self._low = []
+        self._close = []
+        self._volume = []
+
+        self._frame = None
+
+    # ==================================================
+    # INTERNAL
+    # ==================================================
+    def _bucket(self, t):
+        return self.origin + (t - self.origin) // self.step * self.step
+
+    def _aggregate(self, t, p, v):
+        """Gom tick (đã sort theo time) thành các nến theo bucket"""
+        buckets = self._bucket(t)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        keys = buckets[starts]
+        volumes = np.add.reduceat(v, starts)
+
+        # OHLC chỉ tính trên tick có giá (resample().ohlc() bỏ qua NaN)
+        n = len(keys)
+        opens = np.full(n, np.nan)
+        highs = np.full(n, np.nan)
+        lows = np.full(n, np.nan)
+        closes = np.full(n, np.nan)
+
+        valid = ~np.isnan(p)
+        if valid.any():
+            pv = p[valid]
+            bv = buckets[valid]
+            vstarts = np.flatnonzero(np.r_[True, bv[1:] != bv[:-1]])
+            vends = np.r_[vstarts[1:], len(pv)]
+            pos = np.searchsorted(keys, bv[vstarts])
+            opens[pos] = pv[vstarts]
+            closes[pos] = pv[vends - 1]
+            highs[pos] = np.maximum.reduceat(pv, vstarts)
+            lows[pos] = np.minimum.reduceat(pv, vstarts)
+
+        return keys, opens, highs, lows, closes, volumes
+
+    def _fold(self, t, p, v):
+        """Fold tick (đã sort theo time) vào nến đang mở + thêm nến mới"""
+        if len(t) == 0:
+            return
+
+        keys, opens, highs, lows, closes, volumes = self._aggregate(t, p, v)
+
+        i = 0
+        if self._time and self._time[-1] == keys[0]:
+            # Merge vào nến đang mở
+            if np.isnan(self._open[-1]):
+                self._open[-1] = opens[0]
+                self._high[-1] = highs[0]
+                self._low[-1] = lows[0]
+            elif not np.isnan(opens[0]):
+                self._high[-1] = max(self._high[-1], highs[0])
+                self._low[-1] = min(self._low[-1], lows[0])
+            if not np.isnan(closes[0]):
+                self._close[-1] = closes[0]
+            self._volume[-1] += volumes[0].item()
+            i = 1
+
+        self._time.extend(keys[i:].tolist())
+        self._open.extend(opens[i:].tolist())
+        self._high.extend(highs[i:].tolist())
+        self._low.extend(lows[i:].tolist())
+        self._close.extend(closes[i:].tolist())
+        self._volume.extend(volumes[i:].tolist())
+
+    def _columns(self):
+        return self._time, self._open, self._high, self._low, self._close, self._volume
+
+    def _slide(self, t, p, v, old_end):
+        """
+        Tick cũ đã trượt khỏi cửa sổ upstream: bỏ nến trước tick đầu tiên
+        và build lại nến đầu từ các tick cũ còn trong cửa sổ
+        """
+        first_bucket = int(self._bucket(t[:1])[0])
+        k = int(np.searchsorted(np.asarray(self._time, dtype=np.int64), first_bucket))
+        for col in self._columns():
+            del col[:k]
+
+        end = min(int(np.searchsorted(t, first_bucket + self.step, 'left')), old_end)
+        if not self._time or self._time[0] != first_bucket or end == 0:
+            return
+
+        bar = self._aggregate(t[:end], p[:end], v[:end])
+        for col, values in zip(self._columns(), bar):
+            col[0] = values[0].item()
+
+    # ==================================================
+    # PUBLIC
+    # ==================================================
+    def update(self, ticks):
+        """
+        Fold tick data mới vào các nến
+
+        Args:
+            ticks: DataFrame với columns ['time', 'price', 'volume']
+                   (cửa sổ tick mới nhất từ upstream, có thể chồng lên lần trước)
+
+        Returns:
+            Thời gian mở của nến đầu tiên bị thay đổi (None nếu không có gì mới)
+        """
+        if ticks is None or ticks.empty:
+            return None
+
+        times = pd.DatetimeIndex(pd.to_datetime(ticks['time']))
+        order = None if times.is_monotonic_increasing else np.argsort(times.asi8, kind='stable')
+
+        t = times.as_unit('ns').asi8
+        p = ticks['price'].to_numpy(dtype=np.float64)
+        v = ticks['volume'].to_numpy()
+        v = np.nan_to_num(v) if v.dtype.kind == 'f' else v.astype(np.int64)
+        if order is not None:
+            t, p, v = t[order], p[order], v[order]
+            times = times[order]
+
+        first_count = int(np.searchsorted(t, t[0], 'right'))
+
+        rebuild = (
+            self.last_time is None
+            or times.tz != self.tz
+            or t[0] < self.first_time         # cửa sổ mở rộng về quá khứ
+            or t[0] > self.last_time          # không chồng lên lần trước → có thể mất tick
+        )
+        if rebuild:
+            self.reset()
+            self.tz = times.tz
+            self.unit = times.unit
+            self.origin = times[0].normalize().as_unit('ns').value
+            self._fold(t, p, v)
+            changed = self._time[0]
+        else:
+            # Tick mới: sau last_time, hoặc tick trùng last_time nhưng chưa thấy
+            lo = int(np.searchsorted(t, self.last_time, 'left'))
+            hi = int(np.searchsorted(t, self.last_time, 'right'))
+            start = hi - max(hi - lo - self.last_count, 0)
+
+            slid = t[0] > self.first_time or first_count < self.first_count
+            if start == len(t) and not slid:
+                return None
+
+            changed = self._time[-1] if start < len(t) else None
+            if slid:
+                self._slide(t, p, v, start)
+                changed = self._time[0]
+            self._fold(t[start:], p[start:], v[start:])
+
+        self.first_time = int(t[0])
+        self.first_count = first_count
+        self.last_time = int(t[-1])
+        self.last_count = int(len(t) - np.searchsorted(t, t[-1], 'left'))
+        self._frame = None
+        return self._to_timestamp(changed)
+
+    def _to_timestamp(self, ns):
+        if ns is None:
+            return None
+        ts = pd.Timestamp(ns, unit='ns')
+        return ts.tz_localize('UTC').tz_convert(self.tz) if self.tz is not None else ts
+
+    def bars(self, since=None):
+        """
+        DataFrame ['time', 'open', 'high', 'low', 'close', 'volume'] (bản copy)
+
+        Args:
+            since: Chỉ lấy các nến có time >= since (vd kết quả của update)
+        """
+        if self._frame is None:
+            time = pd.DatetimeIndex(np.asarray(self._time, dtype='datetime64[ns]'))
+            if self.tz is not None:
+                time = time.tz_localize('UTC').tz_convert(self.tz)
+            if self.unit:
+                time = time.as_unit(self.unit)
+
+            frame = pd.DataFrame({
+                'time': time,
+                'open': np.asarray(self._open, dtype=np.float64),
+                'high': np.asarray(self._high, dtype=np.float64),
+                'low': np.asarray(self._low, dtype=np.float64),
+                'close': np.asarray(self._close, dtype=np.float64),
+                'volume': np.asarray(self._volume),
+            })
+            self._frame = frame[frame['open'].notna()].reset_index(drop=True)
+        if since is not None:
+            return self._frame[self._frame['time'] >= since].reset_index(drop=True)
+        return self._frame.copy()
+
+
+def roll_up_bars(bars, interval):
+    """
+    Gộp nến nhỏ (vd 1T) thành khung lớn hơn (5T / 15T / 1H)
+    thay vì resample lại từ tick.
+
+    Args:
+        bars: DataFrame ['time', 'open', 'high', 'low', 'close', 'volume']
+        interval: Khung đích, phải là bội của khung nến đầu vào
+    """
+    if bars is None or bars.empty:
+        return bars
+
+    result = bars.set_index('time').resample(interval).agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum',
+    })
+    result = result.dropna().reset_index()
+    return result
@@ -0,0 +1,321 @@
+# providers/capture.py
+"""
+Ghi lại (capture) / phát lại (replay) response upstream
+
+Capture (CAPTURE_ENABLED=true): mỗi response thô của upstream (tick, history,
+khối ngoại, price depth) được ghi append-only, nén gzip, 1 dòng JSON / response:
+
+    {root}/{kind}/{SYMBOL}/{YYYY-MM-DD}.{pid}.jsonl.gz
+    {"ts": 1765766100.123, "kind": "ticks", "symbol": "FPT", "params": {...}, "frame": {...}}
+
+- Request path chỉ đẩy (DataFrame, params) vào queue; serialize + nén + ghi
+  chạy trên 1 thread nền. Queue đầy thì bỏ bản ghi (đếm dropped), không block.
+- Mỗi process 1 file / ngày (pid trong tên) → nhiều worker không ghi chen nhau
+- gzip flush (Z_SYNC_FLUSH) sau mỗi lượt ghi → process chết vẫn đọc được phần đã flush
+
+Replay (REPLAY_ENABLED=true): ReplayMarket đọc lại file capture, dùng thay FakeMarket
+cho FakeVnStockProvider / FakeXnoAPIProvider → gateway, cache, build nến,
+strategy chạy lại đúng code path như lúc ghi.
+"""
+import atexit
+import bisect
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.utils.log_utils import get_logger
+from src.utils.metrics import REGISTRY, CallbackMetric
+from src.utils.safe_path import child_path, safe_symbol
+from src.utils.trading_calendar import MARKET_TZ
+
+log = get_logger(__name__)
+
+
+# ==================================================
+# SERIALIZE
+# ==================================================
+_NAT = np.iinfo(np.int64).min
+
+
+def _dtype(name):
+    try:
+        return pd.api.types.pandas_dtype(name)
+    except TypeError:
+        # Timezone offset cố định không parse lại được → giữ UTC
+        return None
+
+
+def encode_frame(df):
+    """DataFrame → dict cột (datetime lưu int64 ns + dtype gốc để khôi phục đúng timezone)"""
+    if df is None:
+        return None
+    dtypes, data = {}, {}
+    for col in df.columns:
+        series = df[col]
+        dtypes[str(col)] = str(series.dtype)
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            if series.dt.tz is not None:
+                series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+            values = series.to_numpy(dtype="datetime64[ns]")
+            ints = values.astype("int64").astype(object)
+            ints[np.isnat(values)] = None
+            data[str(col)] = ints.tolist()
+        else:
+            data[str(col)] = series.tolist()
+    return {"dtypes": dtypes, "data": data}
+
+
+def decode_frame(frame):
+    if frame is None:
+        return None
+    columns = {}
+    for col, dtype in frame["dtypes"].items():
+        values = frame["data"][col]
+        if dtype.startswith("datetime64"):
+            ints = np.array([_NAT if v is None else v for v in values], dtype="int64")
+            series = pd.Series(ints.view("datetime64[ns]"))
+            tz = getattr(_dtype(dtype), "tz", None)
+            columns[col] = series.dt.tz_localize("UTC").dt.tz_convert(tz) if tz else series
+        else:
+            try:
+                columns[col] = pd.Series(values, dtype=dtype)
+            except (TypeError, ValueError):
+                columns[col] = pd.Series(values)
+    return pd.DataFrame(columns)
+
+
+# ==================================================
+# CAPTURE
+# ==================================================
+class CaptureWriter:
+    """Ghi response upstream vào file gzip JSONL trên thread nền (xem docstring module)"""
+
+    def __init__(self, root=None, queue_size=None, max_open=64):
+        self.root = Path(root or Config.CAPTURE_DIR)
+        self.queue = queue.Queue(maxsize=Config.CAPTURE_QUEUE_SIZE if queue_size is None else queue_size)
+        self.max_open = max_open
+        self.written = 0
+        self.dropped = 0
+        self._files = OrderedDict()
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="upstream-capture", daemon=True)
+                self._thread.start()
+
+    def write(self, kind, symbol, df, **params):
+        """Đẩy 1 response vào queue (không serialize / I/O trên request path)"""
+        if self._thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait((time.time(), kind, symbol, df, params))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Ghi hết queue rồi đóng file"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self.queue.put(None)
+        thread.join()
+
+    def _path(self, kind, symbol, ts):
+        day = pd.Timestamp(ts, unit="s", tz=MARKET_TZ).strftime("%Y-%m-%d")
+        return child_path(self.root, kind, safe_symbol(symbol), f"{day}.{os.getpid()}.jsonl.gz")
+
+    def _file(self, path):
+        handle = self._files.pop(path, None)
+        if handle is None:
+            if len(self._files) >= self.max_open:
+                _, oldest = self._files.popitem(last=False)
+                oldest.close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle = gzip.open(path, "at", encoding="utf-8")
+        self._files[path] = handle
+        return handle
+
+    def _append(self, item):
+        ts, kind, symbol, df, params = item
+        line = json.dumps({
+            "ts": round(ts, 6),
+            "kind": kind,
+            "symbol": symbol,
+            "params": params,
+            "frame": encode_frame(df),
+        }, ensure_ascii=False, default=str)
+        self._file(self._path(kind, symbol, ts)).write(line + "\n")
+        self.written += 1
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            for item in batch:
+                if item is None:
+                    continue
+                try:
+                    self._append(item)
+                except Exception as e:
+                    log.warning("Capture write failed: %s", e, extra={"kind": item[1], "symbol": item[2]})
+            for handle in self._files.values():
+                handle.flush()
+
+            if stop:
+                for handle in self._files.values():
+                    handle.close()
+                self._files.clear()
+                return
+
+
+# Writer dùng chung trong process (None = tắt capture)
+CAPTURE = CaptureWriter() if Config.CAPTURE_ENABLED else None
+
+REGISTRY.register(CallbackMetric(
+    "upstream_capture_records_total",
+    "Số response upstream đã ghi / bị bỏ (queue đầy) ở chế độ capture",
+    ("result",),
+    lambda: [(("written",), CAPTURE.written), (("dropped",), CAPTURE.dropped)] if CAPTURE else [],
+    kind="counter",
+))
+
+
+def record(kind, symbol, df, **params):
+    """Ghi response (nếu đang capture) rồi trả lại nguyên df → bọc được quanh lời gọi upstream"""
+    if CAPTURE is not None and df is not None:
+        CAPTURE.write(kind, symbol, df, **params)
+    return df
+
+
+# ==================================================
+# REPLAY
+# ==================================================
+def read_capture(path):
+    """Các bản ghi của 1 file capture (bỏ qua đoạn cuối hỏng nếu process chết giữa chừng)"""
+    entries = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except (EOFError, OSError) as e:
+        log.warning("Capture file truncated: %s", e, extra={"path": str(path)})
+    return entries
+
+
+class ReplayMarket:
+    """
+    Nguồn dữ liệu cho provider giả lập, đọc từ file capture (cùng interface FakeMarket)
+
+    Mỗi lời gọi trả response cuối cùng đã ghi tại thời điểm replay:
+    - at cố định (REPLAY_AT) → tái hiện đúng dữ liệu lúc phát sinh tín hiệu
+    - không có at → đồng hồ replay chạy từ bản ghi sớm nhất, tốc độ `speed` x thời gian thực
+    """
+
+    def __init__(self, root=None, at=None, speed=None):
+        self.root = Path(root or Config.REPLAY_DIR or Config.CAPTURE_DIR)
+        at = Config.REPLAY_AT if at is None else at
+        self.at = _epoch(at) if at else None
+        self.speed = Config.REPLAY_SPEED if speed is None else speed
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._origin = None
+        self._started = time.time()
+
+    def _load(self, kind, symbol):
+        """(list ts, list bản ghi) của (kind, symbol), sort theo ts, đọc file 1 lần"""
+        key = (kind, safe_symbol(symbol))
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        entries = [
+            entry
+            for path in sorted(child_path(self.root, kind, key[1]).glob("*.jsonl.gz"))
+            for entry in read_capture(path)
+        ]
+        entries.sort(key=lambda e: e["ts"])
+        with self._lock:
+            return self._entries.setdefault(key, ([e["ts"] for e in entries], entries))
+
+    def origin(self):
+        """ts sớm nhất trong thư mục capture (mốc đồng hồ replay)"""
+        if self._origin is None:
+            firsts = []
+            for path in self.root.glob("*/*/*.jsonl.gz"):
+                head = read_capture(path)[:1]
+                firsts += [e["ts"] for e in head]
+            self._origin = min(firsts) if firsts else time.time()
+        return self._origin
+
+    def clock(self):
+        if self.at is not None:
+            return self.at
+        return self.origin() + (time.time() - self._started) * self.speed
+
+    def _visible(self, kind, symbol):
+        stamps, entries = self._load(kind, symbol)
+        return entries[:bisect.bisect_right(stamps, self.clock())]
+
+    @staticmethod
+    def _frame(entry):
+        # Decode 1 lần / bản ghi; frame dùng chung như entry trong TICK_CACHE (chỉ đọc)
+        if "_df" not in entry:
+            entry["_df"] = decode_frame(entry["frame"])
+        return entry["_df"]
+
+    def _latest(self, kind, symbol):
+        entries = self._visible(kind, symbol)
+        return self._frame(entries[-1]) if entries else None
+
+    def intraday(self, symbol, limit):
+        df = self._latest("ticks", symbol)
+        return None if df is None else df.tail(limit).reset_index(drop=True)
+
+    def history(self, symbol, start, end, interval):
+        """Gộp mọi response history cùng interval đã ghi, cắt theo [start, end]"""
+        frames = [
+            self._frame(e) for e in self._visible("history", symbol)
+            if e["params"].get("interval") == interval
+        ]
+        frames = [f for f in frames if f is not None and not f.empty]
+        if not frames:
+            return None
+        df = pd.concat(frames).drop_duplicates("time", keep="last").sort_values("time")
+        time_col = df["time"].dt.tz_localize(None) if df["time"].dt.tz is not None else df["time"]
+        lo, hi = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        return df[(time_col >= lo) & (time_col < hi)].reset_index(drop=True)
+
+    def foreign_trading(self, symbol):
+        return self._latest("foreign_trading", symbol)
+
+    def price_depth(self, symbol):
+        return self._latest("price_depth", symbol)
+
+
+def _epoch(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(MARKET_TZ)
+    return ts.timestamp()
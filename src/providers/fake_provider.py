@@ -0,0 +1,232 @@
+# providers/fake_provider.py
+"""
+Provider giả lập (không gọi vnstock / XNO) cho load test toàn bộ API offline
+
+- FakeMarket: nguồn dữ liệu tất định theo symbol (seed cố định): tick 1 ngày,
+  nến lịch sử, khối ngoại, price depth. Có FAKE_DATA_DIR/<SYMBOL>.csv(.gz)
+  thì phát lại tick đã ghi thay cho tick giả lập.
+- FaultInjector: thêm độ trễ (latency ± jitter) và lỗi ngẫu nhiên (error_rate)
+- FakeVnStockProvider / FakeXnoAPIProvider: chỉ thay lời gọi upstream thô,
+  còn lại (gateway, cache, build nến, retry) đi đúng code path thật
+
+Bật bằng FAKE_PROVIDER=true (Container trả provider giả lập); REPLAY_ENABLED=true
+dùng cùng 2 provider với market = capture.ReplayMarket (response upstream đã ghi).
+"""
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.providers.upstream_gateway import gateway
+from src.providers.vnstock_provider import VnStockProvider
+from src.providers.xnoapi_provider import XnoAPIProvider
+from src.utils.safe_path import child_path, safe_symbol
+from src.utils.synthetic_market import continuous_seconds, round_to_tick, synthetic_candles, synthetic_ticks
+from src.utils.trading_calendar import CALENDAR, market_now, trading_days
+
+
+def _history_freq(interval):
+    """Interval vnstock ('1m', '5m', '1H', '1D', ...) → freq pandas, None = nến ngày"""
+    interval = str(interval).strip()
+    if interval[-1:] == "m":
+        return f"{interval[:-1] or 1}min"
+    if interval[-1:] in ("H", "h"):
+        return f"{interval[:-1] or 1}h"
+    return None
+
+
+# ==================================================
+# DATA
+# ==================================================
+class FakeMarket:
+    """Dữ liệu thị trường giả lập theo symbol, dùng chung cho 2 provider (depth khớp với tick)"""
+
+    FOREIGN_DAYS = 5
+
+    def __init__(self, day=None, ticks=None, seed=None, data_dir=None):
+        self.day = pd.Timestamp(day or Config.FAKE_MARKET_DAY or self._last_trading_day()).normalize()
+        self.n_ticks = Config.FAKE_TICKS if ticks is None else ticks
+        self.seed = Config.FAKE_SEED if seed is None else seed
+        data_dir = Config.FAKE_DATA_DIR if data_dir is None else data_dir
+        self.data_dir = Path(data_dir) if data_dir else None
+        self._ticks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _last_trading_day():
+        return np.busday_offset(market_now().date(), 0, roll="backward", busdaycal=CALENDAR)
+
+    def _seed(self, symbol, *parts):
+        """Seed tất định theo symbol (+ tham số), không phụ thuộc PYTHONHASHSEED"""
+        return zlib.crc32("|".join(map(str, (symbol, *parts))).encode()) ^ self.seed
+
+    def base_price(self, symbol):
+        """Giá tham chiếu 10–100 (nghìn đồng) theo symbol"""
+        return float(round_to_tick(10 + zlib.crc32(symbol.encode()) % 9000 / 100))
+
+    def _recorded(self, symbol):
+        if self.data_dir is None:
+            return None
+        symbol = safe_symbol(symbol)
+        for name in (f"{symbol}.csv", f"{symbol}.csv.gz"):
+            path = child_path(self.data_dir, name)
+            if path.exists():
+                df = pd.read_csv(path)
+                df["time"] = pd.to_datetime(df["time"])
+                return df.sort_values("time", kind="stable").reset_index(drop=True)
+        return None
+
+    def ticks(self, symbol):
+        """Tick cả ngày của symbol (build 1 lần, dùng lại)"""
+        with self._lock:
+            df = self._ticks.get(symbol)
+        if df is not None:
+            return df
+
+        df = self._recorded(symbol)
+        if df is None:
+            df = synthetic_ticks(self.n_ticks, self._seed(symbol), self.base_price(symbol), self.day)
+        with self._lock:
+            return self._ticks.setdefault(symbol, df)
+
+    def intraday(self, symbol, limit):
+        """limit tick mới nhất (như page_size của upstream)"""
+        return self.ticks(symbol).tail(limit).reset_index(drop=True)
+
+    def history(self, symbol, start, end, interval):
+        """Nến OHLCV trong [start, end] theo ngày giao dịch (interval không phải phút / giờ → nến ngày)"""
+        days = trading_days(start, end)
+        if len(days) == 0:
+            return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+
+        seed = self._seed(symbol, interval, start)
+        freq = _history_freq(interval)
+        if freq is None:
+            df = synthetic_candles(len(days), seed, self.base_price(symbol), tz=None)
+            df["time"] = pd.DatetimeIndex(days.astype("datetime64[ns]"))
+            return df
+
+        per_day = len(continuous_seconds(days[0])[::int(pd.Timedelta(freq).total_seconds())])
+        return synthetic_candles(len(days) * per_day, seed, self.base_price(symbol), start=days[0], tz=None, freq=freq)
+
+    def foreign_trading(self, symbol):
+        """Mua / bán khối ngoại theo ngày (FOREIGN_DAYS ngày giao dịch gần nhất)"""
+        rng = np.random.default_rng(self._seed(symbol, "foreign"))
+        days = np.busday_offset(self.day.date(), np.arange(1 - self.FOREIGN_DAYS, 1), roll="backward", busdaycal=CALENDAR)
+        buy = rng.geometric(1 / 500, size=len(days)) * 100
+        sell = rng.geometric(1 / 500, size=len(days)) * 100
+        price = self.base_price(symbol) * 1000
+        return pd.DataFrame({
+            "time": pd.DatetimeIndex(days.astype("datetime64[ns]")).strftime("%Y-%m-%d"),
+            "symbol": symbol,
+            "buy_volume": buy,
+            "sell_volume": sell,
+            "net_volume": buy - sell,
+            "buy_value": buy * price,
+            "sell_value": sell * price,
+            "net_value": (buy - sell) * price,
+        })
+
+    def price_depth(self, symbol):
+        """Khối lượng khớp tích lũy theo bước giá, tính từ tick của ngày"""
+        ticks = self.ticks(symbol)
+        side = ticks["match_type"] if "match_type" in ticks else pd.Series("", index=ticks.index)
+        volume = ticks["volume"]
+        df = pd.DataFrame({
+            "price": ticks["price"],
+            "acc_volume": volume,
+            "acc_buy_volume": volume.where(side == "Buy", 0),
+            "acc_sell_volume": volume.where(side == "Sell", 0),
+            "acc_undefined_volume": volume.where(~side.isin(["Buy", "Sell"]), 0),
+        })
+        return df.groupby("price", sort=True).sum().reset_index().sort_values("price", ascending=False)
+
+
+class FaultInjector:
+    """
+    Giả lập upstream chậm / chập chờn cho func: ngủ latency ± jitter giây,
+    raise ConnectionError với xác suất error_rate (retry / breaker xử lý như lỗi thật)
+    """
+
+    def __init__(self, latency=None, jitter=None, error_rate=None, seed=None):
+        self.latency = Config.FAKE_LATENCY if latency is None else latency
+        self.jitter = Config.FAKE_LATENCY_JITTER if jitter is None else jitter
+        self.error_rate = Config.FAKE_ERROR_RATE if error_rate is None else error_rate
+        self._rng = random.Random(Config.FAKE_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, func, *args, **kwargs):
+        with self._lock:
+            delay = max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0.0)
+            failed = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise ConnectionError("fake upstream: injected error")
+        return func(*args, **kwargs)
+
+
+# ==================================================
+# PROVIDERS
+# ==================================================
+class FakeVnStockProvider(VnStockProvider):
+    """VnStockProvider đọc FakeMarket; fetch vẫn qua gateway vnstock + TICK_CACHE + BarAggregator"""
+
+    # Không gọi upstream thật → backtest được cả khi không có HistoryStore
+    offline = True
+
+    def __init__(self, market=None, faults=None, source="FAKE"):
+        self.source = source
+        self.client = None
+        # Không ghi nến giả lập vào HistoryStore thật
+        self.store = None
+        self.gateway = gateway("vnstock")
+        self.market = market or FakeMarket()
+        self.faults = faults or FaultInjector()
+
+    def _fetch_ticks(self, symbol, limit):
+        df = self.gateway.call(self.faults, self.market.intraday, symbol, limit)
+        if df is None or df.empty:
+            return None
+        return limit, df
+
+    def _fetch_history(self, symbol, start, end, interval):
+        return self.gateway.call(self.faults, self.market.history, symbol, start, end, interval)
+
+
+class FakeXnoAPIProvider(XnoAPIProvider):
+    """XnoAPIProvider đọc FakeMarket (không cần XNOAPI_KEY); qua gateway xno + FOREIGN / DEPTH cache"""
+
+    def __init__(self, market=None, faults=None, retry=None):
+        self.retry = retry
+        self.gateway = gateway("xno")
+        self.market = market or FakeMarket()
+        self.faults = faults or FaultInjector()
+
+    def _quote_intraday(self, symbol, limit):
+        return self.faults(self.market.intraday, symbol, limit)
+
+    def _quote_history(self, symbol, start, end, interval):
+        return self.faults(self.market.history, symbol, start, end, interval)
+
+    def _quote_foreign_trading(self, symbol):
+        return self.faults(self.market.foreign_trading, symbol)
+
+    def _quote_price_depth(self, symbol):
+        return self.faults(self.market.price_depth, symbol)
+
+    def derivatives_hist(self, symbol, frequency="1M"):
+        freq = frequency[:-1] + ("m" if frequency[-1:] == "M" else frequency[-1:])
+        day = self.market.day
+        return self._retry(self._quote_history, symbol, day, day, freq)
+
+    def company_info(self, symbol):
+        return {}
+
+    def finance_info(self, symbol):
+        return {}
@@ -0,0 +1,210 @@
+# providers/history_store.py
+import json
+import os
+import shutil
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.utils.safe_path import child_path, safe_interval, safe_symbol
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+MARKET_TZ = "Asia/Ho_Chi_Minh"
+
+
+def _to_date(value):
+    return pd.Timestamp(value).date()
+
+
+def _month_key(d):
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _months(start, end):
+    """Các partition tháng 'YYYY-MM' trong [start, end]"""
+    return [_month_key(p) for p in pd.period_range(start, end, freq="M")]
+
+
+class HistoryStore:
+    """
+    Lưu nến lịch sử trên đĩa, dạng cột (.npy) theo symbol / interval / tháng
+
+        {root}/{symbol}/{interval}/{YYYY-MM}/time.npy, open.npy, ..., volume.npy
+        {root}/{symbol}/{interval}/coverage.json   ← các khoảng ngày đã fetch đủ
+
+    - Đọc: chỉ mở partition tháng giao với khoảng cần (partition pruning),
+      np.load(mmap_mode="r") + searchsorted trên cột time → không đọc cả file
+    - Coverage theo ngày (gồm ngày nghỉ) → biết chính xác khoảng còn thiếu
+      để chỉ fetch phần đó từ upstream
+    - Chỉ lưu ngày đã chốt (trading_calendar.closed_through); nến trong phiên luôn fetch lại
+    - time lưu int64 ns, giờ địa phương (naive) như vnstock trả về
+    """
+
+    columns = list(COLUMNS)
+
+    def __init__(self, root=None):
+        self.root = Path(root or Config.HISTORY_STORE_DIR)
+        self._lock = threading.RLock()
+
+    def _dir(self, symbol, interval):
+        # symbol / interval đến từ query → chỉ nhận giá trị hợp lệ, không cho thoát khỏi root
+        return child_path(self.root, safe_symbol(symbol), safe_interval(interval))
+
+    # ==================================================
+    # COVERAGE
+    # ==================================================
+    def coverage(self, symbol, interval):
+        """List khoảng ngày [start, end] (date, gồm 2 đầu) đã có đủ dữ liệu"""
+        path = self._dir(symbol, interval) / "coverage.json"
+        with self._lock:
+            if not path.exists():
+                return []
+            return [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in json.loads(path.read_text())]
+
+    def _save_coverage(self, symbol, interval, ranges):
+        path = self._dir(symbol, interval) / "coverage.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps([[s.isoformat(), e.isoformat()] for s, e in ranges]))
+        os.replace(tmp, path)
+
+    def mark_covered(self, symbol, interval, start, end):
+        """Gộp [start, end] vào coverage (khoảng liền kề / chồng nhau được nối lại)"""
+        start, end = _to_date(start), _to_date(end)
+        if end < start:
+            return
+        with self._lock:
+            ranges = sorted(self.coverage(symbol, interval) + [(start, end)])
+            merged = [ranges[0]]
+            for s, e in ranges[1:]:
+                last_s, last_e = merged[-1]
+                if s <= last_e + timedelta(days=1):
+                    merged[-1] = (last_s, max(last_e, e))
+                else:
+                    merged.append((s, e))
+            self._save_coverage(symbol, interval, merged)
+
+    def missing(self, symbol, interval, start, end):
+        """Các khoảng ngày trong [start, end] chưa có trong coverage"""
+        start, end = _to_date(start), _to_date(end)
+        gaps = []
+        cursor = start
+        for s, e in self.coverage(symbol, interval):
+            if e < cursor:
+                continue
+            if s > end:
+                break
+            if s > cursor:
+                gaps.append((cursor, s - timedelta(days=1)))
+            cursor = max(cursor, e + timedelta(days=1))
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    # ==================================================
+    # PARTITIONS
+    # ==================================================
+    def _read_partition(self, path, lo=None, hi=None):
+        """Cột của 1 partition (mmap), cắt theo time trong [lo, hi) nếu có"""
+        arrays = {col: np.load(path / f"{col}.npy", mmap_mode="r") for col in COLUMNS}
+        times = arrays["time"]
+        i = 0 if lo is None else int(np.searchsorted(times, lo, side="left"))
+        j = len(times) if hi is None else int(np.searchsorted(times, hi, side="left"))
+        return {col: values[i:j] for col, values in arrays.items()}
+
+    def _write_partition(self, path, columns):
+        """Ghi partition vào thư mục tạm rồi đổi tên → reader không thấy partition ghi dở"""
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for col in COLUMNS:
+            np.save(tmp / f"{col}.npy", np.ascontiguousarray(columns[col]))
+
+        old = path.with_name(path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def _to_columns(df):
+        times = pd.to_datetime(df["time"])
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert(MARKET_TZ).dt.tz_localize(None)
+        out = {"time": times.to_numpy(dtype="datetime64[ns]").view(np.int64)}
+        for col in COLUMNS[1:-1]:
+            out[col] = df[col].to_numpy(dtype=np.float64)
+        # volume giữ kiểu nguyên nếu upstream trả số nguyên
+        volume = df["volume"].to_numpy()
+        out["volume"] = volume.astype(np.int64) if volume.dtype.kind in "iu" else volume.astype(np.float64)
+        return out
+
+    # ==================================================
+    # READ / WRITE
+    # ==================================================
+    def write(self, symbol, interval, df):
+        """Merge nến vào các partition tháng (trùng time → giữ bản mới)"""
+        if df is None or df.empty:
+            return 0
+
+        new = self._to_columns(df)
+        months = pd.DatetimeIndex(new["time"]).strftime("%Y-%m").to_numpy()
+        base = self._dir(symbol, interval)
+
+        with self._lock:
+            for month in np.unique(months):
+                mask = months == month
+                path = base / month
+                parts = [{col: new[col][mask] for col in COLUMNS}]
+                if path.exists():
+                    parts.insert(0, {col: np.asarray(v) for col, v in self._read_partition(path).items()})
+
+                merged = {col: np.concatenate([p[col] for p in parts]) for col in COLUMNS}
+                # Giữ bản ghi cuối cho mỗi time (bản mới ghi sau)
+                order = np.argsort(merged["time"], kind="stable")
+                times = merged["time"][order]
+                keep = np.append(times[1:] != times[:-1], True)
+                self._write_partition(path, {col: merged[col][order][keep] for col in COLUMNS})
+        return len(df)
+
+    def read(self, symbol, interval, start, end):
+        """
+        Nến trong [start, end] (ngày, gồm 2 đầu)
+
+        Returns:
+            DataFrame ['time', 'open', 'high', 'low', 'close', 'volume'] (có thể rỗng)
+        """
+        start, end = _to_date(start), _to_date(end)
+        lo = np.datetime64(start, "ns").astype(np.int64)
+        hi = np.datetime64(end + timedelta(days=1), "ns").astype(np.int64)
+        base = self._dir(symbol, interval)
+
+        chunks = []
+        with self._lock:
+            for month in _months(start, end):
+                path = base / month
+                if path.exists():
+                    chunks.append(self._read_partition(path, lo, hi))
+
+        if not chunks:
+            return pd.DataFrame(columns=list(COLUMNS))
+
+        data = {col: np.concatenate([c[col] for c in chunks]) for col in COLUMNS}
+        df = pd.DataFrame({col: data[col] for col in COLUMNS[1:]})
+        df.insert(0, "time", data["time"].view("datetime64[ns]"))
+        return df
+
+    def stats(self):
+        symbols = [p for p in self.root.iterdir() if p.is_dir()] if self.root.exists() else []
+        files = list(self.root.rglob("*.npy")) if self.root.exists() else []
+        return {
+            "root": str(self.root),
+            "symbols": len(symbols),
+            "partitions": len({f.parent for f in files}),
+            "bytes": sum(f.stat().st_size for f in files),
+        }
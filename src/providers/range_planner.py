@@ -0,0 +1,126 @@
+# providers/range_planner.py
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.config import Config
+from src.utils.log_utils import bind_context, get_logger, log_upstream_error
+from src.utils.trading_calendar import closed_through, market_now, trading_span
+
+log = get_logger(__name__)
+
+# Pool riêng cho fetch khoảng thiếu: load() có thể đang chạy trên
+# UPSTREAM_EXECUTOR, submit vào chính pool đó rồi chờ dễ bị kẹt khi pool đầy
+HISTORY_FETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=Config.HISTORY_FETCH_WORKERS,
+    thread_name_prefix="history-fetch"
+)
+
+
+class RangePlanner:
+    """
+    Lập kế hoạch fetch history dựa trên HistoryStore
+
+    - Khoảng ngày chưa có trong coverage → cắt theo lịch giao dịch:
+      khoảng chỉ gồm cuối tuần / nghỉ lễ đánh dấu đã có, không fetch;
+      khoảng còn lại thu về ngày giao dịch đầu / cuối
+    - Các khoảng cần fetch chạy song song, ngày đã chốt (closed_through:
+      trước hôm nay, hoặc cả hôm nay khi đã hết phiên) merge vào store
+    - Chỉ đánh dấu đã có tới ngày cuối upstream thực sự trả dữ liệu
+      (response rỗng / thiếu đuôi không thành lỗ vĩnh viễn)
+    """
+
+    def __init__(self, store, executor=None):
+        self.store = store
+        self.executor = executor or HISTORY_FETCH_EXECUTOR
+
+    def plan(self, symbol, interval, start, end, now=None):
+        """
+        Args:
+            now: Giờ thị trường hiện tại (mặc định market_now())
+
+        Returns:
+            dict fetch: [(start, end, gap)] khoảng cần gọi upstream (date) + gap gốc,
+                 skip: [(start, end)] khoảng không có ngày giao dịch
+        """
+        today = (now or market_now()).date()
+        fetch, skip = [], []
+        for gap_start, gap_end in self.store.missing(symbol, interval, start, end):
+            # Tương lai chưa có dữ liệu
+            if gap_start > today:
+                continue
+            span = trading_span(gap_start, min(gap_end, today))
+            if span is None:
+                skip.append((gap_start, gap_end))
+            else:
+                fetch.append((span[0], span[1], (gap_start, gap_end)))
+        return {"fetch": fetch, "skip": skip}
+
+    def _cover(self, symbol, interval, gap_start, gap_end, final):
+        """Chỉ ngày đã chốt (<= final) được coi là bất biến"""
+        self.store.mark_covered(symbol, interval, gap_start, min(gap_end, final))
+
+    def load(self, symbol, interval, start, end, fetch, now=None):
+        """
+        Đọc [start, end] từ store, fetch song song các khoảng còn thiếu
+
+        Args:
+            fetch: Hàm (symbol, start_iso, end_iso, interval) → DataFrame upstream
+
+        Returns:
+            (DataFrame, plan)
+        """
+        now = now or market_now()
+        final = closed_through(now)
+        plan = self.plan(symbol, interval, start, end, now)
+
+        try:
+            for gap_start, gap_end in plan["skip"]:
+                self._cover(symbol, interval, gap_start, gap_end, final)
+        except OSError as e:
+            log.warning("History store write failed: %s", e, extra={"symbol": symbol, "interval": interval})
+
+        def run(item):
+            fetch_start, fetch_end, _ = item
+            log.debug("History: fetching range", extra={
+                "symbol": symbol, "start": fetch_start, "end": fetch_end, "interval": interval,
+            })
+            return fetch(symbol, fetch_start.isoformat(), fetch_end.isoformat(), interval)
+
+        futures = [(item, self.executor.submit(bind_context(run, item))) for item in plan["fetch"]]
+
+        live = []
+        for (_, fetch_end, (gap_start, gap_end)), future in futures:
+            try:
+                df = future.result()
+            except Exception as e:
+                # Lỗi 1 khoảng: vẫn trả phần đã có trong store
+                log_upstream_error(
+                    log, "history_range", e, symbol=symbol, start=gap_start, end=gap_end, interval=interval
+                )
+                continue
+
+            if df is None or df.empty:
+                # Upstream trả rỗng (có thể chỉ chập chờn) → không đánh dấu, lần sau fetch lại
+                log.info("History: empty range, not marked covered", extra={
+                    "symbol": symbol, "start": gap_start, "end": gap_end, "interval": interval,
+                })
+                continue
+
+            days = pd.to_datetime(df["time"]).dt.date
+            try:
+                self.store.write(symbol, interval, df[days <= final])
+                # Chỉ coi là đủ tới ngày cuối có dữ liệu; có tới ngày giao dịch cuối của gap
+                # thì phủ luôn phần nghỉ phía sau gap
+                last = days.max()
+                self._cover(symbol, interval, gap_start, gap_end if last >= fetch_end else last, final)
+            except OSError as e:
+                # Đĩa read-only / đầy: vẫn trả dữ liệu vừa fetch, lần sau fetch lại
+                log.warning("History store write failed: %s", e, extra={"symbol": symbol, "interval": interval})
+                live.append(df.loc[days <= final, self.store.columns])
+            live.append(df.loc[days > final, self.store.columns])
+
+        df = self.store.read(symbol, interval, start, end)
+        if live:
+            df = pd.concat([df] + live, ignore_index=True)
+        return df, plan
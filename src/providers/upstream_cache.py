@@ -0,0 +1,195 @@
+# providers/upstream_cache.py
+import threading
+import weakref
+
+from cachetools import TLRUCache
+
+from src.utils.metrics import REGISTRY, CallbackMetric
+
+# Mọi UpstreamCache trong process (cho /metrics)
+CACHES = weakref.WeakValueDictionary()
+
+
+class _CountingTLRUCache(TLRUCache):
+    """TLRUCache đếm số item bị evict (LRU khi đầy) và số item hết hạn"""
+
+    def __init__(self, maxsize, ttu, owner):
+        super().__init__(maxsize, ttu)
+        self._owner = owner
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._owner.evictions += 1
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time) or []
+        if expired:
+            self._owner.expirations += len(expired)
+        return expired
+
+
+class _Flight:
+    """Một lần fetch upstream đang chạy, các request khác cùng key chờ kết quả"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class UpstreamCache:
+    """
+    Cache in-process cho dữ liệu upstream (vnstock / XNO)
+    - TTL theo từng entry (mặc định = ttl của cache)
+    - Giới hạn kích thước, evict theo LRU
+    - Single-flight: nhiều miss đồng thời cho cùng key chỉ gọi upstream 1 lần
+    - Counter hits / misses / evictions để sizing
+    """
+
+    def __init__(self, name, maxsize=256, ttl=2.0):
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._cache = _CountingTLRUCache(
+            maxsize,
+            ttu=lambda key, entry, now: now + entry[1],
+            owner=self,
+        )
+        CACHES[name] = self
+
+    # ==================================================
+    # BASIC
+    # ==================================================
+    def get(self, key, accept=None):
+        """Trả về value còn hạn hoặc None (có đếm hit/miss)"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and (accept is None or accept(entry[0])):
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl=None):
+        if value is None:
+            return
+        with self._lock:
+            self._cache[key] = (value, self.ttl if ttl is None else ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    # ==================================================
+    # SINGLE-FLIGHT
+    # ==================================================
+    def get_or_load(self, key, loader, ttl=None, accept=None):
+        """
+        Lấy value từ cache, nếu miss thì gọi loader()
+
+        Args:
+            key: Khóa cache, vd (symbol, source)
+            loader: Hàm không tham số gọi upstream, trả về None nếu không có data
+            ttl: TTL riêng cho entry này (giây)
+            accept: Hàm kiểm tra value trong cache còn dùng được không
+                    (vd cache 100 ticks nhưng request cần 1000)
+
+        None không được cache. Lỗi từ loader được raise cho mọi request đang chờ.
+        """
+        while True:
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None and (accept is None or accept(entry[0])):
+                    self.hits += 1
+                    return entry[0]
+
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    self.misses += 1
+                    flight = _Flight()
+                    self._inflight[key] = flight
+
+            if leader:
+                return self._load(key, flight, loader, ttl)
+
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.value is None or accept is None or accept(flight.value):
+                with self._lock:
+                    self.hits += 1
+                return flight.value
+            # Kết quả của flight không đủ cho request này → tự fetch lại
+
+    def _load(self, key, flight, loader, ttl):
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if flight.error is None and flight.value is not None:
+                    self._cache[key] = (flight.value, self.ttl if ttl is None else ttl)
+            flight.event.set()
+        return flight.value
+
+    # ==================================================
+    # STATS
+    # ==================================================
+    def stats(self):
+        with self._lock:
+            self._cache.expire()
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "inflight": len(self._inflight),
+            }
+
+
+# ==================================================
+# METRICS
+# ==================================================
+def _cache_metric(field):
+    def collect():
+        for name, cache in sorted(CACHES.items()):
+            yield (name,), (len(cache._cache) if field == "size" else getattr(cache, field))
+    return collect
+
+
+for _field, _kind, _help in (
+    ("size", "gauge", "Số entry đang có trong cache"),
+    ("hits", "counter", "Số lần cache hit"),
+    ("misses", "counter", "Số lần cache miss"),
+    ("evictions", "counter", "Số entry bị evict (LRU)"),
+):
+    REGISTRY.register(CallbackMetric(
+        f"upstream_cache_{_field}" + ("_total" if _kind == "counter" else ""),
+        _help,
+        ("cache",),
+        _cache_metric(_field),
+        kind=_kind,
+    ))
@@ -0,0 +1,331 @@
+# providers/upstream_gateway.py
+import functools
+import itertools
+import random
+import threading
+import time
+
+from src.config import Config
+from src.utils.metrics import REGISTRY, UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_SECONDS, CallbackMetric
+from src.utils.safe_path import InvalidInputError
+
+
+class CircuitOpenError(RuntimeError):
+    """Upstream đang lỗi liên tục → từ chối ngay, không gọi / không retry"""
+
+
+class RateLimitTimeout(RuntimeError):
+    """Chờ token quá UPSTREAM_ACQUIRE_TIMEOUT → bỏ request thay vì xếp hàng vô hạn"""
+
+
+# Lỗi đã biết là do request (không phải upstream hỏng)
+INPUT_ERRORS = (InvalidInputError,)
+# HTTP 4xx là lỗi request, trừ 408 (timeout) / 429 (upstream quá tải)
+UPSTREAM_4XX = frozenset({408, 429})
+
+
+def is_upstream_failure(error):
+    """
+    Mặc định mọi lỗi là lỗi upstream (vnstock / xnoapi hay raise Exception, KeyError,
+    ValueError khi upstream trả trang HTML lỗi / payload rỗng), trừ lỗi input đã biết:
+    INPUT_ERRORS (symbol / interval sai) và HTTP 4xx. Lỗi input không tính vào breaker,
+    không retry.
+    """
+    if isinstance(error, (CircuitOpenError, RateLimitTimeout) + INPUT_ERRORS):
+        return False
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in UPSTREAM_4XX:
+        return False
+    return True
+
+
+def is_retryable(error):
+    return is_upstream_failure(error)
+
+
+def backoff_delay(attempt, base_delay=None, max_delay=None):
+    """Exponential backoff + full jitter cho lần retry thứ attempt (0, 1, ...)"""
+    base_delay = Config.UPSTREAM_RETRY_BASE_DELAY if base_delay is None else base_delay
+    max_delay = Config.UPSTREAM_RETRY_MAX_DELAY if max_delay is None else max_delay
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_delay(error, attempt, retries=None):
+    """
+    Chính sách retry chung cho UpstreamGateway.retry (sync) và retry_async:
+    tối đa `retries` (mặc định UPSTREAM_RETRY) lần, chỉ lỗi upstream (is_retryable),
+    chờ backoff_delay(attempt). Trả về số giây chờ trước lần thử kế, None → raise.
+    """
+    retries = Config.UPSTREAM_RETRY if retries is None else retries
+    if attempt >= retries or not is_retryable(error):
+        return None
+    return backoff_delay(attempt)
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` request / giây, cho phép burst tối đa `burst`
+
+    Mỗi acquire() đặt trước 1 token (token có thể âm = hàng chờ),
+    rồi sleep ngoài lock đúng thời gian tới lượt → FIFO, không busy-wait.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None):
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                self.rejected += 1
+                raise RateLimitTimeout(f"Rate limit: phải chờ {wait:.2f}s > {timeout}s")
+            self.tokens -= 1
+            self.acquired += 1
+            self.wait_seconds += wait
+            if wait:
+                self.waiting += 1
+
+        if wait:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        return wait
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "queue_depth": self.waiting,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class CircuitBreaker:
+    """
+    closed    → gọi bình thường, đếm lỗi liên tiếp
+    open      → sau failure_threshold lỗi liên tiếp: fail fast trong reset_timeout giây
+    half_open → hết reset_timeout: cho 1 request thử, thành công thì closed, lỗi thì open lại
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self.short_circuited = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(f"{self.name} upstream unavailable, retry in {remaining:.1f}s")
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.short_circuited += 1
+                    raise CircuitOpenError(f"{self.name} upstream probing, retry later")
+                self._probing = True
+
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opens": self.opens,
+                "short_circuited": self.short_circuited,
+            }
+
+
+class UpstreamGateway:
+    """
+    Cửa ngõ chung cho 1 upstream (vnstock / XNO), dùng chung mọi provider trong process
+
+    call(func) = circuit breaker (fail fast) → token bucket (giới hạn QPS) → func
+    → upstream sập không kéo mọi request chờ hết chuỗi retry,
+      tải tăng không khuếch đại thành bão request lên upstream
+    """
+
+    def __init__(self, name, rate, burst, failure_threshold=None, reset_timeout=None, acquire_timeout=None):
+        self.name = name
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(
+            name,
+            Config.BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold,
+            Config.BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout,
+        )
+        self.acquire_timeout = Config.UPSTREAM_ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        try:
+            self.breaker.before()
+        except CircuitOpenError:
+            UPSTREAM_ERRORS.inc(self.name, "CircuitOpenError")
+            raise
+        try:
+            self.limiter.acquire(self.acquire_timeout)
+        except RateLimitTimeout:
+            # Không gọi upstream → không tính là lỗi, trả lại lượt probe (half_open)
+            self.breaker.release()
+            UPSTREAM_ERRORS.inc(self.name, "RateLimitTimeout")
+            raise
+
+        with self._lock:
+            self.calls += 1
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, self.name)
+            UPSTREAM_ERRORS.inc(self.name, type(e).__name__)
+            with self._lock:
+                self.errors += 1
+            if is_upstream_failure(e):
+                self.breaker.failure()
+            else:
+                # Lỗi input: upstream không có lỗi → chỉ trả lại lượt probe (half_open)
+                self.breaker.release()
+            raise
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, self.name)
+        self.breaker.success()
+        return result
+
+    def retry(self, func, *args, retries=None, **kwargs):
+        """call() với retry (sync), chính sách retry_delay"""
+        for attempt in itertools.count():
+            try:
+                return self.call(func, *args, **kwargs)
+            except Exception as e:
+                delay = retry_delay(e, attempt, retries)
+                if delay is None:
+                    raise
+                UPSTREAM_RETRIES.inc(self.name)
+                time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            calls, errors = self.calls, self.errors
+        return {
+            "name": self.name,
+            "calls": calls,
+            "errors": errors,
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats(),
+        }
+
+
+GATEWAYS = {
+    "vnstock": UpstreamGateway("vnstock", Config.VNSTOCK_RATE_LIMIT, Config.VNSTOCK_RATE_BURST),
+    "xno": UpstreamGateway("xno", Config.XNO_RATE_LIMIT, Config.XNO_RATE_BURST),
+}
+
+
+def gateway(name):
+    return GATEWAYS[name]
+
+
+def install_http_timeout(timeout):
+    """
+    Timeout mặc định cho mọi HTTP request (requests) không tự đặt timeout
+
+    vnstock / xnoapi gọi requests không có timeout → upstream treo thì thread
+    (scan, UPSTREAM_EXECUTOR) bị giữ vô hạn; future.cancel() không dừng được.
+    Hết timeout requests raise Timeout (OSError) → tính là lỗi upstream như thường.
+    """
+    try:
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return False
+
+    send = getattr(HTTPAdapter.send, "__wrapped__", HTTPAdapter.send)
+    if not timeout or timeout <= 0:
+        HTTPAdapter.send = send
+        return False
+
+    default = timeout
+
+    @functools.wraps(send)
+    def send_with_timeout(self, request, timeout=None, **kwargs):
+        return send(self, request, timeout=default if timeout is None else timeout, **kwargs)
+
+    HTTPAdapter.send = send_with_timeout
+    return True
+
+
+install_http_timeout(Config.UPSTREAM_HTTP_TIMEOUT)
+
+
+def _gateway_gauge(value):
+    return lambda: [((name,), value(g)) for name, g in GATEWAYS.items()]
+
+
+REGISTRY.register(CallbackMetric(
+    "upstream_limiter_queue_depth",
+    "Số request đang chờ token rate limit",
+    ("upstream",),
+    _gateway_gauge(lambda g: g.limiter.waiting),
+))
+REGISTRY.register(CallbackMetric(
+    "upstream_breaker_open",
+    "1 nếu circuit breaker đang open / half_open",
+    ("upstream",),
+    _gateway_gauge(lambda g: int(g.breaker.state != CircuitBreaker.CLOSED)),
+))
@@ -1,6 +1,9 @@
 from vnstock import Vnstock
+from cachetools import LRUCache
 import pandas as pd
+import logging
 import sys
+import threading
 from pathlib import Path
 
 # Add project root to path when running directly
@@ -9,6 +12,37 @@ if __name__ == "__main__":
     sys.path.insert(0, str(project_root))
 
 from src.config import Config
+from src.providers.capture import record
+from src.providers.upstream_cache import UpstreamCache
+from src.providers.history_store import HistoryStore
+from src.providers.range_planner import RangePlanner
+from src.providers.upstream_gateway import gateway
+from src.utils.log_utils import get_logger, log_upstream_error
+from src.utils.metrics import REGISTRY, CallbackMetric, stage
+from src.utils.trading_calendar import cache_ttl
+from src.providers.bar_aggregator import BarAggregator, interval_to_ns, roll_up_bars, supports_interval
+
+log = get_logger(__name__)
+
+# Cache tick dùng chung cho mọi instance VnStockProvider trong process
+TICK_CACHE = UpstreamCache(
+    "ticks",
+    maxsize=Config.TICK_CACHE_MAXSIZE,
+    ttl=Config.TICK_CACHE_TTL,
+)
+
+# Store nến lịch sử trên đĩa, dùng chung cho mọi instance (None = tắt)
+HISTORY_STORE = HistoryStore() if Config.HISTORY_STORE_ENABLED else None
+
+# Bộ build nến incremental theo (symbol, source, interval, limit)
+BAR_AGGREGATORS = LRUCache(maxsize=Config.BAR_AGGREGATOR_MAXSIZE)
+_BAR_AGGREGATORS_LOCK = threading.Lock()
+REGISTRY.register(CallbackMetric(
+    "bar_aggregators",
+    "Số BarAggregator đang giữ trạng thái nến",
+    (),
+    lambda: [((), len(BAR_AGGREGATORS))],
+))
 
 
 class VnStockProvider:
@@ -18,9 +52,11 @@ class VnStockProvider:
     - History: Sử dụng data có sẵn
     """
 
-    def __init__(self, source=Config.DEFAULT_SOURCE):
+    def __init__(self, source=Config.DEFAULT_SOURCE, store=HISTORY_STORE):
         self.source = source
         self.client = Vnstock()
+        self.store = store
+        self.gateway = gateway("vnstock")
 
     def _build_ohlc_from_ticks(self, df, interval='1T'):
         """
@@ -65,6 +101,66 @@ class VnStockProvider:
 
         return result
 
+    def _build_ohlc_incremental(self, symbol, limit, df, interval='1T'):
+        """
+        Build nến OHLC bằng BarAggregator: chỉ fold tick mới từ lần gọi trước
+        Output giống _build_ohlc_from_ticks, fallback về resample nếu interval
+        không chia hết 1 ngày.
+        """
+        with stage("ohlc_build"):
+            if not supports_interval(interval):
+                return self._build_ohlc_from_ticks(df, interval)
+
+            key = (symbol, self.source, interval, limit)
+            with _BAR_AGGREGATORS_LOCK:
+                aggregator = BAR_AGGREGATORS.get(key)
+                if aggregator is None:
+                    aggregator = BarAggregator(interval)
+                    BAR_AGGREGATORS[key] = aggregator
+
+            with aggregator.lock:
+                aggregator.update(df)
+                return aggregator.bars()
+
+    def _fetch_ticks(self, symbol, limit):
+        """Gọi vnstock lấy tick data (không qua cache), qua gateway vnstock"""
+        df = self.gateway.call(
+            lambda: self.client.stock(
+                symbol=symbol, source=self.source
+            ).quote.intraday(
+                symbol=symbol,
+                page_size=limit,
+                show_log=False
+            )
+        )
+        record("ticks", symbol, df, limit=limit, source=self.source)
+        if df is None or df.empty:
+            return None
+        return limit, df
+
+    def _ticks(self, symbol, limit):
+        """
+        Lấy tick data qua TICK_CACHE theo (symbol, source)
+
+        Entry trong cache đủ dùng nếu đã fetch với page_size >= limit,
+        khi đó chỉ cắt lấy `limit` tick mới nhất.
+        """
+        cached = TICK_CACHE.get_or_load(
+            (symbol, self.source),
+            lambda: self._fetch_ticks(symbol, limit),
+            ttl=cache_ttl(Config.TICK_CACHE_TTL),
+            accept=lambda entry: entry[0] >= limit,
+        )
+        if cached is None:
+            return None
+
+        cached_limit, df = cached
+        if cached_limit > limit and len(df) > limit:
+            if not df['time'].is_monotonic_increasing:
+                df = df.sort_values('time', kind='stable')
+            df = df.tail(limit)
+        return df
+
     def intraday(self, symbol, limit, interval='1T'):
         """
         Lấy dữ liệu intraday và build OHLC
@@ -78,80 +174,140 @@ class VnStockProvider:
             DataFrame với columns ['time', 'open', 'high', 'low', 'close', 'volume']
         """
         try:
-            print(f"[Intraday] Fetching {symbol} (limit={limit}, interval={interval})")
-            
-            # Get tick data
-            df = self.client.stock(
-                symbol=symbol, source=self.source
-            ).quote.intraday(
-                symbol=symbol,
-                page_size=limit,
-                show_log=False
-            )
-
-            if df is None or df.empty:
-                print(f"[Intraday] No data for {symbol}")
-                return None
-
-            print(f"[Intraday] Got {len(df)} ticks")
-            print(f"[Intraday] Columns: {df.columns.tolist()}")
+            # Get tick data (qua cache)
+            df = self._ticks(symbol, limit)
+            return self.candles_from_ticks(symbol, limit, df, interval)
 
-            # Validate required columns
-            if 'time' not in df.columns or 'price' not in df.columns:
-                print(f"[Intraday] Missing required columns")
-                return None
+        except Exception as e:
+            log_upstream_error(log, "intraday", e, exc_info=True, symbol=symbol, interval=interval)
+            return None
 
-            # Build OHLC từ ticks
-            ohlc_df = self._build_ohlc_from_ticks(df[['time', 'price', 'volume']], interval)
+    def candles_from_ticks(self, symbol, limit, df, interval='1T'):
+        """Validate tick data rồi build nến OHLC (phần CPU của intraday)"""
+        if df is None or df.empty:
+            log.info("Intraday: no data", extra={"symbol": symbol})
+            return None
 
-            if ohlc_df is None or ohlc_df.empty:
-                print(f"[Intraday] Failed to build OHLC")
-                return None
+        # Validate required columns
+        if 'time' not in df.columns or 'price' not in df.columns:
+            log.warning("Intraday: missing required columns", extra={"symbol": symbol, "columns": list(df.columns)})
+            return None
 
-            print(f"[Intraday] Built {len(ohlc_df)} candles")
-            return ohlc_df
+        # Build OHLC từ ticks
+        ohlc_df = self._build_ohlc_incremental(symbol, limit, df[['time', 'price', 'volume']], interval)
 
-        except Exception as e:
-            print(f"[Intraday Error] {symbol}: {e}")
-            import traceback
-            traceback.print_exc()
+        if ohlc_df is None or ohlc_df.empty:
+            log.warning("Intraday: failed to build OHLC", extra={"symbol": symbol, "interval": interval})
             return None
 
-    def history(self, symbol, start, end, interval):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Intraday: built candles", extra={
+                "symbol": symbol, "interval": interval, "ticks": len(df), "candles": len(ohlc_df),
+            })
+        return ohlc_df
+
+    def intraday_multi(self, symbol, limit, intervals, base_interval='1T'):
         """
-        Lấy dữ liệu lịch sử (đã có OHLC sẵn)
-        
+        Lấy intraday 1 lần và build nhiều khung nến
+
+        Nến 1T build từ tick, các khung lớn hơn (5T / 15T / 1H) gộp từ nến 1T.
+        Khung không phải bội của 1T thì build trực tiếp từ tick.
+
         Returns:
-            DataFrame với columns ['time', 'open', 'high', 'low', 'close', 'volume']
+            dict {interval: DataFrame} (None nếu không có data)
         """
         try:
-            print(f"[History] Fetching {symbol} ({start} → {end}, {interval})")
+            df = self._ticks(symbol, limit)
+            return self.multi_candles_from_ticks(symbol, limit, df, intervals, base_interval)
+
+        except Exception as e:
+            log_upstream_error(log, "intraday_multi", e, exc_info=True, symbol=symbol)
+            return None
+
+    def multi_candles_from_ticks(self, symbol, limit, df, intervals, base_interval='1T'):
+        """Build nhiều khung nến từ cùng 1 tick data (phần CPU của intraday_multi)"""
+        if df is None or df.empty:
+            log.info("IntradayMulti: no data", extra={"symbol": symbol})
+            return None
+
+        if 'time' not in df.columns or 'price' not in df.columns:
+            log.warning("IntradayMulti: missing required columns", extra={"symbol": symbol, "columns": list(df.columns)})
+            return None
+
+        ticks = df[['time', 'price', 'volume']]
+        base = self._build_ohlc_incremental(symbol, limit, ticks, base_interval)
+        base_ns = interval_to_ns(base_interval)
+
+        result = {}
+        for interval in intervals:
+            step = interval_to_ns(interval)
+            if step == base_ns:
+                result[interval] = base.copy()
+            elif step and step % base_ns == 0:
+                result[interval] = roll_up_bars(base, interval)
+            else:
+                result[interval] = self._build_ohlc_incremental(symbol, limit, ticks, interval)
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("IntradayMulti: built candles", extra={
+                "symbol": symbol, "candles": {k: len(v) for k, v in result.items()},
+            })
+        return result
 
-            df = self.client.stock(
+    def _fetch_history(self, symbol, start, end, interval):
+        """Gọi vnstock lấy dữ liệu lịch sử (không xử lý), qua gateway vnstock"""
+        df = self.gateway.call(
+            lambda: self.client.stock(
                 symbol=symbol, source=self.source
             ).quote.history(
                 start=start,
                 end=end,
                 interval=interval
             )
+        )
+        return record("history", symbol, df, start=start, end=end, interval=interval, source=self.source)
 
-            if df is None or df.empty:
-                print(f"[History] No data for {symbol}")
-                return None
+    def history(self, symbol, start, end, interval):
+        """
+        Lấy dữ liệu lịch sử (đã có OHLC sẵn)
+        
+        Returns:
+            DataFrame với columns ['time', 'open', 'high', 'low', 'close', 'volume']
+        """
+        try:
+            if self.store is not None:
+                df = self._stored_history(symbol, start, end, interval)
+            else:
+                df = self._fetch_history(symbol, start, end, interval)
+            return self.history_columns(symbol, df)
 
-            print(f"[History] Got {len(df)} rows")
-            print(f"[History] Columns: {df.columns.tolist()}")
+        except Exception as e:
+            log_upstream_error(
+                log, "history", e, exc_info=True, symbol=symbol, start=start, end=end, interval=interval
+            )
+            return None
 
-            # Validate columns
-            required = ['time', 'open', 'high', 'low', 'close', 'volume']
-            if not all(col in df.columns for col in required):
-                print(f"[History] Missing required columns")
-                return None
+    def _stored_history(self, symbol, start, end, interval):
+        """
+        History qua HistoryStore + RangePlanner: chỉ fetch (song song) các
+        khoảng ngày giao dịch chưa có, ngày đã đóng được ghi vào store
+        """
+        df, plan = RangePlanner(self.store).load(symbol, interval, start, end, self._fetch_history)
+        log.debug("History: loaded", extra={
+            "symbol": symbol, "interval": interval, "rows": len(df), "fetched_ranges": len(plan["fetch"]),
+        })
+        return df
 
-            return df[required]
+    def history_columns(self, symbol, df):
+        """Validate + chỉ giữ các cột OHLCV của dữ liệu lịch sử"""
+        if df is None or df.empty:
+            log.info("History: no data", extra={"symbol": symbol})
+            return None
 
-        except Exception as e:
-            print(f"[History Error] {symbol} ({start} → {end}, {interval}): {e}")
-            import traceback
-            traceback.print_exc()
+        # Validate columns
+        required = ['time', 'open', 'high', 'low', 'close', 'volume']
+        if not all(col in df.columns for col in required):
+            log.warning("History: missing required columns", extra={"symbol": symbol, "columns": list(df.columns)})
             return None
+
+        return df[required]
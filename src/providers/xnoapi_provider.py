@@ -1,10 +1,33 @@
 from src.config import Config
+from src.providers.capture import record
+from src.providers.upstream_cache import UpstreamCache
+from src.providers.upstream_gateway import gateway
+from src.utils.log_utils import get_logger, log_upstream_error
+from src.utils.trading_calendar import cache_ttl
 from xnoapi import client
 from xnoapi.vn.data.stocks import Company, Finance, Quote
 from xnoapi.vn.data.derivatives import get_hist as get_derivatives_hist
 from xnoapi.vn.data import get_stock_foreign_trading
 from xnoapi.vn.metrics import Metrics, Backtest_Derivates
-import time
+
+log = get_logger(__name__)
+
+# Cache khối ngoại / price depth theo symbol, dùng chung trong process
+FOREIGN_CACHE = UpstreamCache(
+    "foreign_trading",
+    maxsize=Config.XNO_CACHE_MAXSIZE,
+    ttl=Config.XNO_CACHE_TTL,
+)
+DEPTH_CACHE = UpstreamCache(
+    "price_depth",
+    maxsize=Config.XNO_CACHE_MAXSIZE,
+    ttl=Config.XNO_CACHE_TTL,
+)
+
+
+def records_or_none(df):
+    """DataFrame upstream → list dict, None nếu rỗng (None không được cache)"""
+    return None if df is None or df.empty else df.to_dict("records")
 
 
 class XnoAPIProvider:
@@ -19,13 +42,13 @@ class XnoAPIProvider:
     - Metrics & Backtest
     """
 
-    def __init__(self, retry=2, retry_delay=0.5):
-        self.retry = retry
-        self.retry_delay = retry_delay
+    def __init__(self, retry=None):
+        self.retry = retry  # None → UPSTREAM_RETRY (dùng chung sync / async)
+        self.gateway = gateway("xno")
 
         try:
             client(apikey=Config.XNOAPI_KEY)
-            print("[XNOAPI] Client initialized")
+            log.info("XNOAPI client initialized")
         except Exception as e:
             raise RuntimeError(f"[XNOAPI Init Failed] {e}")
 
@@ -33,13 +56,23 @@ class XnoAPIProvider:
     # INTERNAL
     # ==================================================
     def _retry(self, func, *args, **kwargs):
-        for i in range(self.retry + 1):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                if i == self.retry:
-                    raise e
-                time.sleep(self.retry_delay)
+        """Gọi XNO qua gateway (rate limit + circuit breaker), retry backoff + jitter"""
+        return self.gateway.retry(func, *args, retries=self.retry, **kwargs)
+
+    # Lời gọi upstream thô (chưa qua gateway), dùng chung cho bản sync / async;
+    # provider giả lập chỉ cần override nhóm này. Response được ghi lại khi bật capture.
+    def _quote_intraday(self, symbol, limit):
+        return record("ticks", symbol, Quote(symbol).intraday(page_size=limit), limit=limit, source="XNO")
+
+    def _quote_history(self, symbol, start, end, interval):
+        df = Quote(symbol).history(start=start, end=end, interval=interval)
+        return record("history", symbol, df, start=start, end=end, interval=interval, source="XNO")
+
+    def _quote_foreign_trading(self, symbol):
+        return record("foreign_trading", symbol, get_stock_foreign_trading(symbol))
+
+    def _quote_price_depth(self, symbol):
+        return record("price_depth", symbol, Quote(symbol).price_depth())
 
     def _ohlcv(self, df):
         if df is None or df.empty:
@@ -62,27 +95,19 @@ class XnoAPIProvider:
     # ==================================================
     def intraday(self, symbol, limit=100):
         try:
-            df = self._retry(
-                Quote(symbol).intraday,
-                page_size=limit  # đổi từ limit -> page_size
-            )
+            df = self._retry(self._quote_intraday, symbol, limit)
             return self._ohlcv(df)
         except Exception as e:
-            print(f"[XNO Intraday Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_intraday", e, symbol=symbol)
             return None
 
 
     def history(self, symbol, start, end, interval="1d"):
         try:
-            df = self._retry(
-                Quote(symbol).history,
-                start=start,
-                end=end,
-                interval=interval
-            )
+            df = self._retry(self._quote_history, symbol, start, end, interval)
             return self._ohlcv(df)
         except Exception as e:
-            print(f"[XNO History Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_history", e, symbol=symbol)
             return None
 
     # ==================================================
@@ -113,27 +138,39 @@ class XnoAPIProvider:
 
             return df[['time', 'open', 'high', 'low', 'close', 'volume']]
         except Exception as e:
-            print(f"[XNO Derivatives Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_derivatives", e, symbol=symbol)
             return None
 
 
     # ==================================================
     # FOREIGN / DEPTH
     # ==================================================
+    def _fetch_foreign_trading(self, symbol):
+        """Gọi XNO lấy khối ngoại (không qua cache)"""
+        return records_or_none(self._retry(self._quote_foreign_trading, symbol))
+
+    def _fetch_price_depth(self, symbol):
+        """Gọi XNO lấy price depth (không qua cache)"""
+        return records_or_none(self._retry(self._quote_price_depth, symbol))
+
     def foreign_trading(self, symbol):
         try:
-            df = self._retry(get_stock_foreign_trading, symbol)
-            return [] if df is None or df.empty else df.to_dict("records")
+            data = FOREIGN_CACHE.get_or_load(
+                symbol, lambda: self._fetch_foreign_trading(symbol), ttl=cache_ttl(Config.XNO_CACHE_TTL)
+            )
+            return data or []
         except Exception as e:
-            print(f"[XNO Foreign Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_foreign_trading", e, symbol=symbol)
             return []
 
     def price_depth(self, symbol):
         try:
-            df = self._retry(Quote(symbol).price_depth)
-            return [] if df is None or df.empty else df.to_dict("records")
+            data = DEPTH_CACHE.get_or_load(
+                symbol, lambda: self._fetch_price_depth(symbol), ttl=cache_ttl(Config.XNO_CACHE_TTL)
+            )
+            return data or []
         except Exception as e:
-            print(f"[XNO PriceDepth Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_price_depth", e, symbol=symbol)
             return []
 
     # ==================================================
@@ -152,7 +189,7 @@ class XnoAPIProvider:
                 "news": company.news()
             }
         except Exception as e:
-            print(f"[XNO Company Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_company", e, symbol=symbol)
             return {}
 
     def finance_info(self, symbol):
@@ -165,7 +202,7 @@ class XnoAPIProvider:
                 "ratio_summary": finance.ratio_summary()
             }
         except Exception as e:
-            print(f"[XNO Finance Error] {symbol}: {e}")
+            log_upstream_error(log, "xno_finance", e, symbol=symbol)
             return {}
 
     # ==================================================
@@ -178,7 +215,7 @@ class XnoAPIProvider:
         try:
             return Metrics(pnl_series).summary()
         except Exception as e:
-            print(f"[XNO Metrics Error] {e}")
+            log.warning("xno_metrics failed: %s", e, extra={"event": "xno_metrics"})
             return {}
 
     def backtest_derivatives(self, df, fee=0.0002):
@@ -192,7 +229,7 @@ class XnoAPIProvider:
                 "trades": bt.trades
             }
         except Exception as e:
-            print(f"[XNO Backtest Error] {e}")
+            log.warning("xno_backtest failed: %s", e, extra={"event": "xno_backtest"})
             return {}
 
     # ==================================================
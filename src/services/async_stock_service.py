@@ -0,0 +1,142 @@
+import asyncio
+from src.providers.async_provider import AsyncVnStockProvider, AsyncXnoAPIProvider
+from src.services.stock_service import StockService
+from src.utils.log_utils import get_logger, log_upstream_error
+from src.utils.market_time_utils import is_market_open
+
+log = get_logger(__name__)
+
+
+class AsyncStockService:
+    """
+    Async variant của StockService:
+    - Fetch upstream qua AsyncVnStockProvider / AsyncXnoAPIProvider
+      (không chiếm threadpool của Starlette khi upstream chậm)
+    - Normalize / filter / strategy (CPU) chạy bằng asyncio.to_thread,
+      dùng lại các hàm build_* của StockService nên response giống hệt bản sync
+    """
+
+    def __init__(self, service=None):
+        self.service = service or StockService()
+        self.provider = AsyncVnStockProvider(self.service.provider)
+        self.xno = AsyncXnoAPIProvider(self.service.xno)
+
+    async def _get_foreign_trading(self, symbol: str):
+        try:
+            data = await self.xno.foreign_trading(symbol)
+            return data if data else []
+        except Exception as e:
+            log_upstream_error(log, "foreign_trading", e, symbol=symbol)
+            return []
+
+    async def _price_depth(self, symbol: str):
+        try:
+            data = await self.xno.price_depth(symbol)
+            return data if data else []
+        except Exception as e:
+            log_upstream_error(log, "price_depth", e, symbol=symbol)
+            return []
+
+    async def _with_foreign(self, symbol: str, result):
+        if isinstance(result, dict) and "error" not in result:
+            result["foreign_trading"] = await self._get_foreign_trading(symbol)
+        return result
+
+    # =====================================================
+    # 1. SNAPSHOT – GIÁ HIỆN TẠI
+    # =====================================================
+    async def _fetch_source(self, name: str, symbol: str, coro, deadline: float):
+        try:
+            value = await asyncio.wait_for(coro, timeout=deadline)
+            reason = "no data" if value is None else None
+        except asyncio.TimeoutError:
+            value, reason = None, "timeout"
+        except Exception as e:
+            value, reason = None, str(e)
+        return self.service.resolve_source(name, symbol, value, reason)
+
+    async def snapshot(self, symbol: str):
+        """Fan-out 3 nguồn song song, mỗi nguồn 1 deadline (xem StockService.snapshot)"""
+        try:
+            deadlines = self.service.snapshot_deadlines()
+            coros = {
+                "intraday": self.provider.intraday(symbol, limit=100, interval='1T'),
+                "foreign_trading": self._get_foreign_trading(symbol),
+                "price_depth": self._price_depth(symbol),
+            }
+            results = await asyncio.gather(*(
+                self._fetch_source(name, symbol, coro, deadlines[name])
+                for name, coro in coros.items()
+            ))
+
+            data = {name: value for name, (value, _) in zip(coros, results)}
+            sources = {name: status for name, (_, status) in zip(coros, results)}
+            return await asyncio.to_thread(self.service.assemble_snapshot, symbol, data, sources)
+        except Exception as e:
+            return {"error": f"Snapshot error: {str(e)}"}
+
+    # =====================================================
+    # 2. HISTORY – DỮ LIỆU LỊCH SỬ
+    # =====================================================
+    async def history(self, symbol: str, start: str, end: str, interval: str, fmt="records"):
+        try:
+            start_dt, end_dt, interval, source, kwargs = self.service.plan_history(symbol, start, end, interval)
+            df = await getattr(self.provider, source)(**kwargs)
+            result = await asyncio.to_thread(
+                self.service.build_history, symbol, interval, start_dt, end_dt, df, None, fmt
+            )
+            return await self._with_foreign(symbol, result)
+        except Exception as e:
+            return {"error": f"History error: {str(e)}"}
+
+    # =====================================================
+    # 3. TICK + STRATEGY ENGINE
+    # =====================================================
+    async def tick(self, symbol: str, start: str, end: str, limit=1000, strategies=None, interval='1T', fmt="records"):
+        try:
+            df = await self.provider.intraday(symbol, limit=limit, interval=interval)
+            result = await asyncio.to_thread(
+                self.service.build_tick, symbol, start, end, df, strategies, None, fmt
+            )
+            return await self._with_foreign(symbol, result)
+        except Exception as e:
+            return {"error": f"Tick error: {str(e)}"}
+
+    # =====================================================
+    # 4. LAST MINUTES – REALTIME SCALPING
+    # =====================================================
+    async def last_minutes(self, symbol: str, minutes=5, limit=300, strategies=None, interval='1T', validate_market_time: bool = False, fmt="records"):
+        try:
+            if validate_market_time:
+                ok, msg = is_market_open()
+                if not ok:
+                    return {"error": msg}
+            df = await self.provider.intraday(symbol, limit=limit, interval=interval)
+            result = await asyncio.to_thread(
+                self.service.build_last_minutes, symbol, minutes, df, strategies, None, fmt
+            )
+            return await self._with_foreign(symbol, result)
+        except Exception as e:
+            return {"error": f"Last minutes error: {str(e)}"}
+
+    async def last_minutes_df(self, symbol: str, minutes=5, limit=300, interval='1T'):
+        df = await self.provider.intraday(symbol, limit=limit, interval=interval)
+        return await asyncio.to_thread(self.service.window_last_minutes, symbol, minutes, df)
+
+    # =====================================================
+    # 5. MULTI TIMEFRAME – 1 LẦN FETCH, NHIỀU KHUNG NẾN
+    # =====================================================
+    async def multi_timeframe(self, symbol: str, intervals="1T,5T,15T", minutes=None, start=None, end=None, limit=10000, strategies=None, fmt="records"):
+        try:
+            intervals = self.service.parse_intervals(intervals)
+            if not intervals:
+                return {"error": "Cần ít nhất 1 interval"}
+
+            frames = await self.provider.intraday_multi(symbol, limit=limit, intervals=intervals)
+            result = await asyncio.to_thread(
+                self.service.build_multi_timeframe,
+                symbol, intervals, frames, minutes, start, end, strategies, None, fmt
+            )
+            return await self._with_foreign(symbol, result)
+        except Exception as e:
+            return {"error": f"Multi timeframe error: {str(e)}"}
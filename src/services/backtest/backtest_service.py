@@ -0,0 +1,122 @@
+import pandas as pd
+
+from src.config import Config
+from src.providers.upstream_cache import UpstreamCache
+from src.providers.vnstock_provider import VnStockProvider
+from src.services.backtest.backtester import VectorizedBacktester
+from src.services.backtest.optimizer import ParameterOptimizer
+from src.utils.df_utils import normalize_df_time
+from src.utils.serialization import candle_payload, iso_times
+
+# Nến lịch sử cho backtest: dữ liệu quá khứ không đổi → TTL dài,
+# chạy lại với inputs khác không gọi upstream lần nữa
+BACKTEST_CACHE = UpstreamCache(
+    "backtest_history",
+    maxsize=Config.BACKTEST_CACHE_MAXSIZE,
+    ttl=Config.BACKTEST_DATA_TTL,
+)
+
+
+class BacktestService:
+    def __init__(self, provider=None):
+        self._provider = provider
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            self._provider = VnStockProvider()
+        return self._provider
+
+    def load_history(self, symbol, start, end, interval):
+        """
+        Nến lịch sử qua BACKTEST_CACHE (None nếu không có dữ liệu)
+
+        Chỉ đi đường HistoryStore (provider.history → RangePlanner): ngày đã có
+        trên đĩa đọc local, upstream chỉ được gọi 1 lần cho khoảng ngày chưa có
+        → chạy lại / đổi khoảng chồng nhau không tốn rate limit vnstock.
+        Store tắt thì không backtest (trừ provider offline như FakeVnStockProvider),
+        tránh mỗi (symbol, start, end, interval) mới đều gọi upstream.
+        """
+        if getattr(self.provider, "store", None) is None and not getattr(self.provider, "offline", False):
+            raise ValueError("Backtest / optimize cần HISTORY_STORE_ENABLED=true (đọc nến từ store)")
+        return BACKTEST_CACHE.get_or_load(
+            (symbol, start, end, interval),
+            lambda: self.provider.history(symbol, start, end, interval),
+        )
+
+    def run(self, symbol, strategy, start, end, interval="1d", inputs=None,
+            max_points=None, fmt="records", **params):
+        """
+        Backtest strategy trên nến lịch sử của symbol
+
+        Args:
+            params: Tham số VectorizedBacktester (capital, risk_pct, fee_pct, ...)
+            max_points: Số điểm tối đa của equity curve trả về (lấy mẫu đều)
+        """
+        df = self.load_history(symbol, start, end, interval)
+        if df is None or df.empty:
+            return {"status": "error", "error": f"Không có dữ liệu {symbol} ({start} → {end}, {interval})"}
+
+        df = normalize_df_time(df.copy())
+        result = VectorizedBacktester(**params).run(df, strategy, inputs)
+
+        equity = result["equity"]
+        max_points = max_points or Config.BACKTEST_MAX_POINTS
+        if len(equity) > max_points:
+            step = -(-len(equity) // max_points)
+            equity = equity.iloc[::step]
+
+        curve = equity.reset_index()
+        curve.columns = ["time", "equity"]
+        curve["equity"] = curve["equity"].round(2)
+
+        trades = result["trades"]
+        for key in ("signal_time", "entry_time", "exit_time"):
+            for t, value in zip(trades, iso_times(pd.Series([t[key] for t in trades], dtype=df["time"].dtype))):
+                t[key] = value
+
+        return {
+            "status": "ok",
+            "symbol": symbol,
+            "strategy": strategy,
+            "interval": interval,
+            "from": iso_times(df["time"].iloc[:1])[0],
+            "to": iso_times(df["time"].iloc[-1:])[0],
+            "summary": result["summary"],
+            "trades": trades,
+            "equity": candle_payload(curve, fmt),
+        }
+
+    def optimize(self, symbols, strategy, start, end, grid, interval="1d", mode="grid",
+                 samples=50, splits=3, metric="return_pct", seed=None, top=20, **params):
+        """
+        Grid / random search inputs của strategy trên nhiều symbol (walk-forward)
+
+        Args:
+            grid: {input: [giá trị, ...]}, vd {"bos_window": [5, 8, 12]}
+            top: Số bộ inputs tốt nhất trả về
+            params: Tham số VectorizedBacktester
+        """
+        frames, missing = {}, []
+        for symbol in symbols:
+            df = self.load_history(symbol, start, end, interval)
+            if df is None or df.empty:
+                missing.append(symbol)
+            else:
+                frames[symbol] = normalize_df_time(df.copy())
+
+        if not frames:
+            return {"status": "error", "error": f"Không có dữ liệu ({start} → {end}, {interval})", "missing": missing}
+
+        optimizer = ParameterOptimizer(
+            strategy, grid, mode=mode, samples=samples, splits=splits, metric=metric, seed=seed, **params
+        )
+        result = optimizer.run(frames)
+        result["results"] = result["results"][:top]
+
+        return {
+            "status": "ok",
+            "interval": interval,
+            "missing": missing,
+            **result,
+        }
@@ -0,0 +1,328 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.services.trade.trade_signal_builder import TradeSignalBuilder
+from src.strategies.indicators import IndicatorContext
+from src.strategies.registry import STRATEGY_REGISTRY
+from src.utils.serialization import iso_times
+
+# Lý do đóng lệnh
+EXIT_STOP_LOSS = "stop_loss"
+EXIT_TAKE_PROFIT = "take_profit"
+EXIT_TIMEOUT = "timeout"
+
+
+class VectorizedBacktester:
+    """
+    Backtest 1 strategy trong STRATEGY_REGISTRY trên nến lịch sử
+
+    - Tín hiệu: strategy.apply(signal_limit=None) → mọi tín hiệu lịch sử
+    - Entry / SL / TP: cùng công thức TradeSignalBuilder
+      (entry = giữa zone OB hoặc close, SL / TP = entry ∓ ATR * hệ số, lọc rr_min)
+    - Khớp lệnh: lệnh limit chờ `entry_bars` nến sau khi tín hiệu xác nhận;
+      SL / TP tìm nến chạm đầu tiên trên sliding_window_view (vectorized),
+      cùng 1 nến chạm cả 2 → tính SL (bảo thủ); nến khớp đã xét SL (low / gap open
+      dưới SL → cắt lỗ ngay), TP từ nến sau; quá `max_hold` nến → đóng ở close
+    - Chỉ giữ 1 vị thế mỗi lúc; khối lượng theo % rủi ro, làm tròn theo lot
+    """
+
+    def __init__(
+        self,
+        capital=100_000.0,
+        risk_pct=2.0,
+        lot_size=100,
+        fee_pct=0.15,
+        sell_tax_pct=0.1,
+        rr_min=2.0,
+        entry_bars=5,
+        max_hold=50,
+    ):
+        self.capital = capital
+        self.risk_pct = risk_pct
+        self.lot_size = lot_size
+        self.fee_pct = fee_pct
+        self.sell_tax_pct = sell_tax_pct
+        self.rr_min = rr_min
+        self.entry_bars = entry_bars
+        self.max_hold = max_hold
+
+    # ==================================================
+    # SIGNALS → ORDERS
+    # ==================================================
+    @staticmethod
+    def prepare(df):
+        """Sort theo time, bỏ nến trùng time, index DatetimeIndex (pandas_ta.vwap cần để neo theo ngày)"""
+        df = df.sort_values("time", kind="stable").drop_duplicates("time", keep="last")
+        return df.set_index(pd.DatetimeIndex(df["time"]).rename(None))
+
+    def signals(self, df, strategy, inputs=None, ctx=None):
+        strategy_cls = STRATEGY_REGISTRY.get(strategy)
+        if strategy_cls is None:
+            raise ValueError(f"Strategy không tồn tại: {strategy}")
+
+        inputs = {**(inputs or {}), "signal_limit": None}
+        ctx = IndicatorContext.for_frame(ctx, df)
+        result = strategy_cls().apply(df, inputs, ctx)
+        if result.get("meta", {}).get("error"):
+            raise ValueError(result["meta"]["error"])
+        return strategy_cls, result["signals"], ctx
+
+    def orders(self, df, strategy_cls, signals, ctx):
+        """
+        Tín hiệu → lệnh (vị trí nến tín hiệu, entry, SL, TP)
+
+        Returns:
+            dict numpy arrays: signal_idx, active_idx (nến đầu tiên được khớp), entry, sl, tp, rr
+        """
+        positions = pd.Index(iso_times(df["time"]))
+        idx = positions.get_indexer([s["time"] for s in signals])
+        keep = idx >= 0
+
+        entry = np.array([
+            TradeSignalBuilder.zone_entry(s.get("zone", {})) if "zone" in s else np.nan
+            for s in signals
+        ], dtype=float)
+        idx, entry = idx[keep], entry[keep]
+
+        close = df["close"].to_numpy(dtype=float)
+        entry = np.where(np.isnan(entry), close[idx], entry)
+
+        atr = ctx.atr(TradeSignalBuilder.ATR_LENGTH).to_numpy(dtype=float)[idx]
+        sl = np.round(entry - atr * TradeSignalBuilder.SL_ATR_MULT, 2)
+        tp = np.round(entry + atr * TradeSignalBuilder.TP_ATR_MULT, 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rr = np.where(entry > sl, (tp - entry) / (entry - sl), 0.0)
+
+        valid = ~np.isnan(atr) & (rr >= self.rr_min)
+        idx = idx[valid]
+        return {
+            "signal_idx": idx,
+            "active_idx": idx + 1 + strategy_cls.confirm_bars,
+            "entry": entry[valid],
+            "sl": sl[valid],
+            "tp": tp[valid],
+            "rr": rr[valid],
+        }
+
+    # ==================================================
+    # FILLS (VECTORIZED)
+    # ==================================================
+    @staticmethod
+    def _windows(values, start, length, fill):
+        """values[start : start + length] cho mọi start, pad cuối bằng fill"""
+        padded = np.concatenate([values, np.full(length, fill)])
+        return sliding_window_view(padded, length)[start]
+
+    @staticmethod
+    def _first(hit):
+        """Vị trí True đầu tiên mỗi dòng, -1 nếu không có"""
+        first = hit.argmax(axis=1)
+        return np.where(hit.any(axis=1), first, -1)
+
+    def fills(self, df, orders):
+        """
+        Khớp entry (limit) rồi tìm SL / TP chạm trước cho mọi lệnh cùng lúc
+
+        Returns:
+            dict numpy arrays cho các lệnh khớp được: fill_idx, fill_price, exit_idx, exit_price, exit_reason
+        """
+        n = len(df)
+        open_ = df["open"].to_numpy(dtype=float)
+        high = df["high"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        close = df["close"].to_numpy(dtype=float)
+
+        active = orders["active_idx"]
+        ok = active < n
+        orders = {k: v[ok] for k, v in orders.items()}
+        active = orders["active_idx"]
+        entry, sl, tp = orders["entry"], orders["sl"], orders["tp"]
+
+        # Entry: nến đầu tiên trong entry_bars có low <= entry (mở gap dưới entry → khớp giá open)
+        lows = self._windows(low, active, self.entry_bars, np.nan)
+        offset = self._first(lows <= entry[:, None])
+        filled = offset >= 0
+        fill_idx = active[filled] + offset[filled]
+        entry = entry[filled]
+        fill_price = np.minimum(entry, open_[fill_idx])
+        sl, tp = sl[filled], tp[filled]
+
+        # Exit: xét từ chính nến khớp (offset 0) tới max_hold nến sau đó.
+        # Nến khớp chỉ xét SL (không biết thứ tự giá trong nến → giả định xấu nhất):
+        # low <= SL, hoặc mở gap dưới SL (khớp giá open rồi cắt lỗ ngay tại open)
+        start = fill_idx
+        highs = self._windows(high, start, self.max_hold + 1, np.nan)
+        lows = self._windows(low, start, self.max_hold + 1, np.nan)
+        sl_hit = self._first(lows <= sl[:, None])
+        tp_hits = highs >= tp[:, None]
+        tp_hits[:, 0] = False
+        tp_hit = self._first(tp_hits)
+
+        big = self.max_hold + 1
+        sl_at = np.where(sl_hit >= 0, sl_hit, big)
+        tp_at = np.where(tp_hit >= 0, tp_hit, big)
+        by_sl = (sl_at <= tp_at) & (sl_at < big)
+        by_tp = (tp_at < sl_at)
+
+        last = np.minimum(start + self.max_hold, n - 1)
+        exit_idx = np.where(by_sl, start + sl_at, np.where(by_tp, start + tp_at, last))
+
+        # SL / TP khớp tại mức giá, trừ khi nến mở gap qua mức đó
+        exit_price = np.where(
+            by_sl, np.minimum(sl, open_[exit_idx]),
+            np.where(by_tp, np.maximum(tp, open_[exit_idx]), close[exit_idx])
+        )
+        exit_reason = np.where(by_sl, EXIT_STOP_LOSS, np.where(by_tp, EXIT_TAKE_PROFIT, EXIT_TIMEOUT))
+
+        return {
+            "signal_idx": orders["signal_idx"][filled],
+            "fill_idx": fill_idx,
+            "entry": entry,
+            "fill_price": fill_price,
+            "sl": sl,
+            "tp": tp,
+            "rr": orders["rr"][filled],
+            "exit_idx": exit_idx,
+            "exit_price": exit_price,
+            "exit_reason": exit_reason,
+        }
+
+    # ==================================================
+    # PORTFOLIO
+    # ==================================================
+    def _quantity(self, equity, price, sl):
+        risk_per_unit = price - sl
+        if risk_per_unit <= 0 or price <= 0:
+            return 0
+        qty = min(equity * self.risk_pct / 100 / risk_per_unit, equity / price)
+        return int(qty // self.lot_size * self.lot_size)
+
+    def trades(self, df, fills):
+        """
+        Chạy tuần tự trên danh sách lệnh (số lệnh nhỏ so với số nến):
+        bỏ lệnh chồng vị thế đang mở, sizing theo equity hiện tại, trừ phí
+        """
+        times = df["time"]
+        order = np.argsort(fills["fill_idx"], kind="stable")
+        buy_fee = self.fee_pct / 100
+        sell_fee = (self.fee_pct + self.sell_tax_pct) / 100
+
+        equity = self.capital
+        busy_until = -1
+        trades = []
+        for i in order:
+            fill_idx = int(fills["fill_idx"][i])
+            if fill_idx <= busy_until:
+                continue
+
+            price, exit_price = float(fills["fill_price"][i]), float(fills["exit_price"][i])
+            # Khối lượng chốt lúc đặt lệnh limit (theo entry dự kiến), kể cả khi mở gap dưới SL
+            qty = self._quantity(equity, float(fills["entry"][i]), float(fills["sl"][i]))
+            if qty <= 0:
+                continue
+
+            fees = qty * price * buy_fee + qty * exit_price * sell_fee
+            pnl = qty * (exit_price - price) - fees
+            equity += pnl
+            exit_idx = int(fills["exit_idx"][i])
+            busy_until = exit_idx
+
+            trades.append({
+                "signal_time": times.iloc[int(fills["signal_idx"][i])],
+                "entry_time": times.iloc[fill_idx],
+                "exit_time": times.iloc[exit_idx],
+                "entry": round(price, 2),
+                "stop_loss": float(fills["sl"][i]),
+                "take_profit": float(fills["tp"][i]),
+                "exit": round(exit_price, 2),
+                "exit_reason": str(fills["exit_reason"][i]),
+                "quantity": qty,
+                "fees": round(fees, 2),
+                "pnl": round(pnl, 2),
+                "return_pct": round(pnl / (qty * price) * 100, 2),
+                "rr": round(float(fills["rr"][i]), 2),
+                "bars_held": exit_idx - fill_idx,
+                "_fill_idx": fill_idx,
+                "_exit_idx": exit_idx,
+            })
+        return trades
+
+    def equity_curve(self, df, trades):
+        """Equity mark-to-market theo close từng nến (vectorized bằng cumsum)"""
+        n = len(df)
+        close = df["close"].to_numpy(dtype=float)
+        qty_delta = np.zeros(n)
+        cash_delta = np.zeros(n)
+        buy_fee = self.fee_pct / 100
+        sell_fee = (self.fee_pct + self.sell_tax_pct) / 100
+
+        for t in trades:
+            q = t["quantity"]
+            qty_delta[t["_fill_idx"]] += q
+            cash_delta[t["_fill_idx"]] -= q * t["entry"] * (1 + buy_fee)
+            qty_delta[t["_exit_idx"]] -= q
+            cash_delta[t["_exit_idx"]] += q * t["exit"] * (1 - sell_fee)
+
+        return self.capital + np.cumsum(cash_delta) + np.cumsum(qty_delta) * close
+
+    @staticmethod
+    def _summary(capital, trades, equity):
+        pnl = np.array([t["pnl"] for t in trades], dtype=float)
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl <= 0]
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        drawdown = (equity - peak) / peak if len(equity) else equity
+
+        return {
+            "trades": len(trades),
+            "wins": int(len(wins)),
+            "losses": int(len(losses)),
+            "win_rate": round(len(wins) / len(trades), 4) if trades else None,
+            "net_pnl": round(float(pnl.sum()), 2),
+            "return_pct": round(float(pnl.sum()) / capital * 100, 2),
+            "profit_factor": round(float(wins.sum() / -losses.sum()), 2) if losses.sum() < 0 else None,
+            "max_drawdown_pct": round(float(drawdown.min()) * 100, 2) if len(drawdown) else 0.0,
+            "final_equity": round(float(equity[-1]), 2) if len(equity) else capital,
+            "exits": {
+                reason: sum(1 for t in trades if t["exit_reason"] == reason)
+                for reason in (EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_TIMEOUT)
+            },
+        }
+
+    # ==================================================
+    # MAIN
+    # ==================================================
+    def run(self, df, strategy, inputs=None, ctx=None):
+        """
+        Args:
+            df: Nến lịch sử ['time', 'open', 'high', 'low', 'close', 'volume']
+            strategy: Tên strategy trong STRATEGY_REGISTRY
+            inputs: Inputs của strategy (như /signal)
+            ctx: IndicatorContext của frame đã prepare() → df bỏ qua, indicator
+                 dùng chung giữa nhiều lần run (vd optimizer chạy nhiều bộ inputs)
+
+        Returns:
+            dict summary, trades, equity (Series theo time)
+        """
+        df = self.prepare(df) if ctx is None else ctx.df
+        strategy_cls, signals, ctx = self.signals(df, strategy, inputs, ctx)
+        orders = self.orders(df, strategy_cls, signals, ctx)
+        fills = self.fills(df, orders)
+        trades = self.trades(df, fills)
+        equity = self.equity_curve(df, trades)
+
+        for t in trades:
+            del t["_fill_idx"], t["_exit_idx"]
+
+        return {
+            "summary": {
+                "bars": len(df),
+                "signals": len(signals),
+                "orders": len(orders["entry"]),
+                "filled": len(fills["fill_idx"]),
+                **self._summary(self.capital, trades, equity),
+            },
+            "trades": trades,
+            "equity": pd.Series(equity, index=pd.DatetimeIndex(df["time"]), name="equity"),
+        }
@@ -0,0 +1,309 @@
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.services.backtest.backtester import VectorizedBacktester
+from src.strategies.indicators import IndicatorContext
+from src.strategies.registry import STRATEGY_REGISTRY
+from src.utils.serialization import iso_times
+
+# Cột giá lưu trong shared memory (time lưu int64 ns UTC)
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+METRICS = ("return_pct", "net_pnl", "win_rate", "profit_factor", "trades")
+
+# Frame của worker: symbol → (SharedMemory, DataFrame view trên buffer)
+_WORKER_FRAMES = {}
+
+
+# ==================================================
+# SHARED MEMORY
+# ==================================================
+def pack_frame(df):
+    """
+    DataFrame nến → SharedMemory (1 block float64 [time, open, ..., volume])
+
+    Returns:
+        (SharedMemory, spec) với spec = (tên block, số nến, timezone) để worker attach
+    """
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(8 * n * (len(PRICE_COLUMNS) + 1), 8))
+    block = np.ndarray((len(PRICE_COLUMNS) + 1, n), dtype=np.float64, buffer=shm.buf)
+
+    times = pd.DatetimeIndex(df["time"])
+    block[0] = times.asi8.view(np.float64)
+    for i, col in enumerate(PRICE_COLUMNS, start=1):
+        block[i] = df[col].to_numpy(dtype=np.float64)
+    return shm, (shm.name, n, str(times.tz) if times.tz is not None else None)
+
+
+def unpack_frame(shm, n, tz):
+    """SharedMemory → DataFrame trỏ thẳng vào buffer (không copy cột giá)"""
+    block = np.ndarray((len(PRICE_COLUMNS) + 1, n), dtype=np.float64, buffer=shm.buf)
+    times = pd.DatetimeIndex(block[0].view(np.int64).copy())
+    times = times.tz_localize("UTC").tz_convert(tz) if tz else times
+
+    df = pd.DataFrame(block[1:].T, columns=list(PRICE_COLUMNS), copy=False)
+    df.insert(0, "time", times)
+    return df.set_index(times.rename(None))
+
+
+def _attach(specs):
+    """Initializer của worker: attach 1 lần mọi frame, task chỉ gửi tên symbol + params"""
+    for symbol, (name, n, tz) in specs.items():
+        # Worker dùng chung resource tracker với process cha → block chỉ bị unlink bởi process cha
+        shm = shared_memory.SharedMemory(name=name)
+        _WORKER_FRAMES[symbol] = (shm, unpack_frame(shm, n, tz))
+
+
+# ==================================================
+# WORKER
+# ==================================================
+def _fold_metrics(trades, bounds, capital):
+    """
+    Metric theo từng fold, trade thuộc fold theo entry_time
+
+    bounds là int64 ns như boundaries() (UTC nếu frame có tz, giờ naive nếu không)
+    → so sánh được với cả frame tz-aware lẫn tz-naive
+    """
+    entries = np.array([pd.Timestamp(t["entry_time"]).value for t in trades], dtype=np.int64)
+    pnls = np.array([t["pnl"] for t in trades], dtype=float)
+    out = []
+    for start, end in bounds:
+        pnl = pnls[(entries >= start) & (entries < end)]
+        wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+        out.append({
+            "trades": len(pnl),
+            "win_rate": round(len(wins) / len(pnl), 4) if len(pnl) else None,
+            "net_pnl": round(float(pnl.sum()), 2),
+            "return_pct": round(float(pnl.sum()) / capital * 100, 2),
+            "profit_factor": round(float(wins.sum() / -losses.sum()), 2) if losses.sum() < 0 else None,
+        })
+    return out
+
+
+def _run_task(symbol, strategy, param_sets, boundaries, params):
+    """
+    1 task = 1 symbol × nhiều bộ inputs: chung 1 IndicatorContext
+    → EMA / ATR / RVOL ... giống nhau giữa các bộ inputs chỉ tính 1 lần
+    """
+    _, df = _WORKER_FRAMES[symbol]
+    ctx = IndicatorContext(df)
+    backtester = VectorizedBacktester(**params)
+
+    results = []
+    for index, inputs in param_sets:
+        try:
+            result = backtester.run(df, strategy, inputs, ctx=ctx)
+        except Exception as e:
+            results.append({"index": index, "symbol": symbol, "error": str(e)})
+            continue
+        summary = result["summary"]
+        results.append({
+            "index": index,
+            "symbol": symbol,
+            "summary": {k: summary[k] for k in METRICS},
+            "folds": _fold_metrics(result["trades"], boundaries, backtester.capital),
+        })
+    return results
+
+
+# ==================================================
+# OPTIMIZER
+# ==================================================
+class ParameterOptimizer:
+    """
+    Tối ưu inputs của strategy bằng grid / random search trên process pool
+
+    - Nến mỗi symbol nằm trong 1 block SharedMemory, worker attach 1 lần
+      lúc khởi tạo → task chỉ pickle tên symbol + danh sách inputs
+    - Mỗi task chạy nhiều bộ inputs trên cùng IndicatorContext
+    - Walk-forward: chia nến thành splits + 1 đoạn liên tiếp, fold i chọn
+      bộ inputs tốt nhất trên đoạn i (in-sample) và đo trên đoạn i + 1
+      (out-of-sample); xếp hạng theo metric out-of-sample trung bình
+    """
+
+    def __init__(self, strategy, grid, mode="grid", samples=50, splits=3,
+                 metric="return_pct", workers=None, seed=None, **params):
+        if strategy not in STRATEGY_REGISTRY:
+            raise ValueError(f"Strategy không tồn tại: {strategy}")
+        if metric not in METRICS:
+            raise ValueError(f"Metric không hỗ trợ: {metric} (chọn {', '.join(METRICS)})")
+        if not grid or not all(isinstance(v, list) and v for v in grid.values()):
+            raise ValueError("grid phải là dict {input: [giá trị, ...]}")
+
+        self.strategy = strategy
+        self.grid = grid
+        self.mode = mode
+        self.samples = samples
+        self.splits = max(int(splits), 1)
+        self.metric = metric
+        self.workers = workers or Config.OPTIMIZER_WORKERS or os.cpu_count() or 1
+        self.seed = seed
+        self.params = params
+
+    # ==================================================
+    # PARAMETER SETS
+    # ==================================================
+    def param_sets(self):
+        keys = list(self.grid)
+        total = math.prod(len(v) for v in self.grid.values())
+
+        if self.mode == "random" and self.samples < total:
+            rng = np.random.default_rng(self.seed)
+            picks = rng.choice(total, size=self.samples, replace=False)
+            combos = [
+                tuple(self.grid[k][i] for k, i in zip(keys, np.unravel_index(p, [len(self.grid[k]) for k in keys])))
+                for p in sorted(picks)
+            ]
+        else:
+            combos = list(itertools.product(*(self.grid[k] for k in keys)))
+
+        if len(combos) > Config.OPTIMIZER_MAX_COMBOS:
+            raise ValueError(
+                f"Quá nhiều bộ tham số ({len(combos)} > {Config.OPTIMIZER_MAX_COMBOS}), dùng mode=random"
+            )
+        return [dict(zip(keys, combo)) for combo in combos]
+
+    def boundaries(self, frames):
+        """Mốc thời gian splits + 1 đoạn, chia đều trên khoảng thời gian chung của các symbol"""
+        start = min(df["time"].iloc[0] for df in frames.values())
+        end = max(df["time"].iloc[-1] for df in frames.values())
+        edges = pd.date_range(start, end, periods=self.splits + 2)
+        edges = edges[:-1].append(pd.DatetimeIndex([end + pd.Timedelta(1, "ns")]))
+        return [(edges[i].value, edges[i + 1].value) for i in range(len(edges) - 1)]
+
+    # ==================================================
+    # RUN
+    # ==================================================
+    def _tasks(self, symbols, param_sets):
+        """Chia bộ inputs thành chunk sao cho đủ task cho mọi worker"""
+        chunks = max(1, min(len(param_sets), -(-2 * self.workers // len(symbols))))
+        size = -(-len(param_sets) // chunks)
+        indexed = list(enumerate(param_sets))
+        return [
+            (symbol, indexed[i:i + size])
+            for symbol in symbols
+            for i in range(0, len(indexed), size)
+        ]
+
+    def _execute(self, frames, param_sets, boundaries):
+        shms, specs = [], {}
+        try:
+            for symbol, df in frames.items():
+                shm, spec = pack_frame(df)
+                shms.append(shm)
+                specs[symbol] = spec
+
+            tasks = self._tasks(list(frames), param_sets)
+            workers = min(self.workers, len(tasks))
+            context = multiprocessing.get_context(Config.OPTIMIZER_START_METHOD)
+
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_attach, initargs=(specs,)) as pool:
+                futures = [
+                    pool.submit(_run_task, symbol, self.strategy, chunk, boundaries, self.params)
+                    for symbol, chunk in tasks
+                ]
+                return [row for f in futures for row in f.result()]
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def _score(self, metrics):
+        """Giá trị metric để so sánh (None → -inf)"""
+        value = metrics.get(self.metric)
+        return -math.inf if value is None else value
+
+    def _aggregate(self, rows, param_sets):
+        """Gộp kết quả các symbol cho mỗi bộ inputs (tổng trade / pnl, trung bình tỷ lệ)"""
+        by_index = {}
+        for row in rows:
+            by_index.setdefault(row["index"], []).append(row)
+
+        def combine(items):
+            items = [m for m in items if m is not None]
+            trades = sum(m["trades"] for m in items)
+            rates = [m["win_rate"] for m in items if m["win_rate"] is not None]
+            factors = [m["profit_factor"] for m in items if m["profit_factor"] is not None]
+            return {
+                "trades": trades,
+                "win_rate": round(float(np.mean(rates)), 4) if rates else None,
+                "net_pnl": round(sum(m["net_pnl"] for m in items), 2),
+                "return_pct": round(float(np.mean([m["return_pct"] for m in items])), 2) if items else 0.0,
+                "profit_factor": round(float(np.mean(factors)), 2) if factors else None,
+            }
+
+        results = []
+        for index, inputs in enumerate(param_sets):
+            items = by_index.get(index, [])
+            ok = [r for r in items if "error" not in r]
+            errors = {r["symbol"]: r["error"] for r in items if "error" in r}
+            results.append({
+                "inputs": inputs,
+                "summary": combine([r["summary"] for r in ok]),
+                "folds": [combine([r["folds"][i] for r in ok]) for i in range(self.splits + 1)],
+                "symbols": len(ok),
+                **({"errors": errors} if errors else {}),
+            })
+        return results
+
+    def walk_forward(self, results, boundaries):
+        """Fold i: chọn inputs tốt nhất trên đoạn i, báo cáo trên đoạn i + 1"""
+        edges = iso_times(pd.Series(pd.to_datetime([b[0] for b in boundaries] + [boundaries[-1][1]], utc=True)))
+        folds = []
+        for i in range(self.splits):
+            best = max(results, key=lambda r: self._score(r["folds"][i]))
+            folds.append({
+                "train": {"from": edges[i], "to": edges[i + 1]},
+                "test": {"from": edges[i + 1], "to": edges[i + 2]},
+                "inputs": best["inputs"],
+                "in_sample": best["folds"][i],
+                "out_of_sample": best["folds"][i + 1],
+            })
+        return folds
+
+    def run(self, frames):
+        """
+        Args:
+            frames: {symbol: DataFrame nến}
+
+        Returns:
+            dict results (xếp hạng theo metric out-of-sample trung bình), walk_forward
+        """
+        frames = {
+            symbol: VectorizedBacktester.prepare(df).reset_index(drop=True)
+            for symbol, df in frames.items()
+            if df is not None and not df.empty
+        }
+        if not frames:
+            raise ValueError("Không có dữ liệu cho symbol nào")
+
+        param_sets = self.param_sets()
+        boundaries = self.boundaries(frames)
+        rows = self._execute(frames, param_sets, boundaries)
+        results = self._aggregate(rows, param_sets)
+
+        for r in results:
+            scores = [self._score(f) for f in r["folds"][1:]]
+            r["score"] = round(float(np.mean(scores)), 4) if all(map(math.isfinite, scores)) else None
+        ranked = sorted(results, key=lambda r: -math.inf if r["score"] is None else r["score"], reverse=True)
+        for rank, r in enumerate(ranked, start=1):
+            r["rank"] = rank
+
+        return {
+            "strategy": self.strategy,
+            "mode": self.mode,
+            "metric": self.metric,
+            "symbols": list(frames),
+            "combinations": len(param_sets),
+            "splits": self.splits,
+            "results": ranked,
+            "walk_forward": self.walk_forward(results, boundaries),
+        }
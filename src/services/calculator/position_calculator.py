@@ -31,6 +31,7 @@ class AutoPositionCalculator:
         lookback: int = 20,
         risk_rule_pct: float = 2.0,
         alert_pnl_pct: float = 5.0,
+        provider=None,
     ):
         # ===== Validate input =====
         if quantity <= 0:
@@ -44,7 +45,7 @@ class AutoPositionCalculator:
 
         is_long = side.lower() == "long"
 
-        provider = VnStockProvider()
+        provider = provider or VnStockProvider()
 
         # ===== Get intraday OHLC =====
         df = provider.intraday(
@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import wait
+from datetime import datetime
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from src.config import Config
+from src.providers.async_provider import UPSTREAM_EXECUTOR
+from src.providers.vnstock_provider import VnStockProvider, TICK_CACHE
+from src.providers.xnoapi_provider import XnoAPIProvider, FOREIGN_CACHE, DEPTH_CACHE
+from src.utils.log_utils import get_logger, log_upstream_error
+from src.utils.market_time_utils import is_market_open
+
+log = get_logger(__name__)
+
+
+class MarketDataPoller:
+    """
+    Poller nền cho watchlist (APScheduler)
+
+    Mỗi POLLER_INTERVAL giây (trong giờ giao dịch) fetch tick, khối ngoại,
+    price depth của các mã đã subscribe và ghi thẳng vào TICK_CACHE /
+    FOREIGN_CACHE / DEPTH_CACHE với TTL POLLER_CACHE_TTL.
+    Request API đọc từ cache đã nóng → không gọi upstream trên request path,
+    số lời gọi vnstock / XNO không còn phụ thuộc QPS của client.
+    """
+
+    JOB_ID = "market_data_poller"
+    SOURCES = ("ticks", "foreign_trading", "price_depth")
+
+    def __init__(self, provider=None, xno=None, symbols=None, interval=None):
+        self.provider = provider
+        self.xno = xno
+        self.interval = interval or Config.POLLER_INTERVAL
+        self.tick_limit = Config.POLLER_TICK_LIMIT
+        self.cache_ttl = Config.POLLER_CACHE_TTL
+
+        self._symbols = set(Config.POLLER_SYMBOLS if symbols is None else symbols)
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+        self.runs = 0
+        self.skipped = 0
+        self.last_run = None
+        self.last_duration_ms = None
+        self.last_skip_reason = None
+        self.errors = {source: 0 for source in self.SOURCES}
+        self.last_error = None
+
+    # ==================================================
+    # WATCHLIST
+    # ==================================================
+    def subscribe(self, symbols):
+        with self._lock:
+            self._symbols.update(s.strip().upper() for s in symbols if s.strip())
+            return sorted(self._symbols)
+
+    def unsubscribe(self, symbols):
+        with self._lock:
+            self._symbols.difference_update(s.strip().upper() for s in symbols)
+            return sorted(self._symbols)
+
+    def symbols(self):
+        with self._lock:
+            return sorted(self._symbols)
+
+    # ==================================================
+    # LIFECYCLE
+    # ==================================================
+    @property
+    def running(self):
+        return self._scheduler is not None and self._scheduler.running
+
+    def start(self):
+        if self.running:
+            return
+        if self.provider is None:
+            self.provider = VnStockProvider()
+        if self.xno is None:
+            self.xno = XnoAPIProvider()
+
+        # max_instances=1 + coalesce: upstream chậm thì bỏ vòng, không chồng job
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(
+            self.poll_once,
+            "interval",
+            seconds=self.interval,
+            id=self.JOB_ID,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now(),
+        )
+        self._scheduler.start()
+        log.info("Poller started", extra={"symbols": len(self._symbols), "interval": self.interval})
+
+    def shutdown(self):
+        if self.running:
+            self._scheduler.shutdown(wait=False)
+            log.info("Poller stopped")
+        self._scheduler = None
+
+    # ==================================================
+    # POLL
+    # ==================================================
+    def _refresh(self, source, symbol):
+        try:
+            if source == "ticks":
+                TICK_CACHE.put(
+                    (symbol, self.provider.source),
+                    self.provider._fetch_ticks(symbol, self.tick_limit),
+                    ttl=self.cache_ttl,
+                )
+            elif source == "foreign_trading":
+                FOREIGN_CACHE.put(symbol, self.xno._fetch_foreign_trading(symbol), ttl=self.cache_ttl)
+            else:
+                DEPTH_CACHE.put(symbol, self.xno._fetch_price_depth(symbol), ttl=self.cache_ttl)
+        except Exception as e:
+            with self._lock:
+                self.errors[source] += 1
+                self.last_error = f"{source} {symbol}: {e}"
+            log_upstream_error(log, f"poller_{source}", e, symbol=symbol)
+
+    def poll_once(self, force=False):
+        """
+        1 vòng poll: refresh song song mọi (symbol, nguồn) trên UPSTREAM_EXECUTOR
+
+        Args:
+            force: Poll cả ngoài giờ giao dịch
+        """
+        if not force and Config.POLLER_MARKET_HOURS_ONLY:
+            ok, msg = is_market_open()
+            if not ok:
+                with self._lock:
+                    self.skipped += 1
+                    self.last_skip_reason = msg
+                return False
+
+        symbols = self.symbols()
+        if not symbols:
+            return False
+
+        start = time.monotonic()
+        futures = [
+            UPSTREAM_EXECUTOR.submit(self._refresh, source, symbol)
+            for symbol in symbols
+            for source in self.SOURCES
+        ]
+        wait(futures)
+
+        with self._lock:
+            self.runs += 1
+            self.last_run = datetime.now().isoformat()
+            self.last_duration_ms = round((time.monotonic() - start) * 1000, 1)
+        return True
+
+    # ==================================================
+    # STATS
+    # ==================================================
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "symbols": sorted(self._symbols),
+                "interval": self.interval,
+                "cache_ttl": self.cache_ttl,
+                "runs": self.runs,
+                "skipped": self.skipped,
+                "last_skip_reason": self.last_skip_reason,
+                "last_run": self.last_run,
+                "last_duration_ms": self.last_duration_ms,
+                "errors": dict(self.errors),
+                "last_error": self.last_error,
+            }
@@ -1,10 +1,11 @@
 # services/market_state.py
-import pandas_ta as ta
+from src.strategies.indicators import IndicatorContext
 
 
 class MarketStateService:
-    def analyze(self, df):
-        atr = ta.atr(df["high"], df["low"], df["close"], length=14)
+    def analyze(self, df, ctx=None):
+        ctx = IndicatorContext.for_frame(ctx, df)
+        atr = ctx.atr(14)
         atr_pct = atr.iloc[-1] / df["close"].iloc[-1]
 
         price_range = (df["high"].max() - df["low"].min()) / df["close"].mean()
@@ -1,11 +1,23 @@
+import threading
+import time
+import pandas as pd
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import timedelta, datetime
+from cachetools import LRUCache
+from src.config import Config
+from src.providers.async_provider import UPSTREAM_EXECUTOR
 from src.providers.vnstock_provider import VnStockProvider
 from src.providers.xnoapi_provider import XnoAPIProvider
 from src.utils.df_utils import normalize_df_time, filter_by_time
+from src.utils.log_utils import bind_context, get_logger, log_upstream_error
+from src.utils.serialization import candle_payload
 from src.utils.time_utils import normalize_range
 from src.utils.market_time_utils import is_market_open
+from src.utils.trading_calendar import MARKET_CLOSE, MARKET_OPEN
 from src.services.strategy_engine import StrategyEngine
 
+log = get_logger(__name__)
+
 
 class StockService:
     """
@@ -18,9 +30,14 @@ class StockService:
 
     REQUIRED_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
 
-    def __init__(self):
-        self.provider = VnStockProvider()
-        self.xno = XnoAPIProvider()
+    def __init__(self, provider=None, xno=None, engine=None):
+        self.provider = provider or VnStockProvider()
+        self.xno = xno or XnoAPIProvider()
+        self.engine = engine or StrategyEngine()
+
+        # Giá trị tốt gần nhất của từng nguồn snapshot, dùng khi nguồn trễ deadline
+        self._last_good = LRUCache(maxsize=Config.SNAPSHOT_STALE_MAXSIZE)
+        self._last_good_lock = threading.Lock()
 
     def intraday(self, symbol, limit=500, interval="5T"):
         return self.provider.intraday(symbol=symbol, limit=limit, interval=interval)
@@ -39,155 +56,339 @@ class StockService:
             # Provider mới đã trả về list dict, không cần to_dict nữa
             return data if data else []
         except Exception as e:
-            print(f"[ForeignTrading Error] {symbol}: {e}")
+            log_upstream_error(log, "foreign_trading", e, symbol=symbol)
             return []
     def _get_foreign_trading_old(self, symbol:str):
         try:
             df = self.xno.foreign_trading(symbol)
             return [] if df is None or df.empty else df.to_dict("records")
         except Exception as e:
-            print(f"[ForeignTrading Error] {symbol}: {e}")
+            log_upstream_error(log, "foreign_trading", e, symbol=symbol)
             return []
     def _price_depth(self,symbol:str):
         try:
             data = self.xno.price_depth(symbol)
             return data if data else []
         except Exception as e:
-            print(f"[PriceDepth Error] {symbol}: {e}")
+            log_upstream_error(log, "price_depth", e, symbol=symbol)
             return []
         
+    def _empty_candles(self):
+        return pd.DataFrame(columns=self.REQUIRED_COLUMNS)
+
+    @staticmethod
+    def _resolve(data):
+        """Data phụ (khối ngoại, price depth): list, hoặc hàm fetch lazy"""
+        data = data() if callable(data) else data
+        return data if data else []
+
+    def _run_strategies(self, df, strategies, interval="1T"):
+        try:
+            signals = self.engine.run(df=df, strategies=strategies, interval=interval)
+            return signals if signals else {}
+        except Exception as e:
+            return {"error": str(e)}
+
     # =====================================================
     # 1. SNAPSHOT – GIÁ HIỆN TẠI
     # =====================================================
+    @staticmethod
+    def snapshot_deadlines():
+        return {
+            "intraday": Config.SNAPSHOT_INTRADAY_DEADLINE,
+            "foreign_trading": Config.SNAPSHOT_FOREIGN_DEADLINE,
+            "price_depth": Config.SNAPSHOT_DEPTH_DEADLINE,
+        }
+
+    def resolve_source(self, source: str, symbol: str, value=None, reason=None):
+        """
+        Kết quả 1 nguồn của snapshot
+
+        reason=None → value mới, lưu làm last-good.
+        Ngược lại (timeout / lỗi / không có data) → dùng last-good nếu chưa quá
+        SNAPSHOT_STALE_MAX_AGE ("stale"), không thì "missing".
+
+        Returns:
+            (value, status)
+        """
+        key = (source, symbol)
+        now = time.monotonic()
+        if reason is None:
+            with self._last_good_lock:
+                self._last_good[key] = (value, now)
+            return value, {"status": "ok"}
+
+        with self._last_good_lock:
+            cached = self._last_good.get(key)
+        if cached is not None and now - cached[1] <= Config.SNAPSHOT_STALE_MAX_AGE:
+            return cached[0], {"status": "stale", "age_s": round(now - cached[1], 1), "reason": reason}
+        return None, {"status": "missing", "reason": reason}
+
     def snapshot(self, symbol: str):
+        """
+        Fetch intraday, khối ngoại, price depth song song; mỗi nguồn có deadline
+        riêng, nguồn trễ được báo stale / missing thay vì chặn response
+        """
         try:
-            df = self.provider.intraday(symbol, limit=100, interval='1T')
-            valid, error = self._validate_dataframe(df, symbol)
-            if not valid:
-                return {"error": error}
-            df = normalize_df_time(df)
-            if df.empty:
-                return {"error": f"Không có dữ liệu sau normalize cho {symbol}"}
-            latest = df.iloc[-1]
-            foreign = self._get_foreign_trading(symbol)
-            price_depth = self._price_depth(symbol)
-            return {
-                "symbol": symbol,
-                "time": latest["time"].isoformat(),
-                "price": float(latest["close"]),
-                "volume": int(latest["volume"]),
-                "foreign_trading": foreign,
-                "price_depth": price_depth
+            fetchers = {
+                "intraday": lambda: self.provider.intraday(symbol, limit=100, interval='1T'),
+                "foreign_trading": lambda: self._get_foreign_trading(symbol),
+                "price_depth": lambda: self._price_depth(symbol),
             }
+            deadlines = self.snapshot_deadlines()
+            start = time.monotonic()
+            futures = {name: UPSTREAM_EXECUTOR.submit(bind_context(fetch)) for name, fetch in fetchers.items()}
+
+            data, sources = {}, {}
+            for name, future in futures.items():
+                remaining = deadlines[name] - (time.monotonic() - start)
+                try:
+                    value = future.result(timeout=max(remaining, 0))
+                    reason = "no data" if value is None else None
+                except FuturesTimeoutError:
+                    value, reason = None, "timeout"
+                except Exception as e:
+                    value, reason = None, str(e)
+                data[name], sources[name] = self.resolve_source(name, symbol, value, reason)
+
+            return self.assemble_snapshot(symbol, data, sources)
         except Exception as e:
             return {"error": f"Snapshot error: {str(e)}"}
 
+    def assemble_snapshot(self, symbol: str, data, sources):
+        result = self.build_snapshot(
+            symbol, data.get("intraday"), data.get("foreign_trading"), data.get("price_depth")
+        )
+        result["sources"] = sources
+        return result
+
+    def build_snapshot(self, symbol: str, df, foreign, price_depth):
+        """
+        Các hàm build_* chỉ xử lý dữ liệu đã fetch (dùng chung cho sync / async)
+        foreign / price_depth: list, hoặc hàm chỉ được gọi khi intraday hợp lệ
+        """
+        valid, error = self._validate_dataframe(df, symbol)
+        if not valid:
+            return {"error": error}
+        df = normalize_df_time(df.copy())
+        if df.empty:
+            return {"error": f"Không có dữ liệu sau normalize cho {symbol}"}
+        latest = df.iloc[-1]
+        return {
+            "symbol": symbol,
+            "time": latest["time"].isoformat(),
+            "price": float(latest["close"]),
+            "volume": int(latest["volume"]),
+            "foreign_trading": self._resolve(foreign),
+            "price_depth": self._resolve(price_depth)
+        }
+
     # =====================================================
     # 2. HISTORY – DỮ LIỆU LỊCH SỬ
     # =====================================================
-    def history(self, symbol: str, start: str, end: str, interval: str):
+    def plan_history(self, symbol: str, start: str, end: str, interval: str):
+        """
+        Quyết định nguồn dữ liệu cho history
+
+        Returns:
+            (start_dt, end_dt, interval, source, kwargs)
+            source = "history" | "intraday" (hàm tương ứng của provider)
+        """
+        start_dt, end_dt = normalize_range(start, end)
+        if interval in ("1m", "1h"):
+            days_diff = (datetime.now().date() - start_dt.date()).days
+            if days_diff > 2:
+                interval = "1d"
+            start_dt = start_dt.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0)
+            end_dt = end_dt.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0)
+        if interval == "1d":
+            kwargs = {"symbol": symbol, "start": start_dt.date().isoformat(), "end": end_dt.date().isoformat(), "interval": "1d"}
+            return start_dt, end_dt, interval, "history", kwargs
+        interval_map = {"1m": "1T", "1h": "1H"}
+        limit = 2000 if interval == "1m" else 1000
+        kwargs = {"symbol": symbol, "limit": limit, "interval": interval_map.get(interval, "1T")}
+        return start_dt, end_dt, interval, "intraday", kwargs
+
+    def history(self, symbol: str, start: str, end: str, interval: str, fmt="records"):
         try:
-            start_dt, end_dt = normalize_range(start, end)
-            if interval in ("1m", "1h"):
-                days_diff = (datetime.now().date() - start_dt.date()).days
-                if days_diff > 2:
-                    interval = "1d"
-                start_dt = start_dt.replace(hour=9, minute=0, second=0)
-                end_dt = end_dt.replace(hour=15, minute=0, second=0)
-            if interval == "1d":
-                df = self.provider.history(symbol, start_dt.date().isoformat(), end_dt.date().isoformat(), "1d")
-            else:
-                interval_map = {"1m": "1T", "1h": "1H"}
-                limit = 2000 if interval == "1m" else 1000
-                df = self.provider.intraday(symbol, limit=limit, interval=interval_map.get(interval, "1T"))
-            valid, error = self._validate_dataframe(df, symbol)
-            if not valid:
-                return {"symbol": symbol, "interval": interval, "from": start_dt.isoformat(), "to": end_dt.isoformat(), "records": [], "foreign_trading": []}
-            df = normalize_df_time(df)
-            df = filter_by_time(df, start_dt, end_dt)
-            foreign = self._get_foreign_trading(symbol)
-            return {
-                "symbol": symbol,
-                "interval": interval,
-                "from": start_dt.isoformat(),
-                "to": end_dt.isoformat(),
-                "records": df.to_dict("records"),
-                "foreign_trading": foreign
-            }
+            start_dt, end_dt, interval, source, kwargs = self.plan_history(symbol, start, end, interval)
+            df = getattr(self.provider, source)(**kwargs)
+            return self.build_history(
+                symbol, interval, start_dt, end_dt, df,
+                foreign=lambda: self._get_foreign_trading(symbol),
+                fmt=fmt
+            )
         except Exception as e:
             return {"error": f"History error: {str(e)}"}
 
+    def build_history(self, symbol: str, interval: str, start_dt, end_dt, df, foreign, fmt="records"):
+        valid, error = self._validate_dataframe(df, symbol)
+        if not valid:
+            return {"symbol": symbol, "interval": interval, "from": start_dt.isoformat(), "to": end_dt.isoformat(), **candle_payload(self._empty_candles(), fmt), "foreign_trading": []}
+        df = normalize_df_time(df)
+        df = filter_by_time(df, start_dt, end_dt)
+        return {
+            "symbol": symbol,
+            "interval": interval,
+            "from": start_dt.isoformat(),
+            "to": end_dt.isoformat(),
+            **candle_payload(df, fmt),
+            "foreign_trading": self._resolve(foreign)
+        }
+
     # =====================================================
     # 3. TICK + STRATEGY ENGINE
     # =====================================================
-    def tick(self, symbol: str, start: str, end: str, limit=1000, strategies=None, interval='1T'):
+    def tick(self, symbol: str, start: str, end: str, limit=1000, strategies=None, interval='1T', fmt="records"):
         try:
-            start_dt, end_dt = normalize_range(start, end)
             df = self.provider.intraday(symbol, limit=limit, interval=interval)
-            valid, error = self._validate_dataframe(df, symbol)
-            if not valid:
-                return {"error": error}
-            df = normalize_df_time(df)
-            df = filter_by_time(df, start_dt, end_dt)
-            if df.empty:
-                return {"error": f"Không có dữ liệu tick cho {symbol} trong khoảng thời gian này"}
-            foreign = self._get_foreign_trading(symbol)
-            result = {
-                "symbol": symbol,
-                "from": start_dt.isoformat(),
-                "to": end_dt.isoformat(),
-                "count": len(df),
-                "records": df.to_dict("records"),
-                "foreign_trading": foreign
-            }
-            if strategies:
-                try:
-                    engine = StrategyEngine()
-                    signals = engine.run(df=df, strategies=strategies)
-                    result["signals"] = signals if signals else {}
-                except Exception as e:
-                    result["signals"] = {"error": str(e)}
-            return result
+            return self.build_tick(
+                symbol, start, end, df, strategies,
+                foreign=lambda: self._get_foreign_trading(symbol),
+                fmt=fmt
+            )
         except Exception as e:
             return {"error": f"Tick error: {str(e)}"}
 
+    def build_tick(self, symbol: str, start: str, end: str, df, strategies, foreign, fmt="records"):
+        start_dt, end_dt = normalize_range(start, end)
+        valid, error = self._validate_dataframe(df, symbol)
+        if not valid:
+            return {"error": error}
+        df = normalize_df_time(df)
+        df = filter_by_time(df, start_dt, end_dt)
+        if df.empty:
+            return {"error": f"Không có dữ liệu tick cho {symbol} trong khoảng thời gian này"}
+        result = {
+            "symbol": symbol,
+            "from": start_dt.isoformat(),
+            "to": end_dt.isoformat(),
+            "count": len(df),
+            **candle_payload(df, fmt),
+            "foreign_trading": self._resolve(foreign)
+        }
+        if strategies:
+            result["signals"] = self._run_strategies(df, strategies)
+        return result
+
     # =====================================================
     # 4. LAST MINUTES – REALTIME SCALPING
     # =====================================================
-    def last_minutes(self, symbol: str, minutes=5, limit=300, strategies=None, interval='1T', validate_market_time: bool = False):
+    def last_minutes(self, symbol: str, minutes=5, limit=300, strategies=None, interval='1T', validate_market_time: bool = False, fmt="records"):
         try:
             if validate_market_time:
-                ok, msg = is_market_open(datetime.now())
+                ok, msg = is_market_open()
                 if not ok:
                     return {"error": msg}
             df = self.provider.intraday(symbol, limit=limit, interval=interval)
+            return self.build_last_minutes(
+                symbol, minutes, df, strategies,
+                foreign=lambda: self._get_foreign_trading(symbol),
+                fmt=fmt
+            )
+        except Exception as e:
+            return {"error": f"Last minutes error: {str(e)}"}
+
+    def last_minutes_df(self, symbol: str, minutes=5, limit=300, interval='1T'):
+        """
+        DataFrame nến N phút gần nhất (đã normalize time), không build records
+
+        Returns:
+            (df, error)
+        """
+        df = self.provider.intraday(symbol, limit=limit, interval=interval)
+        return self.window_last_minutes(symbol, minutes, df)
+
+    def window_last_minutes(self, symbol: str, minutes, df):
+        valid, error = self._validate_dataframe(df, symbol)
+        if not valid:
+            return None, error
+        df = normalize_df_time(df)
+        if df.empty:
+            return None, f"Không có dữ liệu sau normalize cho {symbol}"
+        latest_time = df["time"].max()
+        start_time = latest_time - timedelta(minutes=minutes)
+        df = df[df["time"] >= start_time]
+        if df.empty:
+            return None, f"Không có dữ liệu trong {minutes} phút gần nhất"
+        return df, None
+
+    def build_last_minutes(self, symbol: str, minutes, df, strategies, foreign, fmt="records"):
+        df, error = self.window_last_minutes(symbol, minutes, df)
+        if error:
+            return {"error": error}
+        latest_time = df["time"].max()
+        start_time = latest_time - timedelta(minutes=minutes)
+        result = {
+            "symbol": symbol,
+            "from": start_time.isoformat(),
+            "to": latest_time.isoformat(),
+            "count": len(df),
+            **candle_payload(df, fmt),
+            "foreign_trading": self._resolve(foreign)
+        }
+        if strategies:
+            result["signals"] = self._run_strategies(df, strategies)
+        return result
+
+    # =====================================================
+    # 5. MULTI TIMEFRAME – 1 LẦN FETCH, NHIỀU KHUNG NẾN
+    # =====================================================
+    @staticmethod
+    def parse_intervals(intervals):
+        if isinstance(intervals, str):
+            return [i.strip() for i in intervals.split(",") if i.strip()]
+        return list(intervals or [])
+
+    def multi_timeframe(self, symbol: str, intervals="1T,5T,15T", minutes=None, start=None, end=None, limit=10000, strategies=None, fmt="records"):
+        try:
+            intervals = self.parse_intervals(intervals)
+            if not intervals:
+                return {"error": "Cần ít nhất 1 interval"}
+
+            frames = self.provider.intraday_multi(symbol, limit=limit, intervals=intervals)
+            return self.build_multi_timeframe(
+                symbol, intervals, frames, minutes, start, end, strategies,
+                foreign=lambda: self._get_foreign_trading(symbol),
+                fmt=fmt
+            )
+        except Exception as e:
+            return {"error": f"Multi timeframe error: {str(e)}"}
+
+    def build_multi_timeframe(self, symbol: str, intervals, frames, minutes, start, end, strategies, foreign, fmt="records"):
+        if not frames:
+            return {"error": f"Không có dữ liệu cho {symbol}"}
+
+        start_dt = end_dt = None
+        if start and end:
+            start_dt, end_dt = normalize_range(start, end)
+
+        timeframes = {}
+        for interval in intervals:
+            df = frames.get(interval)
             valid, error = self._validate_dataframe(df, symbol)
             if not valid:
-                return {"error": error}
+                timeframes[interval] = {"error": error, "count": 0, **candle_payload(self._empty_candles(), fmt)}
+                continue
             df = normalize_df_time(df)
-            if df.empty:
-                return {"error": f"Không có dữ liệu sau normalize cho {symbol}"}
-            latest_time = df["time"].max()
-            start_time = latest_time - timedelta(minutes=minutes)
-            df = df[df["time"] >= start_time]
-            if df.empty:
-                return {"error": f"Không có dữ liệu trong {minutes} phút gần nhất"}
-            foreign = self._get_foreign_trading(symbol)
-            result = {
-                "symbol": symbol,
-                "from": start_time.isoformat(),
-                "to": latest_time.isoformat(),
+            if start_dt is not None:
+                df = filter_by_time(df, start_dt, end_dt)
+            elif minutes and not df.empty:
+                df = df[df["time"] >= df["time"].max() - timedelta(minutes=minutes)]
+
+            item = {
+                "from": df["time"].min().isoformat() if not df.empty else None,
+                "to": df["time"].max().isoformat() if not df.empty else None,
                 "count": len(df),
-                "records": df.to_dict("records"),
-                "foreign_trading": foreign
+                **candle_payload(df, fmt)
             }
-            if strategies:
-                try:
-                    engine = StrategyEngine()
-                    signals = engine.run(df=df, strategies=strategies)
-                    result["signals"] = signals if signals else {}
-                except Exception as e:
-                    result["signals"] = {"error": str(e)}
-            return result
-        except Exception as e:
-            return {"error": f"Last minutes error: {str(e)}"}
+            if strategies and not df.empty:
+                item["signals"] = self._run_strategies(df, strategies, interval)
+            timeframes[interval] = item
+
+        return {
+            "symbol": symbol,
+            "intervals": intervals,
+            "timeframes": timeframes,
+            "foreign_trading": self._resolve(foreign)
+        }
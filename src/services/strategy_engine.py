@@ -2,82 +2,38 @@
 
 from src.services.market_state import MarketStateService
 from src.services.signal_builder import SignalBuilder
+from src.strategies.indicators import IndicatorContext
 from src.strategies.registry import STRATEGY_REGISTRY
+from src.utils.metrics import STRATEGY_SECONDS, stage
 
 
 class StrategyEngine:
     def __init__(self):
         self.market_state_service = MarketStateService()
 
-    def run(self, df, strategies, interval="1T"):
-        # 🔧 NORMALIZE STRATEGIES
+    @staticmethod
+    def normalize_strategies(strategies):
+        """'smc,order_block' | ['smc'] | [{'name': 'smc', 'inputs': {...}}] → list dict"""
         if isinstance(strategies, str):
-            strategies = [{"name": strategies}]
-        elif isinstance(strategies, list):
-            normalized = []
-            for s in strategies:
-                if isinstance(s, str):
-                    normalized.append({"name": s})
-                elif isinstance(s, dict):
-                    normalized.append(s)
-            strategies = normalized
-
-        market_state = self.market_state_service.analyze(df)
-
-        if not market_state["tradable"]:
-            return {
-                "market_state": market_state,
-                "signal": SignalBuilder.no_trade(
-                    market_state["description"], interval
-                ),
-                "signals": {},
-                "suggestion": {
-                    "try_timeframes": ["5T", "15T", "1H"],
-                    "reason": "1T noise quá lớn"
-                }
-            }
+            return [{"name": s.strip()} for s in strategies.split(",") if s.strip()]
 
-        results = {}
-
-        for item in strategies:
-            name = item.get("name")
-            if not name:
-                continue
-
-            inputs = item.get("inputs", {})
-            StrategyClass = STRATEGY_REGISTRY.get(name)
+        normalized = []
+        for s in strategies or []:
+            if isinstance(s, str):
+                normalized.append({"name": s})
+            elif isinstance(s, dict):
+                normalized.append(s)
+        return normalized
 
-            if not StrategyClass:
-                continue
-
-            try:
-                strategy = StrategyClass()
-                results[name] = strategy.apply(df, inputs)
-            except Exception as e:
-                results[name] = {
-                    "signals": [],
-                    "plots": [],
-                    "meta": {
-                        "strategy": name,
-                        "error": str(e),
-                        "count": 0
-                    }
-                }
-
-        final_signal = SignalBuilder.from_strategies(results)
-
-        return {
-            "market_state": market_state,
-            "signal": final_signal,
-            "signals": results
-        }
-    def __init__(self):
-        self.market_state_service = MarketStateService()
+    def run(self, df, strategies, interval="1T", ctx=None):
+        # 🔧 NORMALIZE STRATEGIES
+        strategies = self.normalize_strategies(strategies)
 
-    def run(self, df, strategies, interval="1T"):
-        market_state = self.market_state_service.analyze(df)
+        # Indicator dùng chung cho market state + strategy (+ builder nếu caller truyền ctx)
+        ctx = IndicatorContext.for_frame(ctx, df)
 
-        results = {}
+        with stage("market_state"):
+            market_state = self.market_state_service.analyze(df, ctx)
 
         # 🚨 MARKET KHÔNG ĐÁNG TRADE
         if not market_state["tradable"]:
@@ -93,6 +49,8 @@ class StrategyEngine:
                 }
             }
 
+        results = {}
+
         # ✅ MARKET OK → CHẠY STRATEGY
         for item in strategies:
             name = item.get("name")
@@ -100,15 +58,15 @@ class StrategyEngine:
                 continue
 
             inputs = item.get("inputs", {})
-
-
             StrategyClass = STRATEGY_REGISTRY.get(name)
+
             if not StrategyClass:
                 continue
 
             try:
-                strategy = StrategyClass()
-                results[name] = strategy.apply(df, inputs)
+                with STRATEGY_SECONDS.time(name):
+                    strategy = StrategyClass()
+                    results[name] = strategy.apply(df, inputs, ctx)
             except Exception as e:
                 results[name] = {
                     "signals": [],
@@ -120,7 +78,6 @@ class StrategyEngine:
                     }
                 }
 
-
         final_signal = SignalBuilder.from_strategies(results)
 
         return {
@@ -0,0 +1,299 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from src.config import Config
+from src.providers.async_provider import retry_async
+from src.providers.bar_aggregator import BarAggregator, supports_interval
+from src.providers.vnstock_provider import VnStockProvider
+from src.services.strategy_engine import StrategyEngine
+from src.strategies.registry import STRATEGY_REGISTRY
+from src.utils.df_utils import normalize_df_time
+from src.utils.log_utils import get_logger, log_upstream_error
+from src.utils.serialization import json_dumps
+from src.utils.trading_calendar import is_live
+
+log = get_logger(__name__)
+
+
+def sse_frame(event, data) -> bytes:
+    """1 event Server-Sent Events, data encode JSON 1 lần"""
+    return b"event: " + event.encode() + b"\ndata: " + json_dumps(data) + b"\n\n"
+
+
+def strategies_key(strategies):
+    """'smc, order_block' → ('order_block', 'smc'): client cùng bộ strategy dùng chung kết quả"""
+    names = StrategyEngine.normalize_strategies(strategies)
+    return tuple(sorted({s["name"] for s in names if s.get("name")}))
+
+
+class Subscription:
+    """1 client SSE: queue frame đã encode sẵn + bộ strategy của client"""
+
+    def __init__(self, feed, strategies):
+        self.feed = feed
+        self.strategies = strategies
+        self.queue = asyncio.Queue(maxsize=Config.STREAM_QUEUE_SIZE)
+        self.resyncs = 0
+
+    def push(self, frame, snapshot):
+        """
+        Đẩy frame cho client; client đọc chậm (queue đầy) thì bỏ các delta
+        đang chờ và gửi lại snapshot để client không bị lệch nến
+        """
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resyncs += 1
+            self.queue.put_nowait(snapshot())
+
+
+class SymbolFeed:
+    """
+    1 vòng fetch upstream dùng chung cho mọi client cùng (symbol, interval)
+
+    - Tick lấy qua VnStockProvider._ticks (TICK_CACHE, poller làm nóng được)
+    - BarAggregator chỉ fold tick mới, update() trả về nến đầu tiên thay đổi
+    - Delta nến + tín hiệu mới encode 1 lần rồi đẩy cho mọi client
+      → chi phí mỗi client chỉ là phần delta
+    - Strategy incremental (update(bar)) cho mỗi bộ strategy đang có client,
+      mỗi nến đóng chỉ fold 1 lần
+    """
+
+    def __init__(self, hub, symbol, interval):
+        self.hub = hub
+        self.symbol = symbol
+        self.interval = interval
+        self.aggregator = BarAggregator(interval)
+        self.subscribers = set()
+        self.joining = 0    # client đang subscribe (chưa nhận snapshot)
+        self.task = None
+
+        self.updates = 0
+        self.errors = 0
+        self.last_update = None
+
+        # Theo bộ strategy: instance incremental + tín hiệu gần nhất
+        self._streams = {}
+        self._signals = {}
+
+    # ==================================================
+    # FRAMES
+    # ==================================================
+    def _candles(self, since=None):
+        bars = self.aggregator.bars(since)
+        return normalize_df_time(bars) if not bars.empty else bars
+
+    def _window(self):
+        """Nến trong STREAM_WINDOW_MINUTES phút gần nhất (snapshot)"""
+        with self.aggregator.lock:
+            candles = self._candles()
+        if candles.empty:
+            return candles
+        start = candles["time"].max() - timedelta(minutes=Config.STREAM_WINDOW_MINUTES)
+        return candles[candles["time"] >= start].reset_index(drop=True)
+
+    def _snapshot_data(self, strategies):
+        candles = self._window()
+        return {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "count": len(candles),
+            "records": candles.to_dict("records"),
+            "signals": self._signals.get(strategies, []),
+        }
+
+    def snapshot_frame(self, strategies):
+        return sse_frame("snapshot", self._snapshot_data(strategies))
+
+    # ==================================================
+    # STRATEGIES
+    # ==================================================
+    def _evaluate(self, strategies):
+        """
+        Fold các nến đã đóng (mọi nến trừ nến cuối đang mở) chưa xử lý vào
+        strategy incremental (BaseStrategy.update) → chỉ tốn O(nến mới)
+
+        Returns:
+            List tín hiệu mới
+        """
+        with self.aggregator.lock:
+            return self._fold_closed(strategies)
+
+    def _fold_closed(self, strategies):
+        state = self._streams.get(strategies)
+        if state is None:
+            instances = []
+            for name in strategies:
+                strategy_cls = STRATEGY_REGISTRY.get(name)
+                if strategy_cls is not None:
+                    strategy = strategy_cls()
+                    strategy.reset()
+                    instances.append(strategy)
+            state = self._streams[strategies] = {"strategies": instances, "last_time": None}
+
+        # last_time đã normalize timezone → lọc sau khi normalize
+        bars = self._candles()
+        if state["last_time"] is not None:
+            bars = bars[bars["time"] > state["last_time"]]
+        closed = bars.iloc[:-1]
+        if closed.empty:
+            return []
+
+        new = []
+        for bar in closed.to_dict("records"):
+            for strategy in state["strategies"]:
+                try:
+                    signals = strategy.update(bar)
+                except Exception as e:
+                    log_upstream_error(log, f"stream_strategy_{strategy.name}", e, symbol=self.symbol)
+                    continue
+                new.extend({"strategy": strategy.name, **item} for item in signals)
+        state["last_time"] = closed["time"].iloc[-1]
+
+        # Snapshot giữ 3 tín hiệu gần nhất mỗi strategy như apply()
+        recent = self._signals.get(strategies, []) + new
+        self._signals[strategies] = [
+            item for name in strategies
+            for item in [i for i in recent if i["strategy"] == name][-3:]
+        ]
+        return new
+
+    async def ensure_signals(self, strategies):
+        """Bộ strategy mới: fold các nến đã có trước khi gửi snapshot cho client"""
+        if strategies and strategies not in self._streams:
+            await asyncio.to_thread(self._evaluate, strategies)
+
+    # ==================================================
+    # LOOP
+    # ==================================================
+    def _update(self, ticks):
+        with self.aggregator.lock:
+            changed = self.aggregator.update(ticks[["time", "price", "volume"]])
+            if changed is None:
+                return None
+            return self._candles(changed)
+
+    async def poll_once(self):
+        ticks = await retry_async(self.hub.provider._ticks, self.symbol, Config.STREAM_TICK_LIMIT)
+        if ticks is None or ticks.empty:
+            return False
+
+        delta = await asyncio.to_thread(self._update, ticks)
+        if delta is None:
+            return False
+
+        self.updates += 1
+        self.last_update = time.time()
+        frame = sse_frame("candles", {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "count": len(delta),
+            "records": delta.to_dict("records"),
+        })
+        self.broadcast(frame)
+
+        for strategies in {sub.strategies for sub in self.subscribers if sub.strategies}:
+            new = await asyncio.to_thread(self._evaluate, strategies)
+            if new:
+                self.broadcast(
+                    sse_frame("signal", {"symbol": self.symbol, "interval": self.interval, "signals": new}),
+                    strategies
+                )
+        return True
+
+    def broadcast(self, frame, strategies=None):
+        for sub in list(self.subscribers):
+            if strategies is None or sub.strategies == strategies:
+                sub.push(frame, lambda: self.snapshot_frame(sub.strategies))
+
+    async def run(self):
+        try:
+            while self.subscribers or self.joining:
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    self.errors += 1
+                    log_upstream_error(log, "stream_poll", e, symbol=self.symbol, interval=self.interval)
+                # Ngoài phiên khớp lệnh tick không đổi → poll thưa
+                await asyncio.sleep(
+                    Config.STREAM_POLL_INTERVAL if is_live() else Config.STREAM_CLOSED_POLL_INTERVAL
+                )
+        finally:
+            self.hub.drop(self)
+
+    def stats(self):
+        return {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "subscribers": len(self.subscribers),
+            "strategy_sets": [list(s) for s in self._streams],
+            "updates": self.updates,
+            "errors": self.errors,
+            "resyncs": sum(sub.resyncs for sub in self.subscribers),
+            "last_update": self.last_update,
+        }
+
+
+class StreamHub:
+    """Quản lý SymbolFeed theo (symbol, interval), feed tự dừng khi hết client"""
+
+    def __init__(self, provider=None):
+        self._provider = provider
+        self.feeds = {}
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            self._provider = VnStockProvider()
+        return self._provider
+
+    async def subscribe(self, symbol, interval="1T", strategies=None):
+        if not supports_interval(interval):
+            raise ValueError(f"Interval không hỗ trợ stream: {interval}")
+
+        key = (symbol, interval)
+        feed = self.feeds.get(key)
+        created = feed is None
+        if created:
+            if len(self.feeds) >= Config.STREAM_MAX_FEEDS:
+                raise ValueError(f"Quá số feed tối đa ({Config.STREAM_MAX_FEEDS})")
+            feed = SymbolFeed(self, symbol, interval)
+            self.feeds[key] = feed
+
+        sub = Subscription(feed, strategies_key(strategies))
+        feed.joining += 1
+        try:
+            if created:
+                # Lần đầu: fetch ngay để client nhận snapshot có dữ liệu
+                try:
+                    await feed.poll_once()
+                except Exception as e:
+                    feed.errors += 1
+                    log_upstream_error(log, "stream_poll", e, symbol=symbol, interval=interval)
+            await feed.ensure_signals(sub.strategies)
+        finally:
+            feed.joining -= 1
+
+        feed.subscribers.add(sub)
+        sub.push(feed.snapshot_frame(sub.strategies), lambda: feed.snapshot_frame(sub.strategies))
+
+        if feed.task is None or feed.task.done():
+            feed.task = asyncio.create_task(feed.run())
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.feed.subscribers.discard(sub)
+
+    def drop(self, feed):
+        if not feed.subscribers and not feed.joining and self.feeds.get((feed.symbol, feed.interval)) is feed:
+            del self.feeds[(feed.symbol, feed.interval)]
+
+    def stats(self):
+        return {
+            "feeds": len(self.feeds),
+            "subscribers": sum(len(f.subscribers) for f in self.feeds.values()),
+            "items": [f.stats() for f in self.feeds.values()],
+        }
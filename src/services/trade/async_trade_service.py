@@ -0,0 +1,53 @@
+import asyncio
+from typing import List, Dict, Any, Union
+from src.services.async_stock_service import AsyncStockService
+from src.services.trade.trade_service import TradeService
+
+
+class AsyncTradeService:
+    """
+    Async variant của TradeService.generate_signal / validate_trade
+    Fetch nến / snapshot qua AsyncStockService, strategy + builder chạy bằng asyncio.to_thread.
+    """
+
+    def __init__(self, service=None, stock_service=None):
+        self.service = service or TradeService()
+        self.stock_service = stock_service or AsyncStockService(self.service.stock_service)
+
+    async def generate_signal(
+        self,
+        symbol: str,
+        strategies: Union[str, List[str], List[Dict]],
+        rr_min: float = 2.0,
+        minutes: int = 120,
+        interval: str = "1T",
+        fmt: str = "records",
+        detail: str = "full",
+    ) -> Dict[str, Any]:
+        try:
+            df, error = await self.stock_service.last_minutes_df(
+                symbol=symbol,
+                minutes=minutes,
+                limit=1000,
+                interval=interval
+            )
+        except Exception as e:
+            df, error = None, f"Fetch data failed: {e}"
+
+        df, error = self.service._check_intraday_df(symbol, df, error, minutes, interval)
+        return await asyncio.to_thread(
+            self.service.signal_from_df, symbol, df, error, strategies, rr_min, minutes, interval, fmt, detail
+        )
+
+    async def validate_trade(self, symbol: str, entry: float, sl: float, tp: float) -> Dict[str, Any]:
+        error = self.service._level_error(entry, sl, tp)
+        if error:
+            return {"valid": False, "error": error}
+
+        try:
+            snapshot = await self.stock_service.snapshot(symbol)
+            current_price = snapshot.get("price") if snapshot else None
+        except Exception:
+            current_price = None
+
+        return self.service.trade_levels(symbol, entry, sl, tp, current_price)
@@ -1,16 +1,38 @@
-import pandas as pd
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import List, Dict, Any, Optional, Union
-from src.services.strategy_engine import StrategyEngine
+from src.config import Config
 from src.services.stock_service import StockService
 from src.services.trade.trade_signal_builder import TradeSignalBuilder
-from src.utils.df_utils import normalize_df_time
+from src.strategies.indicators import IndicatorContext
+from src.utils.log_utils import bind_context, get_logger
+from src.utils.metrics import REGISTRY, CallbackMetric, stage
+from src.utils.serialization import candle_payload
+
+log = get_logger(__name__)
+
+# Task scan đã quá hạn nhưng thread vẫn đang chạy (upstream treo), mọi TradeService
+STUCK_SCANS = set()
+_STUCK_LOCK = threading.Lock()
+REGISTRY.register(CallbackMetric(
+    "scan_stuck_workers",
+    "Số worker scan vẫn chạy sau khi mã đã timeout",
+    (),
+    lambda: [((), len(STUCK_SCANS))],
+))
 
 
 class TradeService:
-    def __init__(self):
-        self.stock_service = StockService()
-        self.engine = StrategyEngine()
-        self.builder = TradeSignalBuilder()
+    def __init__(self, stock_service=None, engine=None, builder=None):
+        self.stock_service = stock_service or StockService(engine=engine)
+        self.engine = engine or self.stock_service.engine
+        self.builder = builder or TradeSignalBuilder()
+
+        self._scan_pool = None
+        self._scan_pool_lock = threading.Lock()
+        # Future quá hạn còn giữ worker của pool hiện tại
+        self._stuck = set()
 
     # ==================================================
     # DATA
@@ -24,11 +46,11 @@ class TradeService:
     ):
         """
         Fetch intraday data for the last N minutes using 1-minute candles by default.
-        Expects StockService.last_minutes(...) to return a dict like:
-        { "records": [ {time, open, high, low, close, volume}, ... ], ... }
+        Uses StockService.last_minutes_df(...) directly, so no candle records are
+        built just to be parsed back into a DataFrame.
         """
         try:
-            result = self.stock_service.last_minutes(
+            df, error = self.stock_service.last_minutes_df(
                 symbol=symbol,
                 minutes=minutes,
                 limit=limit,
@@ -37,33 +59,19 @@ class TradeService:
         except Exception as e:
             return None, f"Fetch data failed: {e}"
 
-        # Validate raw result
-        if result is None:
-            return None, "Fetch data failed: result is None"
+        return self._check_intraday_df(symbol, df, error, minutes, interval)
 
-        if isinstance(result, dict) and "error" in result:
-            return None, result.get("error", "Fetch data failed")
-
-        # Parse records
-        try:
-            records = result["records"] if isinstance(result, dict) else result
-            df = pd.DataFrame(records)
-        except Exception as e:
-            return None, f"Invalid data format: {e}"
-
-        if df.empty or len(df) < 20:
-            return None, f"Không đủ dữ liệu (có {len(df)} nến, cần ít nhất 20)"
-
-        # Normalize time column to datetime
-        try:
-            df = normalize_df_time(df)
-        except Exception as e:
-            return None, f"Normalize time failed: {e}"
+    def _check_intraday_df(self, symbol, df, error, minutes, interval):
+        if error:
+            return None, error
 
-        if df.empty or len(df) < 20:
-            return None, f"Không đủ dữ liệu (có {len(df)} nến, cần ít nhất 20)"
+        if df is None or df.empty or len(df) < 20:
+            return None, f"Không đủ dữ liệu (có {0 if df is None else len(df)} nến, cần ít nhất 20)"
 
-        print(f"[TradeService] ✓ Loaded {len(df)} candles for {symbol} ({minutes} phút, {interval})")
+        df = df.reset_index(drop=True)
+        log.debug("TradeService: loaded candles", extra={
+            "symbol": symbol, "candles": len(df), "minutes": minutes, "interval": interval,
+        })
         return df, None
 
     # ==================================================
@@ -76,8 +84,42 @@ class TradeService:
         rr_min: float = 2.0,
         minutes: int = 120,
         interval: str = "1T",
+        fmt: str = "records",
+        detail: str = "full",
     ) -> Dict[str, Any]:
         df, error = self._fetch_intraday_df(symbol, minutes=minutes, interval=interval)
+        return self.signal_from_df(symbol, df, error, strategies, rr_min, minutes, interval, fmt, detail)
+
+    @staticmethod
+    def _with_frame(result, df, strategy_results, fmt, detail):
+        """
+        Thêm from / to / count vào kết quả, phần còn lại theo mức `detail`
+        - summary: không kèm nến và kết quả từng strategy (scan)
+        - signals: thêm kết quả từng strategy (`signals`)
+        - full:    thêm cả nến (`records` / `columns`)
+        """
+        result["from"] = df.iloc[0]["time"].isoformat()
+        result["to"] = df.iloc[-1]["time"].isoformat()
+        result["count"] = len(df)
+        if detail == "full":
+            result.update(candle_payload(df, fmt))
+        if detail != "summary":
+            result["signals"] = strategy_results
+        return result
+
+    def signal_from_df(
+        self,
+        symbol: str,
+        df,
+        error: Optional[str],
+        strategies: Union[str, List[str], List[Dict]],
+        rr_min: float = 2.0,
+        minutes: int = 120,
+        interval: str = "1T",
+        fmt: str = "records",
+        detail: str = "full",
+    ) -> Dict[str, Any]:
+        """Phần CPU của generate_signal: strategy engine + builder trên df đã fetch"""
         if error:
             return {
                 "status": "no_trade",
@@ -87,27 +129,25 @@ class TradeService:
                 "interval": interval
             }
 
+        # Indicator tính 1 lần, dùng chung cho engine (market state + strategy) và builder
+        ctx = IndicatorContext(df)
+
         try:
-            strategy_results = self.engine.run(df=df, strategies=strategies)
+            strategy_results = self.engine.run(df=df, strategies=strategies, interval=interval, ctx=ctx)
         except Exception as e:
-            return {
+            return self._with_frame({
                 "status": "no_trade",
                 "reason": f"Strategy engine failed: {e}",
                 "symbol": symbol,
                 "minutes": minutes,
-                "interval": interval,
-                "from": df.iloc[0]["time"].isoformat(),
-                "to": df.iloc[-1]["time"].isoformat(),
-                "count": len(df),
-                "records": df.to_dict(orient="records"),
-                "signals": {}
-            }
+                "interval": interval
+            }, df, {}, fmt, detail)
 
         if not strategy_results:
             # vẫn cho builder chạy với strategy_results rỗng
-            self.builder.rr_min = rr_min
-            signal = self.builder.build(df, {})
-            return {
+            with stage("signal_builder"):
+                signal = self.builder.build(df, {}, rr_min=rr_min, ctx=ctx)
+            return self._with_frame({
                 "status": "weak_signal" if signal.get("shark_score", 0) < self.builder.shark_min_score else "trade_signal",
                 "reason": "Không có tín hiệu từ strategy nào",
                 "symbol": symbol,
@@ -116,32 +156,22 @@ class TradeService:
                 "shark_score": signal.get("shark_score"),
                 "debug": signal.get("debug"),
                 "signal": signal,
-                "strategies_used": [],
-                "from": df.iloc[0]["time"].isoformat(),
-                "to": df.iloc[-1]["time"].isoformat(),
-                "count": len(df),
-                "records": df.to_dict(orient="records"),
-                "signals": {}
-            }
+                "strategies_used": []
+            }, df, {}, fmt, detail)
 
 
         # Build trade signal
-        self.builder.rr_min = rr_min
-        signal = self.builder.build(df, strategy_results)
+        with stage("signal_builder"):
+            signal = self.builder.build(df, strategy_results, rr_min=rr_min, ctx=ctx)
 
         if not signal or not isinstance(signal, dict):
-            return {
+            return self._with_frame({
                 "status": "no_trade",
                 "reason": "Builder không tạo được tín hiệu",
                 "symbol": symbol,
                 "minutes": minutes,
-                "interval": interval,
-                "from": df.iloc[0]["time"].isoformat(),
-                "to": df.iloc[-1]["time"].isoformat(),
-                "count": len(df),
-                "records": df.to_dict(orient="records"),
-                "signals": strategy_results
-            }
+                "interval": interval
+            }, df, strategy_results, fmt, detail)
 
         # Decide status
         status = "trade_signal"
@@ -150,7 +180,7 @@ class TradeService:
             status = "weak_signal"
             reason = f"Shark score thấp ({signal.get('shark_score', 0)})"
 
-        return {
+        return self._with_frame({
             "status": status,
             "reason": reason,
             "symbol": symbol,
@@ -159,18 +189,60 @@ class TradeService:
             "shark_score": signal.get("shark_score"),   # ✅ đưa ra ngoài
             "debug": signal.get("debug"),               # ✅ đưa ra ngoài
             "signal": signal,
-            "strategies_used": list(strategy_results.keys()),
-            "from": df.iloc[0]["time"].isoformat(),
-            "to": df.iloc[-1]["time"].isoformat(),
-            "count": len(df),
-            "records": df.to_dict(orient="records"),
-            "signals": strategy_results
-        }
+            "strategies_used": list(strategy_results.keys())
+        }, df, strategy_results, fmt, detail)
 
 
     # ==================================================
     # SCAN
     # ==================================================
+    def _get_scan_pool(self):
+        """
+        Thread pool dùng chung cho mọi lần scan (giới hạn SCAN_MAX_WORKERS)
+
+        Thread không kill được: pool có từ SCAN_MAX_STUCK worker kẹt trở lên thì
+        bỏ pool đó (thread cũ tự thoát khi upstream trả / hết UPSTREAM_HTTP_TIMEOUT)
+        và tạo pool mới → scan sau không phải xếp hàng sau worker kẹt
+        """
+        limit = Config.SCAN_MAX_STUCK or max(1, Config.SCAN_MAX_WORKERS // 2)
+        with self._scan_pool_lock:
+            if self._scan_pool is not None and len(self._stuck) >= limit:
+                log.warning("Scan pool has stuck workers, replacing", extra={"stuck": len(self._stuck)})
+                self._scan_pool.shutdown(wait=False)
+                self._scan_pool = None
+                self._stuck = set()
+            if self._scan_pool is None:
+                self._scan_pool = ThreadPoolExecutor(
+                    max_workers=Config.SCAN_MAX_WORKERS,
+                    thread_name_prefix="scan"
+                )
+            return self._scan_pool
+
+    def shutdown(self):
+        with self._scan_pool_lock:
+            if self._scan_pool is not None:
+                self._scan_pool.shutdown(wait=False, cancel_futures=True)
+                self._scan_pool = None
+
+    def _track_stuck(self, pool, future):
+        with self._scan_pool_lock:
+            if pool is self._scan_pool:
+                self._stuck.add(future)
+        with _STUCK_LOCK:
+            STUCK_SCANS.add(future)
+        future.add_done_callback(self._release_stuck)
+
+    def _release_stuck(self, future):
+        with self._scan_pool_lock:
+            self._stuck.discard(future)
+        with _STUCK_LOCK:
+            STUCK_SCANS.discard(future)
+
+    def _scan_one(self, started: Dict[str, float], symbol: str, *args):
+        started[symbol] = time.monotonic()
+        # Scan chỉ giữ status / signal → không build nến, kết quả từng strategy
+        return self.generate_signal(symbol, *args, detail="summary")
+
     def scan_signals(
         self,
         symbols: List[str],
@@ -178,20 +250,55 @@ class TradeService:
         rr_min: float = 2.0,
         minutes: int = 120,
         interval: str = "1T",
+        symbol_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Scan multiple symbols over the last N minutes.
+
+        Symbols run concurrently on a shared worker pool (SCAN_MAX_WORKERS).
+        A symbol running longer than `symbol_timeout`, or still queued when
+        `total_timeout` expires, is reported in `timeouts` and the scan
+        returns with whatever finished (`partial=True`).
         """
+        symbol_timeout = Config.SCAN_SYMBOL_TIMEOUT if symbol_timeout is None else symbol_timeout
+        total_timeout = Config.SCAN_TOTAL_TIMEOUT if total_timeout is None else total_timeout
+        # started / kết quả theo symbol → mỗi symbol chỉ scan 1 lần
+        symbols = list(dict.fromkeys(symbols))
+
         results: Dict[str, Any] = {
             "total_scanned": len(symbols),
             "signals": [],
             "no_setup": [],
-            "errors": []
+            "errors": [],
+            "timeouts": []
         }
 
-        for symbol in symbols:
-            try:
-                res = self.generate_signal(symbol, strategies, rr_min, minutes, interval)
+        scan_start = time.monotonic()
+        pool = self._get_scan_pool()
+        started: Dict[str, float] = {}
+        futures = {
+            pool.submit(bind_context(self._scan_one, started, symbol, strategies, rr_min, minutes, interval)): symbol
+            for symbol in symbols
+        }
+        pending = set(futures)
+
+        while pending:
+            now = time.monotonic()
+            deadlines = [scan_start + total_timeout]
+            deadlines += [started[futures[f]] + symbol_timeout for f in pending if futures[f] in started]
+            done, pending = wait(pending, timeout=max(min(deadlines) - now, 0.01), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                symbol = futures[future]
+                try:
+                    res = future.result()
+                except Exception as e:
+                    results["errors"].append({
+                        "symbol": symbol,
+                        "error": str(e)
+                    })
+                    continue
 
                 if res.get("status") == "trade_signal":
                     results["signals"].append({
@@ -205,13 +312,34 @@ class TradeService:
                         "reason": res.get("reason")
                     })
 
-            except Exception as e:
-                results["errors"].append({
+            # Thread không kill được: symbol quá hạn bị bỏ qua, kết quả đến sau bị bỏ
+            now = time.monotonic()
+            total_expired = now - scan_start >= total_timeout
+            for future in list(pending):
+                symbol = futures[future]
+                if symbol in started and now - started[symbol] >= symbol_timeout:
+                    reason = f"Quá {symbol_timeout}s cho mã này"
+                elif total_expired:
+                    reason = f"Hết {total_timeout}s cho cả lần scan"
+                else:
+                    continue
+                if not future.cancel():
+                    # Đang chạy → thread vẫn bị giữ tới khi upstream trả / hết HTTP timeout
+                    self._track_stuck(pool, future)
+                pending.discard(future)
+                results["timeouts"].append({
                     "symbol": symbol,
-                    "error": str(e)
+                    "reason": reason
                 })
 
+        # Giữ thứ tự như input
+        order = {symbol: i for i, symbol in enumerate(symbols)}
+        for key in ("signals", "no_setup", "errors", "timeouts"):
+            results[key].sort(key=lambda item: order.get(item["symbol"], 0))
+
         results["signals_found"] = len(results["signals"])
+        results["partial"] = bool(results["timeouts"])
+        results["elapsed_ms"] = round((time.monotonic() - scan_start) * 1000)
         results["minutes"] = minutes
         results["interval"] = interval
         results["strategies"] = strategies
@@ -221,6 +349,14 @@ class TradeService:
     # ==================================================
     # VALIDATE
     # ==================================================
+    @staticmethod
+    def _level_error(entry: float, sl: float, tp: float) -> Optional[str]:
+        if sl >= entry:
+            return "SL phải nhỏ hơn entry"
+        if tp <= entry:
+            return "TP phải lớn hơn entry"
+        return None
+
     def validate_trade(
         self,
         symbol: str,
@@ -231,15 +367,9 @@ class TradeService:
         """
         Validate trade parameters
         """
-        if sl >= entry:
-            return {"valid": False, "error": "SL phải nhỏ hơn entry"}
-
-        if tp <= entry:
-            return {"valid": False, "error": "TP phải lớn hơn entry"}
-
-        risk = entry - sl
-        reward = tp - entry
-        rr = reward / risk if risk > 0 else 0
+        error = self._level_error(entry, sl, tp)
+        if error:
+            return {"valid": False, "error": error}
 
         try:
             snapshot = self.stock_service.snapshot(symbol)
@@ -247,6 +377,21 @@ class TradeService:
         except Exception:
             current_price = None
 
+        return self.trade_levels(symbol, entry, sl, tp, current_price)
+
+    @staticmethod
+    def trade_levels(
+        symbol: str,
+        entry: float,
+        sl: float,
+        tp: float,
+        current_price: Optional[float]
+    ) -> Dict[str, Any]:
+        """Kết quả validate_trade (SL / TP đã hợp lệ) với giá hiện tại đã fetch"""
+        risk = entry - sl
+        reward = tp - entry
+        rr = reward / risk if risk > 0 else 0
+
         return {
             "valid": True,
             "symbol": symbol,
@@ -1,8 +1,13 @@
-import pandas_ta as ta
 import math
+from src.strategies.indicators import IndicatorContext
 
 
 class TradeSignalBuilder:
+    # SL / TP theo ATR (dùng chung với backtest)
+    ATR_LENGTH = 14
+    SL_ATR_MULT = 1.2
+    TP_ATR_MULT = 2.5
+
     def __init__(self, rr_min=2.0, shark_min_score=70):
         self.rr_min = rr_min
         self.shark_min_score = shark_min_score
@@ -39,10 +44,10 @@ class TradeSignalBuilder:
     # ==================================================
     # INDICATORS
     # ==================================================
-    def _apply_indicators(self, df):
-        df["ema10"] = ta.ema(df["close"], 10)
-        df["ema21"] = ta.ema(df["close"], 21)
-        df["atr"] = ta.atr(df["high"], df["low"], df["close"], 14)
+    def _apply_indicators(self, df, ctx):
+        df["ema10"] = ctx.ema(10)
+        df["ema21"] = ctx.ema(21)
+        df["atr"] = ctx.atr(self.ATR_LENGTH)
         return df
 
     # ==================================================
@@ -81,6 +86,13 @@ class TradeSignalBuilder:
     # ==================================================
     # SETUPS
     # ==================================================
+    @staticmethod
+    def zone_entry(zone):
+        """Entry giữa vùng order block (None nếu zone không hợp lệ)"""
+        if zone.get("low") and zone.get("high"):
+            return round((zone["low"] + zone["high"]) / 2, 2)
+        return None
+
     def _detect_setups(self, strategy_results, debug, reasons):
         score = 0
         entry = None
@@ -92,9 +104,8 @@ class TradeSignalBuilder:
 
         ob = strategy_results.get("order_block", {}).get("signals", [])
         if ob:
-            zone = ob[-1].get("zone", {})
-            if zone.get("low") and zone.get("high"):
-                entry = round((zone["low"] + zone["high"]) / 2, 2)
+            entry = self.zone_entry(ob[-1].get("zone", {}))
+            if entry is not None:
                 score += 20
                 reasons.append("Order Block")
                 debug["order_block"] = True
@@ -109,18 +120,18 @@ class TradeSignalBuilder:
     # ==================================================
     # RISK
     # ==================================================
-    def _risk(self, entry, last, reasons, debug):
+    def _risk(self, entry, last, reasons, debug, rr_min):
         atr = self._safe_float(last["atr"])
         if not atr:
             return None
 
-        sl = round(entry - atr * 1.2, 2)
-        tp = round(entry + atr * 2.5, 2)
+        sl = round(entry - atr * self.SL_ATR_MULT, 2)
+        tp = round(entry + atr * self.TP_ATR_MULT, 2)
 
         rr = (tp - entry) / (entry - sl) if entry > sl else 0
         debug["rr"] = round(rr, 2)
 
-        if rr < self.rr_min:
+        if rr < rr_min:
             reasons.append("RR không đạt")
             return None
 
@@ -129,7 +140,10 @@ class TradeSignalBuilder:
     # ==================================================
     # MAIN
     # ==================================================
-    def build(self, df, strategy_results):
+    def build(self, df, strategy_results, rr_min=None, ctx=None):
+        # rr_min truyền theo từng lần build để dùng chung builder giữa các thread
+        rr_min = self.rr_min if rr_min is None else rr_min
+
         ok, error = self._validate(df, strategy_results)
         if not ok:
             return {
@@ -139,7 +153,8 @@ class TradeSignalBuilder:
                 "shark_score": 0,
             }
 
-        df = self._apply_indicators(df.copy())
+        ctx = IndicatorContext.for_frame(ctx, df)
+        df = self._apply_indicators(df.copy(), ctx)
         last = df.iloc[-1]
 
         debug = {}
@@ -166,7 +181,7 @@ class TradeSignalBuilder:
         if entry is None:
             entry = float(last["close"])
 
-        risk = self._risk(entry, last, reasons, debug)
+        risk = self._risk(entry, last, reasons, debug, rr_min)
         if not risk:
             return {
                 "action": "no_trade",
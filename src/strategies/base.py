@@ -2,12 +2,15 @@
 # BASE STRATEGY
 # =============================================================================
 from abc import ABC, abstractmethod
-import pandas as pd
+
+from src.utils.serialization import iso_times
 
 
 class BaseStrategy(ABC):
     name = "base"
     required_columns = ["time", "open", "high", "low", "close", "volume"]
+    min_bars = 0        # apply() cần ít nhất ngần này nến mới trả tín hiệu
+    confirm_bars = 0    # số nến sau nến tín hiệu cần để xác nhận (vd OB chờ BOS)
 
     def _validate_dataframe(self, df):
         """Validate DataFrame has required columns and sufficient data"""
@@ -20,32 +23,40 @@ class BaseStrategy(ABC):
         
         return True, None
 
-    def _serialize_value(self, value):
-        """Convert pandas/numpy types to JSON-serializable types"""
-        if pd.isna(value):
-            return None
-        if isinstance(value, (pd.Timestamp, pd.DatetimeTZDtype)):
-            return value.isoformat()
-        if hasattr(value, 'item'):  # numpy types
-            return value.item()
-        return value
-
-    def _serialize_row(self, row, columns):
-        """Serialize a DataFrame row to dict"""
-        result = {}
-        for col in columns:
-            if col in row.index:
-                value = row[col]
-                if col == 'time':
-                    result[col] = value.isoformat() if hasattr(value, 'isoformat') else str(value)
-                else:
-                    result[col] = self._serialize_value(value)
-        return result
+    def _emit_signals(self, df, cond, build, columns, limit=3):
+        """
+        Các dòng thỏa cond → list tín hiệu, không iterrows
+
+        Args:
+            cond: Series bool cùng index với df
+            build: build(time_iso, *values) → dict tín hiệu,
+                   values là Python float theo thứ tự columns
+            columns: Các cột truyền cho build
+            limit: Chỉ lấy `limit` tín hiệu cuối (mặc định 3 như trước),
+                   None / 0 → mọi tín hiệu (vd backtest)
+        """
+        mask = cond.to_numpy(dtype=bool, na_value=False)
+        rows = mask.nonzero()[0]
+        if limit:
+            rows = rows[-limit:]
+        if len(rows) == 0:
+            return []
+
+        times = iso_times(df["time"].iloc[rows])
+        values = [df[col].to_numpy()[rows].tolist() for col in columns]
+        return [build(t, *row) for t, row in zip(times, zip(*values))]
+
+    @staticmethod
+    def _signal_limit(inputs):
+        """inputs["signal_limit"]: số tín hiệu cuối trả về (None / 0 = tất cả)"""
+        return inputs.get("signal_limit", 3)
 
     @abstractmethod
-    def apply(self, df):
+    def apply(self, df, inputs=None, ctx=None):
         """
         Apply strategy to DataFrame
+
+        ctx: IndicatorContext dùng chung trong 1 lần run (tránh tính lại EMA / RVOL ...)
         
         Returns:
         {
@@ -54,3 +65,36 @@ class BaseStrategy(ABC):
         }
         """
         pass
+
+    # ==================================================
+    # INCREMENTAL (STREAMING)
+    # ==================================================
+    @abstractmethod
+    def reset(self, inputs=None):
+        """Khởi tạo state cho update(bar) với inputs giống apply()"""
+
+    @abstractmethod
+    def update(self, bar):
+        """
+        Fold 1 nến đã đóng vào state, O(1) mỗi nến
+
+        Mọi strategy trong STRATEGY_REGISTRY đều phải cài đặt (StreamHub / replay()
+        gọi trực tiếp, không có đường fallback về apply()).
+
+        Args:
+            bar: dict {time, open, high, low, close, volume} (nến theo thứ tự time)
+
+        Returns:
+            List tín hiệu mới xác nhận ở nến này (cùng format với apply()).
+            Tập tín hiệu phát ra qua các lần update giống hệt các dòng thỏa
+            điều kiện của apply() trên cùng chuỗi nến; apply() mặc định chỉ giữ
+            3 tín hiệu cuối (inputs["signal_limit"]).
+        """
+
+    def replay(self, df, inputs=None):
+        """reset() rồi update() lần lượt từng nến của df, trả về mọi tín hiệu"""
+        self.reset(inputs)
+        signals = []
+        for bar in df[self.required_columns].to_dict("records"):
+            signals.extend(self.update(bar))
+        return signals
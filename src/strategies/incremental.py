@@ -0,0 +1,144 @@
+# strategies/incremental.py
+"""
+Indicator dạng streaming cho BaseStrategy.update(bar)
+
+Mỗi class giữ state O(1) (hoặc O(window)) và cho ra đúng giá trị
+mà bản batch (pandas_ta / pandas rolling) cho ở cùng vị trí nến.
+Giá trị chưa đủ dữ liệu là None (tương ứng NaN của bản batch).
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+
+class RollingEMA:
+    """
+    EMA giống pandas_ta.ema (sma=True, adjust=False)
+    - length - 1 nến đầu: None
+    - Nến thứ length: SMA của length giá đầu tiên
+    - Sau đó: công thức của pandas ewm(adjust=False)
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2 / (length + 1)
+        self.value = None
+        self._seed = []
+
+    def update(self, x):
+        if self.value is None:
+            self._seed.append(x)
+            if len(self._seed) == self.length:
+                self.value = float(np.mean(self._seed))
+                self._seed = None
+            return self.value
+
+        if self.value != x:
+            old = 1.0 - self.alpha
+            self.value = (old * self.value + self.alpha * x) / (old + self.alpha)
+        return self.value
+
+
+class RollingSMA:
+    """SMA(length) bằng tổng chạy (chính xác tuyệt đối với volume nguyên)"""
+
+    def __init__(self, length):
+        self.length = length
+        self.value = None
+        self._window = deque()
+        self._sum = 0
+
+    def update(self, x):
+        self._window.append(x)
+        self._sum += x
+        if len(self._window) > self.length:
+            self._sum -= self._window.popleft()
+        self.value = self._sum / self.length if len(self._window) == self.length else None
+        return self.value
+
+
+class RollingExtreme:
+    """
+    Rolling max / min (window nến, gồm nến hiện tại) bằng monotonic deque
+    Giống Series.rolling(window).max() / .min()
+    """
+
+    def __init__(self, window, mode="max"):
+        self.window = window
+        self.mode = mode
+        self.value = None
+        self._count = 0
+        self._deque = deque()   # (index, value), value đơn điệu
+
+    def update(self, x):
+        i = self._count
+        self._count += 1
+
+        if self.mode == "max":
+            while self._deque and self._deque[-1][1] <= x:
+                self._deque.pop()
+        else:
+            while self._deque and self._deque[-1][1] >= x:
+                self._deque.pop()
+        self._deque.append((i, x))
+
+        if self._deque[0][0] <= i - self.window:
+            self._deque.popleft()
+
+        self.value = self._deque[0][1] if self._count >= self.window else None
+        return self.value
+
+
+class DailyVWAP:
+    """
+    VWAP reset mỗi ngày, giống pandas_ta.vwap(anchor="D")
+    Ngày lấy theo time của nến (đã ở timezone thị trường).
+    Tổng price * volume cộng dồn kiểu Kahan như groupby().cumsum() của pandas.
+    """
+
+    def __init__(self):
+        self.value = None
+        self._day = None
+        self._pv = 0.0
+        self._compensation = 0.0
+        self._volume = 0
+
+    def update(self, time, high, low, close, volume):
+        day = time.date()
+        if day != self._day:
+            self._day = day
+            self._pv = 0.0
+            self._compensation = 0.0
+            self._volume = 0
+
+        y = (high + low + close) / 3.0 * volume - self._compensation
+        t = self._pv + y
+        self._compensation = t - self._pv - y
+        self._pv = t
+        self._volume += volume
+        self.value = self._pv / self._volume if self._volume else None
+        return self.value
+
+
+class RelativeVolume:
+    """rvol = volume / SMA(volume, length), giống IndicatorContext.rvol"""
+
+    def __init__(self, length=20):
+        self.sma = RollingSMA(length)
+        self.value = None
+
+    def update(self, volume):
+        sma = self.sma.update(volume)
+        if sma is None:
+            self.value = None
+        elif sma == 0:
+            self.value = math.nan if volume == 0 else math.inf
+        else:
+            self.value = volume / sma
+        return self.value
+
+
+def gt(a, b):
+    """a > b, None (NaN) → False như so sánh của pandas"""
+    return a is not None and b is not None and a > b
@@ -0,0 +1,73 @@
+# strategies/indicators.py
+import pandas_ta as ta
+
+
+class IndicatorContext:
+    """
+    Cache indicator cho 1 DataFrame trong 1 lần run (vd 1 request /signal)
+
+    Strategy, MarketStateService và TradeSignalBuilder cùng lấy indicator
+    từ đây nên mỗi (indicator, params) chỉ tính 1 lần.
+    Series trả về dùng chung → không được sửa in-place.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+
+    @classmethod
+    def for_frame(cls, ctx, df):
+        """Dùng lại ctx nếu được tạo cho đúng DataFrame này, ngược lại tạo mới"""
+        if ctx is not None and ctx.df is df:
+            return ctx
+        return cls(df)
+
+    def get(self, name, compute, *params):
+        key = (name,) + params
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        value = compute()
+        self._cache[key] = value
+        return value
+
+    # ==================================================
+    # INDICATORS
+    # ==================================================
+    def ema(self, length, column="close"):
+        return self.get("ema", lambda: ta.ema(self.df[column], length), column, length)
+
+    def sma(self, length, column="close"):
+        return self.get("sma", lambda: ta.sma(self.df[column], length), column, length)
+
+    def atr(self, length=14):
+        return self.get(
+            "atr",
+            lambda: ta.atr(self.df["high"], self.df["low"], self.df["close"], length=length),
+            length
+        )
+
+    def rvol(self, length=20):
+        """Relative volume = volume / SMA(volume, length)"""
+        return self.get(
+            "rvol",
+            lambda: self.df["volume"] / self.sma(length, column="volume"),
+            length
+        )
+
+    def rolling_max(self, window, column="high"):
+        return self.get("rolling_max", lambda: self.df[column].rolling(window).max(), column, window)
+
+    def rolling_min(self, window, column="low"):
+        return self.get("rolling_min", lambda: self.df[column].rolling(window).min(), column, window)
+
+    def stats(self):
+        return {
+            "indicators": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -1,35 +1,45 @@
-import pandas_ta as ta
 from src.strategies.base import BaseStrategy
+from src.strategies.incremental import RelativeVolume, RollingEMA, RollingExtreme, gt
+from src.strategies.indicators import IndicatorContext
 
 
 class OrderBlockStrategy(BaseStrategy):
     name = "order_block"
+    min_bars = 200
+    confirm_bars = 1
 
-    def apply(self, df, inputs=None):
+    @staticmethod
+    def _inputs(inputs):
+        return (
+            inputs.get("volume_mult", 1.5),
+            inputs.get("bos_lookback", 5),
+            inputs.get("wick_ratio", 0.6),
+        )
+
+    def apply(self, df, inputs=None, ctx=None):
         inputs = inputs or {}
 
-        volume_mult = inputs.get("volume_mult", 1.5)
-        bos_lookback = inputs.get("bos_lookback", 5)
-        wick_ratio = inputs.get("wick_ratio", 0.6)
+        volume_mult, bos_lookback, wick_ratio = self._inputs(inputs)
 
         valid, error = self._validate_dataframe(df)
-        if not valid or len(df) < 200:
+        if not valid or len(df) < self.min_bars:
             return {
                 "signals": [],
                 "plots": [],
                 "meta": {"error": error}
             }
 
+        ctx = IndicatorContext.for_frame(ctx, df)
         df = df.copy()
 
         # =========================
         # Indicators
         # =========================
-        df["ema50"] = ta.ema(df["close"], 50)
-        df["ema200"] = ta.ema(df["close"], 200)
-        df["rvol"] = df["volume"] / ta.sma(df["volume"], 20)
+        df["ema50"] = ctx.ema(50)
+        df["ema200"] = ctx.ema(200)
+        df["rvol"] = ctx.rvol(20)
 
-        prev_high = df["high"].rolling(bos_lookback).max().shift(1)
+        prev_high = ctx.rolling_max(bos_lookback).shift(1)
         df["bos"] = df["close"] > prev_high
 
         body = (df["close"] - df["open"]).abs()
@@ -46,17 +56,9 @@ class OrderBlockStrategy(BaseStrategy):
             (wick < body * wick_ratio)
         )
 
-        signals = []
-        for _, row in df[cond].tail(3).iterrows():
-            signals.append({
-                "type": "bullish_order_block",
-                "time": row["time"].isoformat(),
-                "zone": {
-                    "low": round(row["low"], 2),
-                    "high": round(row["open"], 2)
-                },
-                "rvol": round(row["rvol"], 2)
-            })
+        signals = self._emit_signals(
+            df, cond, self._signal, ["low", "open", "rvol"], self._signal_limit(inputs)
+        )
 
         return {
             "signals": signals,
@@ -75,3 +77,53 @@ class OrderBlockStrategy(BaseStrategy):
                 ]
             }
         }
+
+    @staticmethod
+    def _signal(time, low, open_, rvol):
+        return {
+            "type": "bullish_order_block",
+            "time": time,
+            "zone": {
+                "low": round(low, 2),
+                "high": round(open_, 2)
+            },
+            "rvol": round(rvol, 2)
+        }
+
+    # ==================================================
+    # INCREMENTAL
+    # ==================================================
+    def reset(self, inputs=None):
+        self.inputs = inputs or {}
+        self.volume_mult, bos_lookback, self.wick_ratio = self._inputs(self.inputs)
+        self._ema50 = RollingEMA(50)
+        self._ema200 = RollingEMA(200)
+        self._rvol = RelativeVolume(20)
+        self._high = RollingExtreme(bos_lookback, "max")
+        self._candidate = None
+
+    def update(self, bar):
+        """OB ở nến trước được xác nhận khi nến này BOS → tín hiệu trễ 1 nến như apply()"""
+        close, open_ = bar["close"], bar["open"]
+
+        prev_high = self._high.value
+        self._high.update(bar["high"])
+        ema50 = self._ema50.update(close)
+        ema200 = self._ema200.update(close)
+        rvol = self._rvol.update(bar["volume"])
+
+        signals = []
+        if self._candidate is not None and gt(close, prev_high):
+            signals.append(self._signal(*self._candidate))
+
+        body = abs(close - open_)
+        wick = bar["high"] - max(close, open_)
+        self._candidate = None
+        if (
+            close < open_ and
+            gt(rvol, self.volume_mult) and
+            gt(ema50, ema200) and
+            wick < body * self.wick_ratio
+        ):
+            self._candidate = (bar["time"].isoformat(), bar["low"], open_, rvol)
+        return signals
@@ -1,27 +1,43 @@
+import numpy as np
 import pandas_ta as ta
 from src.strategies.base import BaseStrategy
+from src.strategies.incremental import DailyVWAP, RelativeVolume, RollingExtreme, gt
+from src.strategies.indicators import IndicatorContext
 
 
 class SMCStrategy(BaseStrategy):
     name = "smc"
+    min_bars = 60
 
-    def apply(self, df, inputs=None):
+    @staticmethod
+    def _inputs(inputs):
+        return (
+            inputs.get("rvol", 1.5),
+            inputs.get("bos_window", 8),
+            inputs.get("bos_strength", 0.0015),  # 0.15%
+            inputs.get("wick_ratio", 0.6),
+        )
+
+    def apply(self, df, inputs=None, ctx=None):
         inputs = inputs or {}
 
-        rvol_thres = inputs.get("rvol", 1.5)
-        bos_window = inputs.get("bos_window", 8)
-        bos_strength = inputs.get("bos_strength", 0.0015)  # 0.15%
-        wick_ratio = inputs.get("wick_ratio", 0.6)
+        rvol_thres, bos_window, bos_strength, wick_ratio = self._inputs(inputs)
 
         valid, error = self._validate_dataframe(df)
-        if not valid or len(df) < 60:
+        if not valid or len(df) < self.min_bars:
             return {
                 "signals": [],
                 "plots": [],
                 "meta": {"error": error}
             }
 
-        df = df.copy().sort_values("time")
+        # Indicator dùng chung chỉ đúng khi df đã sort theo time
+        if df["time"].is_monotonic_increasing:
+            ctx = IndicatorContext.for_frame(ctx, df)
+            df = df.copy()
+        else:
+            df = df.copy().sort_values("time")
+            ctx = IndicatorContext(df)
 
         # =========================
         # Indicators
@@ -30,9 +46,9 @@ class SMCStrategy(BaseStrategy):
             df["high"], df["low"], df["close"], df["volume"]
         )
 
-        df["rvol"] = df["volume"] / ta.sma(df["volume"], 20)
+        df["rvol"] = ctx.rvol(20)
 
-        prev_high = df["high"].rolling(bos_window).max().shift(1)
+        prev_high = ctx.rolling_max(bos_window).shift(1)
         df["bos"] = ((df["close"] - prev_high) / df["close"]) > bos_strength
 
         body = (df["close"] - df["open"]).abs()
@@ -41,7 +57,11 @@ class SMCStrategy(BaseStrategy):
         # =========================
         # Conditions
         # =========================
+        # Nến thứ i chỉ phát tín hiệu khi đã có min_bars nến (như update() khi stream)
+        warm = np.arange(len(df)) >= self.min_bars - 1
         cond = (
+            warm &
+            (df["close"] > 0) &
             df["bos"].fillna(False) &
             (df["rvol"] > rvol_thres) &
             (df["vwap"].notna()) &
@@ -49,15 +69,9 @@ class SMCStrategy(BaseStrategy):
             (wick < body * wick_ratio)
         )
 
-        signals = []
-        for _, row in df[cond].tail(3).iterrows():
-            signals.append({
-                "type": "bos_confirmed",
-                "time": row["time"].isoformat(),
-                "close": round(row["close"], 2),
-                "vwap": round(row["vwap"], 2),
-                "rvol": round(row["rvol"], 2)
-            })
+        signals = self._emit_signals(
+            df, cond, self._signal, ["close", "vwap", "rvol"], self._signal_limit(inputs)
+        )
 
         return {
             "signals": signals,
@@ -75,3 +89,48 @@ class SMCStrategy(BaseStrategy):
                 ]
             }
         }
+
+    @staticmethod
+    def _signal(time, close, vwap, rvol):
+        return {
+            "type": "bos_confirmed",
+            "time": time,
+            "close": round(close, 2),
+            "vwap": round(vwap, 2),
+            "rvol": round(rvol, 2)
+        }
+
+    # ==================================================
+    # INCREMENTAL
+    # ==================================================
+    def reset(self, inputs=None):
+        self.inputs = inputs or {}
+        self.rvol_thres, bos_window, self.bos_strength, self.wick_ratio = self._inputs(self.inputs)
+        self._vwap = DailyVWAP()
+        self._rvol = RelativeVolume(20)
+        self._high = RollingExtreme(bos_window, "max")
+        self._count = 0
+
+    def update(self, bar):
+        close, open_ = bar["close"], bar["open"]
+        self._count += 1
+
+        # rolling_max(bos_window).shift(1): max của các nến trước nến này
+        prev_high = self._high.value
+        self._high.update(bar["high"])
+        vwap = self._vwap.update(bar["time"], bar["high"], bar["low"], close, bar["volume"])
+        rvol = self._rvol.update(bar["volume"])
+
+        body = abs(close - open_)
+        wick = bar["high"] - max(close, open_)
+
+        if (
+            self._count >= self.min_bars and
+            close > 0 and
+            prev_high is not None and (close - prev_high) / close > self.bos_strength and
+            gt(rvol, self.rvol_thres) and
+            gt(close, vwap) and
+            wick < body * self.wick_ratio
+        ):
+            return [self._signal(bar["time"].isoformat(), close, vwap, rvol)]
+        return []
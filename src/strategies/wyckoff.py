@@ -1,15 +1,20 @@
-import pandas_ta as ta
 from src.strategies.base import BaseStrategy
+from src.strategies.incremental import RelativeVolume, RollingEMA, RollingExtreme, gt
+from src.strategies.indicators import IndicatorContext
 
 
 class WyckoffStrategy(BaseStrategy):
     name = "wyckoff"
+    min_bars = 30
 
-    def apply(self, df, inputs=None):
+    @staticmethod
+    def _inputs(inputs):
+        return inputs.get("range_window", 30), inputs.get("rvol", 1.5)
+
+    def apply(self, df, inputs=None, ctx=None):
         inputs = inputs or {}
 
-        window = inputs.get("range_window", 30)
-        rvol_thres = inputs.get("rvol", 1.5)
+        window, rvol_thres = self._inputs(inputs)
 
         valid, error = self._validate_dataframe(df)
         if not valid or len(df) < window:
@@ -19,14 +24,15 @@ class WyckoffStrategy(BaseStrategy):
                 "meta": {"error": error}
             }
 
+        ctx = IndicatorContext.for_frame(ctx, df)
         df = df.copy()
 
         # =========================
         # Indicators
         # =========================
-        df["range_low"] = df["low"].rolling(window).min()
-        df["ema50"] = ta.ema(df["close"], 50)
-        df["rvol"] = df["volume"] / ta.sma(df["volume"], 20)
+        df["range_low"] = ctx.rolling_min(window)
+        df["ema50"] = ctx.ema(50)
+        df["rvol"] = ctx.rvol(20)
 
         # =========================
         # Spring (relaxed)
@@ -38,15 +44,9 @@ class WyckoffStrategy(BaseStrategy):
             (df["close"] > df["ema50"])
         )
 
-        signals = []
-        for _, row in df[spring].tail(3).iterrows():
-            signals.append({
-                "type": "wyckoff_spring",
-                "time": row["time"].isoformat(),
-                "close": round(row["close"], 2),
-                "range_low": round(row["range_low"], 2),
-                "rvol": round(row["rvol"], 2)
-            })
+        signals = self._emit_signals(
+            df, spring, self._signal, ["close", "range_low", "rvol"], self._signal_limit(inputs)
+        )
 
         return {
             "signals": signals,
@@ -65,3 +65,43 @@ class WyckoffStrategy(BaseStrategy):
                 ]
             }
         }
+
+    @staticmethod
+    def _signal(time, close, range_low, rvol):
+        return {
+            "type": "wyckoff_spring",
+            "time": time,
+            "close": round(close, 2),
+            "range_low": round(range_low, 2),
+            "rvol": round(rvol, 2)
+        }
+
+    # ==================================================
+    # INCREMENTAL
+    # ==================================================
+    def reset(self, inputs=None):
+        self.inputs = inputs or {}
+        window, self.rvol_thres = self._inputs(self.inputs)
+        self.min_bars = window
+        self._range_low = RollingExtreme(window, "min")
+        self._ema50 = RollingEMA(50)
+        self._rvol = RelativeVolume(20)
+
+    def update(self, bar):
+        close = bar["close"]
+
+        # range_low.shift(1): đáy range tính đến nến trước
+        prev_low = self._range_low.value
+        range_low = self._range_low.update(bar["low"])
+        ema50 = self._ema50.update(close)
+        rvol = self._rvol.update(bar["volume"])
+
+        if (
+            prev_low is not None and
+            bar["low"] < prev_low * 1.001 and
+            close > prev_low and
+            gt(rvol, self.rvol_thres) and
+            gt(close, ema50)
+        ):
+            return [self._signal(bar["time"].isoformat(), close, range_low, rvol)]
+        return []
@@ -1,13 +1,16 @@
 # utils/df_utils.py
 import pandas as pd
 
+from src.utils.metrics import stage
+
 def normalize_df_time(df: pd.DataFrame, col="time", tz="Asia/Ho_Chi_Minh"):
-    df[col] = pd.to_datetime(df[col], errors="coerce")
+    with stage("normalize_time"):
+        df[col] = pd.to_datetime(df[col], errors="coerce")
 
-    if df[col].dt.tz is None:
-        df[col] = df[col].dt.tz_localize(tz)
-    else:
-        df[col] = df[col].dt.tz_convert(tz)
+        if df[col].dt.tz is None:
+            df[col] = df[col].dt.tz_localize(tz)
+        else:
+            df[col] = df[col].dt.tz_convert(tz)
 
     return df
 
@@ -0,0 +1,206 @@
+# utils/log_utils.py
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from src.config import Config
+
+# Request ID của request đang xử lý (middleware set, log record tự gắn)
+REQUEST_ID = contextvars.ContextVar("request_id", default="-")
+
+# Thuộc tính có sẵn của LogRecord → phần còn lại là field structured (extra=...)
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def set_request_id(request_id):
+    """Gắn request ID cho context hiện tại, trả token để reset"""
+    return REQUEST_ID.set(request_id or new_request_id())
+
+
+def bind_context(func, *args, **kwargs):
+    """
+    Callable chạy func trong bản copy context hiện tại (giữ request_id)
+    Dùng khi submit vào ThreadPoolExecutor / run_in_executor (không tự copy context).
+    """
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+
+
+# ==================================================
+# FORMATTERS
+# ==================================================
+class JsonFormatter(logging.Formatter):
+    """1 dòng JSON / record: ts, level, logger, msg, request_id + field extra"""
+
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            **_fields(record),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Dạng đọc tay khi dev: giờ level [request_id] logger: msg key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record):
+        record.request_id = getattr(record, "request_id", "-")
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+# ==================================================
+# HANDLER
+# ==================================================
+class ContextQueueHandler(QueueHandler):
+    """
+    Handler phía request: chỉ gắn request_id + đẩy record vào queue (không I/O)
+    → format / ghi stderr chạy trên thread của QueueListener.
+    Queue đầy thì bỏ record (đếm dropped) thay vì block request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.request_id = REQUEST_ID.get()
+        # Chốt message + traceback ngay (args / frame có thể đổi hoặc giữ object lâu),
+        # format JSON / text để listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    """
+    Cấu hình logger "src": QueueHandler → QueueListener → stderr
+    Gọi 1 lần khi app start (idempotent).
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter() if (fmt or Config.LOG_FORMAT) == "json" else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        logger = logging.getLogger("src")
+        logger.setLevel((level or Config.LOG_LEVEL).upper())
+        logger.addHandler(ContextQueueHandler(log_queue))
+        logger.propagate = False
+
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Flush queue rồi dừng listener"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logger = logging.getLogger("src")
+        for handler in [h for h in logger.handlers if isinstance(h, ContextQueueHandler)]:
+            logger.removeHandler(handler)
+        logger.propagate = True
+        _listener = None
+
+
+# ==================================================
+# SAMPLING
+# ==================================================
+class ErrorSampler:
+    """
+    Lấy mẫu lỗi lặp lại: mỗi key (vd upstream + loại lỗi) chỉ log 1 lần / window giây,
+    lần log kế tiếp kèm số lần đã bỏ qua → upstream sập không làm ngập log
+    """
+
+    def __init__(self, window=None, maxsize=1024):
+        self.window = Config.LOG_SAMPLE_WINDOW if window is None else window
+        self.maxsize = maxsize
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Returns: số lần bị bỏ qua trước đó nếu được log, None nếu bỏ qua lần này"""
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (None, 0))
+            if last is not None and now - last < self.window:
+                self._state[key] = (last, suppressed + 1)
+                return None
+            if len(self._state) >= self.maxsize and key not in self._state:
+                self._state.clear()
+            self._state[key] = (now, 0)
+            return suppressed
+
+
+ERROR_SAMPLER = ErrorSampler()
+
+
+def log_upstream_error(logger, event, error, sampler=ERROR_SAMPLER, exc_info=False, **fields):
+    """
+    Log lỗi upstream (WARNING) có lấy mẫu theo (event, loại lỗi)
+
+    Lỗi lặp lại của cùng event trong LOG_SAMPLE_WINDOW giây chỉ log 1 lần,
+    field suppressed = số lần bị bỏ qua kể từ lần log trước.
+    """
+    suppressed = sampler.allow((event, type(error).__name__))
+    if suppressed is None:
+        return False
+    logger.warning(
+        "%s: %s", event, error,
+        exc_info=error if exc_info else None,
+        extra={"event": event, "error": type(error).__name__, "suppressed": suppressed, **fields},
+    )
+    return True
@@ -1,16 +1,16 @@
 from datetime import datetime
 
-def is_market_open(now: datetime) -> tuple[bool, str]:
+from src.utils.trading_calendar import LIVE_PHASES, PHASE_MESSAGES, market_phase
+
+
+def is_market_open(now: datetime = None) -> tuple[bool, str]:
     """
-    Kiểm tra thị trường mở cửa (9h-15h).
-    Trả về (True, "") nếu trong giờ giao dịch,
+    Kiểm tra thị trường đang khớp lệnh (ATO, liên tục, ATC) theo lịch giao dịch:
+    bỏ cuối tuần / nghỉ lễ, nghỉ trưa 11:30 – 13:00, sau ATC.
+    Trả về (True, "") nếu trong phiên,
     ngược lại trả về (False, thông báo).
     """
-    start_time = now.replace(hour=9, minute=0, second=0, microsecond=0)
-    end_time = now.replace(hour=15, minute=0, second=0, microsecond=0)
-
-    if now < start_time:
-        return False, "Thị trường chưa mở cửa"
-    elif now > end_time:
-        return False, "Thị trường đã đóng cửa"
-    return True, ""
+    phase = market_phase(now)
+    if phase in LIVE_PHASES:
+        return True, ""
+    return False, PHASE_MESSAGES[phase]
@@ -0,0 +1,226 @@
+# utils/metrics.py
+import math
+import threading
+import time
+from bisect import bisect_left
+
+from src.utils.log_utils import get_logger
+
+log = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Giây: từ cache hit (~0.1ms) tới upstream chậm / scan nhiều mã
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        return []
+
+    def render(self):
+        return self.header() + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(Metric):
+    """
+    Histogram bucket cố định: observe() = 1 bisect + vài phép cộng dưới lock,
+    không cấp phát object mới sau lần đầu gặp bộ label → để bật trong production
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [count từng bucket (+Inf ở cuối), sum, count]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def snapshot(self, *label_values):
+        """(count, sum) của 1 bộ label"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class _Timer:
+    """with HISTOGRAM.time(label): ... → observe thời gian chạy (perf_counter)"""
+
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class CallbackMetric(Metric):
+    """Gauge / counter đọc lúc scrape (vd kích thước cache) → không tốn gì trên request path"""
+
+    def __init__(self, name, help_text, labels, collect, kind="gauge"):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self):
+        try:
+            items = list(self.collect())
+        except Exception as e:
+            log.warning("Metric collect failed: %s", e, extra={"metric": self.name})
+            return []
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items if v is not None]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric đã tồn tại: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for m in metrics for line in m.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ==================================================
+# METRICS DÙNG CHUNG
+# ==================================================
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "Thời gian xử lý request theo route (không gồm stream SSE)",
+    ("method", "route", "status"),
+))
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "pipeline_stage_duration_seconds",
+    "Thời gian từng bước pipeline (ohlc_build, normalize_time, market_state, signal_builder, serialization)",
+    ("stage",),
+))
+
+STRATEGY_SECONDS = REGISTRY.register(Histogram(
+    "strategy_duration_seconds",
+    "Thời gian chạy từng strategy",
+    ("strategy",),
+))
+
+UPSTREAM_SECONDS = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds",
+    "Thời gian gọi upstream (vnstock / xno), không gồm thời gian chờ rate limit",
+    ("upstream",),
+))
+
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "upstream_errors_total",
+    "Lỗi upstream theo loại (gồm bị circuit breaker / rate limit từ chối)",
+    ("upstream", "error"),
+))
+
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "upstream_retries_total",
+    "Số lần retry lời gọi upstream",
+    ("upstream",),
+))
+
+
+def stage(name):
+    """with stage("ohlc_build"): ..."""
+    return STAGE_SECONDS.time(name)
@@ -0,0 +1,39 @@
+# utils/safe_path.py
+"""
+Kiểm tra symbol / interval trước khi dùng làm tên thư mục trên đĩa
+(HistoryStore, file capture, tick đã ghi của provider giả lập)
+"""
+import re
+from pathlib import Path
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9]{1,10}$")
+# 1m, 5m, 15m, 30m, 1H, 1D, 1W, 1M (+ chữ thường như vnstock chấp nhận)
+INTERVAL_PATTERN = re.compile(r"^[0-9]{1,3}[mhHdDwWM]$")
+
+
+class InvalidInputError(ValueError):
+    """Symbol / interval / đường dẫn không hợp lệ: lỗi của request, không phải của upstream"""
+
+
+def safe_symbol(symbol):
+    """Mã chứng khoán viết hoa; InvalidInputError nếu không phải 1–10 ký tự chữ / số"""
+    value = str(symbol).strip().upper()
+    if not SYMBOL_PATTERN.match(value):
+        raise InvalidInputError(f"Symbol không hợp lệ: {symbol!r}")
+    return value
+
+
+def safe_interval(interval):
+    value = str(interval).strip()
+    if not INTERVAL_PATTERN.match(value):
+        raise InvalidInputError(f"Interval không hợp lệ: {interval!r}")
+    return value
+
+
+def child_path(root, *parts):
+    """root / parts..., InvalidInputError nếu đường dẫn sau khi resolve nằm ngoài root"""
+    root = Path(root).resolve()
+    path = root.joinpath(*parts).resolve()
+    if not path.is_relative_to(root):
+        raise InvalidInputError(f"Đường dẫn nằm ngoài {root}: {path}")
+    return path
@@ -0,0 +1,118 @@
+# utils/serialization.py
+import datetime
+import decimal
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson là optional, fallback về json chuẩn
+    orjson = None
+
+CANDLE_FORMATS = ("records", "columnar")
+
+
+def iso_times(series):
+    """
+    Series datetime → list ISO string, giống Timestamp.isoformat()
+    nhưng format cả cột 1 lần bằng numpy thay vì từng Timestamp
+    """
+    if series.empty:
+        return []
+
+    values = pd.DatetimeIndex(series)
+    if (values.asi8 % 10**9).any():
+        # Có phần lẻ giây: isoformat từng giá trị cho đúng format
+        return [None if pd.isna(v) else v.isoformat() for v in values]
+
+    tz = values.tz
+    local = values.tz_localize(None) if tz is not None else values
+    text = np.datetime_as_string(local.values.astype("datetime64[s]"), unit="s")
+
+    if tz is None:
+        out = text.tolist()
+    else:
+        offset_s = (local.asi8 - values.asi8) // 10**9
+        offsets = np.unique(offset_s)
+        if len(offsets) == 1:
+            out = np.char.add(text, _format_offset(offsets[0])).tolist()
+        else:
+            suffix = np.array([_format_offset(o) for o in offset_s])
+            out = np.char.add(text, suffix).tolist()
+
+    if values.hasnans:
+        for i in np.flatnonzero(values.isna()):
+            out[i] = None
+    return out
+
+
+def _format_offset(seconds):
+    sign = "+" if seconds >= 0 else "-"
+    seconds = abs(int(seconds))
+    return f"{sign}{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+def column_values(series):
+    """Series → list giá trị JSON (NaN → None), convert cả cột qua numpy"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return iso_times(series)
+
+    values = series.to_numpy()
+    out = values.tolist()
+    if values.dtype.kind == "f":
+        nan = np.isnan(values)
+        if nan.any():
+            for i in np.flatnonzero(nan):
+                out[i] = None
+    return out
+
+
+def candles_to_columns(df, columns=None):
+    """DataFrame nến → {"time": [...], "open": [...], ...}"""
+    columns = columns or list(df.columns)
+    return {col: column_values(df[col]) for col in columns if col in df.columns}
+
+
+def candle_payload(df, fmt="records"):
+    """
+    Phần nến trong response
+    - records:  {"records": [{time, open, ...}, ...]}  (mặc định, như cũ)
+    - columnar: {"columns": {"time": [...], "open": [...], ...}}
+    """
+    if fmt == "columnar":
+        return {"columns": candles_to_columns(df)}
+    return {"records": df.to_dict("records")}
+
+
+def _default(value):
+    """Kiểu mà orjson / json không tự serialize được"""
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def json_dumps(content) -> bytes:
+    """JSON bytes bằng orjson nếu có (NaN → null), không thì json.dumps"""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
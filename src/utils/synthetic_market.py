@@ -0,0 +1,116 @@
+# utils/synthetic_market.py
+"""
+Dữ liệu thị trường giả lập (seed cố định → tái lập được) theo hình dạng HOSE:
+- Bước giá theo vùng giá (< 10k: 10đ, 10k–50k: 50đ, ≥ 50k: 100đ), giá tính theo nghìn đồng
+- Khối lượng theo lô 100
+- Khớp lệnh liên tục 9:15–11:30, 13:00–14:30 (nghỉ trưa không có tick),
+  ATO 1 lệnh lúc 9:15, ATC 1 lệnh lúc 14:45
+Dùng cho benchmark / test offline, không gọi upstream.
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.trading_calendar import CALENDAR, MARKET_TZ, SESSIONS
+
+LOT_SIZE = 100
+
+
+def tick_size(price):
+    """Bước giá HOSE (nghìn đồng) theo vùng giá"""
+    price = np.asarray(price, dtype=float)
+    return np.where(price < 10, 0.01, np.where(price < 50, 0.05, 0.1))
+
+
+def round_to_tick(price):
+    step = tick_size(price)
+    return np.round(np.round(np.asarray(price, dtype=float) / step) * step, 2)
+
+
+def _random_walk(rng, n, price):
+    """Giá đi -2..+2 bước giá mỗi tick, làm tròn về lưới bước giá, không âm"""
+    moves = rng.choice([-2, -1, 0, 0, 0, 1, 2], size=n) * tick_size(price)
+    return round_to_tick(np.maximum(price + np.cumsum(moves), 1.0))
+
+
+def _lots(rng, n, scale=10):
+    """Khối lượng bội số lô 100, phân phối lệch (nhiều lệnh nhỏ, ít lệnh lớn)"""
+    return (rng.geometric(1 / scale, size=n) * LOT_SIZE).astype(np.int64)
+
+
+def continuous_seconds(day):
+    """Mốc giây (Timestamp naive) trong các phiên khớp lệnh liên tục của 1 ngày"""
+    day = pd.Timestamp(day).normalize()
+    parts = [
+        pd.date_range(day + pd.Timedelta(hours=s.hour, minutes=s.minute),
+                      day + pd.Timedelta(hours=e.hour, minutes=e.minute),
+                      freq="1s", inclusive="left")
+        for s, e, name in SESSIONS if name == "continuous"
+    ]
+    return parts[0].append(parts[1:])
+
+
+def synthetic_ticks(n=10000, seed=42, price=25.0, day="2025-12-15", tz=MARKET_TZ):
+    """
+    Tick 1 ngày: ATO + n tick khớp liên tục + ATC
+
+    Returns:
+        DataFrame ['time', 'price', 'volume', 'match_type', 'id'] như vnstock intraday
+    """
+    rng = np.random.default_rng(seed)
+    seconds = continuous_seconds(day)
+    # Nhiều tick có thể trùng giây (như upstream); thời gian tăng dần
+    times = seconds[np.sort(rng.integers(0, len(seconds), size=n))]
+
+    prices = _random_walk(rng, n + 2, price)
+    volume = _lots(rng, n + 2)
+    volume[[0, -1]] *= 50                     # ATO / ATC khớp khối lượng lớn
+
+    day = pd.Timestamp(day).normalize()
+    ato = day + pd.Timedelta(hours=9, minutes=15)
+    atc = day + pd.Timedelta(hours=14, minutes=45)
+    time = pd.DatetimeIndex([ato]).append(times).append(pd.DatetimeIndex([atc]))
+    if tz:
+        time = time.tz_localize(tz)
+
+    side = rng.choice(["Buy", "Sell"], size=n)
+    return pd.DataFrame({
+        "time": time,
+        "price": prices,
+        "volume": volume,
+        "match_type": np.concatenate([["ATO"], side, ["ATC"]]),
+        "id": np.arange(n + 2, dtype=np.int64),
+    })
+
+
+def session_minutes(bars, start="2025-12-15", tz=MARKET_TZ, freq="1min"):
+    """bars mốc nến liên tiếp trong phiên khớp liên tục, qua các ngày giao dịch kế tiếp"""
+    first = pd.Timestamp(start).normalize()
+    step = int(pd.Timedelta(freq).total_seconds())
+    offsets = (continuous_seconds(first)[::step] - first).to_numpy()
+
+    days = np.busday_offset(first.date(), np.arange(-(-bars // len(offsets))), roll="forward", busdaycal=CALENDAR)
+    stamps = np.add.outer(days.astype("datetime64[ns]"), offsets).ravel()[:bars]
+    index = pd.DatetimeIndex(stamps)
+    return index.tz_localize(tz) if tz else index
+
+
+def synthetic_candles(bars=1000, seed=42, price=25.0, start="2025-12-15", tz=MARKET_TZ, freq="1min"):
+    """
+    Nến OHLCV trong giờ khớp lệnh (bỏ nghỉ trưa, cuối tuần, ngày lễ)
+
+    Returns:
+        DataFrame ['time', 'open', 'high', 'low', 'close', 'volume']
+    """
+    rng = np.random.default_rng(seed)
+    close = _random_walk(rng, bars, price)
+    open_ = np.r_[round_to_tick(price), close[:-1]]
+    step = tick_size(close)
+    wick = rng.choice([0, 0, 1, 2], size=(2, bars))
+    return pd.DataFrame({
+        "time": session_minutes(bars, start, tz, freq),
+        "open": open_,
+        "high": np.round(np.maximum(open_, close) + wick[0] * step, 2),
+        "low": np.round(np.maximum(np.minimum(open_, close) - wick[1] * step, step), 2),
+        "close": close,
+        "volume": _lots(rng, bars, scale=50),
+    })
@@ -0,0 +1,233 @@
+# utils/trading_calendar.py
+"""
+Lịch giao dịch HOSE / HNX: thứ 2 – thứ 6, trừ ngày nghỉ lễ, và các phiên
+trong ngày (ATO, khớp lệnh liên tục, nghỉ trưa, ATC, thỏa thuận)
+
+Ngày nghỉ đọc từ file (MARKET_HOLIDAYS_FILE, mặc định vn_holidays.txt cạnh module),
+cập nhật theo thông báo hằng năm của sở; thêm ngày nghỉ đột xuất qua env
+MARKET_HOLIDAYS=2026-01-02,2026-09-03. Năm chưa có ngày nghỉ nào trong lịch
+(năm hiện tại lúc import, hoặc năm của khoảng được hỏi) → log warning 1 lần / năm.
+"""
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import Config
+from src.utils.log_utils import get_logger
+
+log = get_logger(__name__)
+
+HOLIDAYS_FILE = Path(__file__).with_name("vn_holidays.txt")
+
+
+def load_holidays(path):
+    """Ngày nghỉ trong file lịch (bỏ dòng trống / comment #), ValueError nếu ngày sai định dạng"""
+    days = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        value = line.split("#", 1)[0].strip()
+        if value:
+            days.append(date.fromisoformat(value).isoformat())
+    return days
+
+
+HOLIDAYS = np.array(
+    sorted(set(load_holidays(Config.MARKET_HOLIDAYS_FILE or HOLIDAYS_FILE)) | set(Config.MARKET_HOLIDAYS)),
+    dtype="datetime64[D]",
+)
+CALENDAR = np.busdaycalendar(weekmask="1111100", holidays=HOLIDAYS)
+
+# Năm có ít nhất 1 ngày nghỉ trong lịch; năm khác coi như lịch chưa cập nhật
+HOLIDAY_YEARS = frozenset(int(y) for y in HOLIDAYS.astype("datetime64[Y]").astype(int) + 1970)
+_warned_years = set()
+
+
+def check_holiday_years(start, end=None):
+    """Log warning (1 lần / năm) cho các năm trong [start, end] chưa có ngày nghỉ nào"""
+    lo = pd.Timestamp(start).year
+    hi = pd.Timestamp(end).year if end is not None else lo
+    missing = [y for y in range(lo, hi + 1) if y not in HOLIDAY_YEARS and y not in _warned_years]
+    if missing:
+        _warned_years.update(missing)
+        log.warning(
+            "Trading calendar has no holidays for %s, weekdays treated as trading days",
+            ", ".join(map(str, missing)),
+            extra={"years": missing, "holidays_file": str(Config.MARKET_HOLIDAYS_FILE or HOLIDAYS_FILE)},
+        )
+    return missing
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), "D")
+
+
+def is_trading_day(value) -> bool:
+    return bool(np.is_busday(_day(value), busdaycal=CALENDAR))
+
+
+def trading_days(start, end):
+    """Các ngày giao dịch trong [start, end] (numpy datetime64[D])"""
+    lo, hi = _day(start), _day(end)
+    if hi < lo:
+        return np.array([], dtype="datetime64[D]")
+    check_holiday_years(lo, hi)
+    days = np.arange(lo, hi + 1, dtype="datetime64[D]")
+    return days[np.is_busday(days, busdaycal=CALENDAR)]
+
+
+def count_trading_days(start, end) -> int:
+    lo, hi = _day(start), _day(end)
+    if hi < lo:
+        return 0
+    check_holiday_years(lo, hi)
+    return int(np.busday_count(lo, hi + 1, busdaycal=CALENDAR))
+
+
+def trading_span(start, end):
+    """
+    (ngày giao dịch đầu, ngày giao dịch cuối) trong [start, end] dạng date,
+    None nếu cả khoảng là cuối tuần / nghỉ lễ
+    """
+    lo, hi = _day(start), _day(end)
+    if hi < lo:
+        return None
+    check_holiday_years(lo, hi)
+    first = np.busday_offset(lo, 0, roll="forward", busdaycal=CALENDAR)
+    last = np.busday_offset(hi, 0, roll="backward", busdaycal=CALENDAR)
+    if first > last:
+        return None
+    return first.astype(date), last.astype(date)
+
+
+def previous_trading_day(value) -> date:
+    """Ngày giao dịch gần nhất trước value"""
+    return np.busday_offset(_day(value) - np.timedelta64(1, "D"), 0, roll="backward", busdaycal=CALENDAR).astype(date)
+
+
+# ==================================================
+# SESSIONS
+# ==================================================
+MARKET_TZ = "Asia/Ho_Chi_Minh"
+MARKET_OPEN = time(9, 0)
+MARKET_CLOSE = time(15, 0)
+
+# (bắt đầu, kết thúc, phiên) trong ngày giao dịch (HOSE)
+SESSIONS = (
+    (time(9, 0), time(9, 15), "ato"),
+    (time(9, 15), time(11, 30), "continuous"),
+    (time(11, 30), time(13, 0), "lunch_break"),
+    (time(13, 0), time(14, 30), "continuous"),
+    (time(14, 30), time(14, 45), "atc"),
+    (time(14, 45), time(15, 0), "put_through"),
+)
+# Phiên có khớp lệnh (tick / giá thay đổi)
+LIVE_PHASES = frozenset({"ato", "continuous", "atc"})
+
+PHASE_MESSAGES = {
+    "pre_open": "Thị trường chưa mở cửa",
+    "lunch_break": "Thị trường đang nghỉ trưa (11:30 – 13:00)",
+    "put_through": "Đã hết phiên khớp lệnh (chỉ còn giao dịch thỏa thuận)",
+    "closed": "Thị trường đã đóng cửa",
+    "non_trading_day": "Hôm nay không phải ngày giao dịch (cuối tuần / nghỉ lễ)",
+}
+
+
+def _minute(t):
+    return t.hour * 60 + t.minute
+
+
+def _build_minute_tables():
+    """
+    Tra cứu O(1) theo phút trong ngày giao dịch:
+    - phase[m]: tên phiên tại phút m
+    - next_live[m]: phút bắt đầu phiên khớp lệnh kế tiếp (>= m), -1 nếu hết
+    """
+    phase = ["pre_open"] * _minute(MARKET_OPEN) + ["closed"] * (24 * 60 - _minute(MARKET_OPEN))
+    for start, end, name in SESSIONS:
+        for m in range(_minute(start), _minute(end)):
+            phase[m] = name
+
+    next_live = [-1] * (24 * 60)
+    upcoming = -1
+    for m in range(24 * 60 - 1, -1, -1):
+        if phase[m] in LIVE_PHASES:
+            upcoming = m
+        next_live[m] = upcoming
+    return tuple(phase), tuple(next_live)
+
+
+_PHASE_BY_MINUTE, _NEXT_LIVE_MINUTE = _build_minute_tables()
+
+
+def market_now() -> datetime:
+    """Giờ hiện tại theo múi giờ thị trường (naive)"""
+    return pd.Timestamp.now(tz=MARKET_TZ).tz_localize(None).to_pydatetime()
+
+
+def _local(now):
+    if now is None:
+        return market_now()
+    if now.tzinfo is not None:
+        return pd.Timestamp(now).tz_convert(MARKET_TZ).tz_localize(None).to_pydatetime()
+    return now
+
+
+def market_phase(now=None) -> str:
+    """ato | continuous | lunch_break | atc | put_through | pre_open | closed | non_trading_day"""
+    now = _local(now)
+    if not is_trading_day(now):
+        return "non_trading_day"
+    return _PHASE_BY_MINUTE[now.hour * 60 + now.minute]
+
+
+def is_live(now=None) -> bool:
+    """Đang trong phiên khớp lệnh (ATO / liên tục / ATC)"""
+    return market_phase(now) in LIVE_PHASES
+
+
+def session_bounds(day):
+    """(giờ mở cửa, giờ đóng cửa) của ngày day (datetime naive giờ thị trường)"""
+    day = pd.Timestamp(day).date()
+    return datetime.combine(day, MARKET_OPEN), datetime.combine(day, MARKET_CLOSE)
+
+
+def next_live_time(now=None) -> datetime:
+    """Thời điểm phiên khớp lệnh kế tiếp bắt đầu (now nếu đang trong phiên)"""
+    now = _local(now)
+    if is_trading_day(now):
+        m = _NEXT_LIVE_MINUTE[now.hour * 60 + now.minute]
+        if m == now.hour * 60 + now.minute:
+            return now
+        if m >= 0:
+            return datetime.combine(now.date(), time(m // 60, m % 60))
+    day = np.busday_offset(_day(now), 1, roll="forward", busdaycal=CALENDAR).astype(date)
+    return datetime.combine(day, MARKET_OPEN)
+
+
+def closed_through(now=None) -> date:
+    """
+    Ngày cuối cùng mà dữ liệu đã chốt (không còn thay đổi):
+    hôm nay nếu đã hết phiên hoặc không giao dịch, ngược lại hôm qua
+    """
+    now = _local(now)
+    if is_trading_day(now) and now.time() < MARKET_CLOSE:
+        return now.date() - timedelta(days=1)
+    return now.date()
+
+
+def cache_ttl(live_ttl, now=None, max_ttl=None) -> float:
+    """
+    TTL cho dữ liệu realtime: live_ttl trong phiên khớp lệnh; ngoài phiên dữ liệu
+    không đổi → giữ tới phiên kế tiếp (tối đa max_ttl, mặc định MARKET_CLOSED_CACHE_TTL)
+    """
+    now = _local(now)
+    if is_live(now):
+        return live_ttl
+    max_ttl = Config.MARKET_CLOSED_CACHE_TTL if max_ttl is None else max_ttl
+    until_open = (next_live_time(now) - now).total_seconds()
+    return max(live_ttl, min(until_open, max_ttl))
+
+
+# Lịch chưa có năm hiện tại → cảnh báo ngay lúc khởi động
+check_holiday_years(market_now())
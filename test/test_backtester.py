@@ -0,0 +1,152 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.providers.fake_provider import FakeMarket, FakeVnStockProvider, FaultInjector
+from src.providers.history_store import HistoryStore
+from src.providers.upstream_gateway import UpstreamGateway
+from src.services.backtest.backtest_service import BacktestService
+from src.services.backtest.backtester import VectorizedBacktester
+
+
+def make_bars(rows):
+    """rows: list (open, high, low, close) theo ngày"""
+    data = np.array(rows, dtype=float)
+    return pd.DataFrame({
+        "time": pd.date_range("2025-01-02", periods=len(rows), freq="1D", tz="Asia/Ho_Chi_Minh"),
+        "open": data[:, 0],
+        "high": data[:, 1],
+        "low": data[:, 2],
+        "close": data[:, 3],
+        "volume": 1000,
+    })
+
+
+def make_orders(signal_idx, entry, sl, tp, confirm_bars=0):
+    signal_idx = np.array(signal_idx)
+    return {
+        "signal_idx": signal_idx,
+        "active_idx": signal_idx + 1 + confirm_bars,
+        "entry": np.array(entry, dtype=float),
+        "sl": np.array(sl, dtype=float),
+        "tp": np.array(tp, dtype=float),
+        "rr": np.full(len(signal_idx), 2.0),
+    }
+
+
+BARS = make_bars([
+    (10.0, 10.2, 9.9, 10.0),   # 0: tín hiệu
+    (10.1, 10.3, 9.95, 10.2),  # 1: low 9.95 <= entry 10.0 → khớp
+    (10.2, 10.6, 10.1, 10.5),  # 2
+    (10.5, 11.1, 10.4, 11.0),  # 3: chạm TP 11.0
+    (11.0, 11.0, 9.4, 9.6),    # 4: chạm cả SL 9.5 và TP 11.0 → SL
+    (9.6, 9.8, 9.5, 9.7),      # 5
+])
+
+
+def test_take_profit_first():
+    bt = VectorizedBacktester(entry_bars=2, max_hold=10)
+    fills = bt.fills(BARS, make_orders([0], [10.0], [9.5], [11.0]))
+
+    assert fills["fill_idx"].tolist() == [1]
+    assert fills["exit_idx"].tolist() == [3]
+    assert fills["exit_reason"].tolist() == ["take_profit"]
+    assert fills["exit_price"].tolist() == [11.0]
+
+
+def test_stop_loss_wins_same_bar():
+    bt = VectorizedBacktester(entry_bars=2, max_hold=10)
+    # Khớp ở nến 3 (entry 10.5, low 10.4) → nến 4 chạm cả SL lẫn TP
+    fills = bt.fills(BARS, make_orders([1], [10.5], [9.5], [11.0], confirm_bars=1))
+
+    assert fills["fill_idx"].tolist() == [3]
+    assert fills["exit_idx"].tolist() == [4]
+    assert fills["exit_reason"].tolist() == ["stop_loss"]
+    assert fills["exit_price"].tolist() == [9.5]
+
+
+def test_unfilled_and_timeout():
+    bt = VectorizedBacktester(entry_bars=2, max_hold=2)
+    fills = bt.fills(BARS, make_orders([0, 2], [9.0, 10.6], [8.0, 9.0], [12.0, 20.0]))
+
+    # Lệnh 1 không khớp (low không về 9.0 trong 2 nến), lệnh 2 khớp giá open 10.5 (gap dưới entry)
+    assert fills["signal_idx"].tolist() == [2]
+    assert fills["fill_price"].tolist() == [10.5]
+    assert fills["exit_reason"].tolist() == ["timeout"]
+    assert fills["exit_idx"].tolist() == [5]
+
+
+def test_trades_skip_overlap_and_equity():
+    bt = VectorizedBacktester(capital=100_000, risk_pct=100, lot_size=100, fee_pct=0, sell_tax_pct=0,
+                              entry_bars=2, max_hold=10)
+    fills = bt.fills(BARS, make_orders([0, 1], [10.0, 10.5], [9.5, 9.5], [11.0, 11.0]))
+    trades = bt.trades(BARS, fills)
+
+    # Lệnh 2 khớp ở nến 3 khi lệnh 1 còn mở → bỏ
+    assert len(trades) == 1
+    assert trades[0]["quantity"] == 10_000
+    assert trades[0]["pnl"] == 10_000.0
+
+    equity = bt.equity_curve(BARS, trades)
+    assert equity[0] == 100_000
+    assert equity[-1] == 110_000
+
+
+def test_stop_loss_on_fill_bar():
+    bt = VectorizedBacktester(entry_bars=2, max_hold=10)
+    bars = make_bars([
+        (10.0, 10.2, 9.9, 10.0),   # 0: tín hiệu
+        (10.1, 10.2, 9.3, 9.4),    # 1: khớp 10.0 rồi thủng SL 9.5 ngay trong nến
+        (9.4, 11.5, 9.4, 11.2),    # 2: chạm TP nhưng lệnh đã đóng
+    ])
+    fills = bt.fills(bars, make_orders([0], [10.0], [9.5], [11.0]))
+
+    assert fills["fill_idx"].tolist() == [1]
+    assert fills["exit_idx"].tolist() == [1]
+    assert fills["exit_reason"].tolist() == ["stop_loss"]
+    assert fills["exit_price"].tolist() == [9.5]
+
+
+def test_gap_below_stop_loss_exits_at_open():
+    bt = VectorizedBacktester(capital=100_000, risk_pct=100, lot_size=100, fee_pct=0, sell_tax_pct=0,
+                              entry_bars=2, max_hold=10)
+    bars = make_bars([
+        (10.0, 10.2, 9.9, 10.0),   # 0: tín hiệu
+        (9.2, 9.6, 9.0, 9.5),      # 1: mở gap 9.2 dưới cả entry 10.0 và SL 9.5
+        (9.5, 11.5, 9.5, 11.2),
+    ])
+    fills = bt.fills(bars, make_orders([0], [10.0], [9.5], [11.0]))
+
+    assert fills["fill_price"].tolist() == [9.2]
+    assert fills["exit_idx"].tolist() == [1]
+    assert fills["exit_reason"].tolist() == ["stop_loss"]
+    assert fills["exit_price"].tolist() == [9.2]
+
+    # Vẫn là 1 trade (khối lượng theo entry dự kiến): khớp và thoát cùng giá open → pnl = -phí
+    (trade,) = bt.trades(bars, fills)
+    assert trade["exit_reason"] == "stop_loss" and trade["bars_held"] == 0
+    assert trade["quantity"] == 100_000 // 10.0 // 100 * 100 and trade["pnl"] == 0.0
+
+
+def test_load_history_goes_through_store(tmp_path):
+    provider = FakeVnStockProvider(
+        FakeMarket(day="2025-12-15", ticks=100, seed=7, data_dir=""),
+        FaultInjector(latency=0, jitter=0, error_rate=0),
+        source="BT_TEST",
+    )
+    provider.gateway = UpstreamGateway("bt_test", rate=0, burst=1)
+    provider.store = HistoryStore(tmp_path)
+    service = BacktestService(provider)
+
+    assert len(service.load_history("BTS", "2025-03-03", "2025-03-14", "1D")) == 10
+    # Khoảng khác (key cache mới) nằm trong coverage → đọc từ store, không gọi upstream
+    assert len(service.load_history("BTS", "2025-03-05", "2025-03-12", "1D")) == 6
+    assert provider.gateway.calls == 1
+
+    with pytest.raises(ValueError):
+        BacktestService(SimpleNamespace(store=None)).load_history("BTS", "2025-03-03", "2025-03-14", "1D")
@@ -0,0 +1,102 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+import pandas as pd
+import pytest
+from src.providers.bar_aggregator import BarAggregator, roll_up_bars
+from src.providers.vnstock_provider import VnStockProvider
+
+INTERVALS = ["1T", "5T", "15T", "1H"]
+
+
+def make_ticks(n=3000, seed=7, tz="Asia/Ho_Chi_Minh"):
+    """Tick giả lập: giá bước 0.05, nhiều tick trùng giây, có nghỉ trưa"""
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([0, 0, 1, 2, 5, 20], size=n)
+    times = pd.Timestamp("2025-12-15 09:15:00") + pd.to_timedelta(np.cumsum(gaps), unit="s")
+    times = times[(times.hour < 11) | (times.hour >= 13) | ((times.hour == 11) & (times.minute < 30))]
+    n = len(times)
+    price = 25 + np.cumsum(rng.choice([-0.05, 0, 0.05], size=n))
+    volume = rng.integers(1, 50, size=n) * 100
+    time = pd.DatetimeIndex(times)
+    if tz:
+        time = time.tz_localize(tz)
+    return pd.DataFrame({"time": time, "price": price.round(2), "volume": volume})
+
+
+def pandas_ohlc(ticks, interval):
+    provider = VnStockProvider.__new__(VnStockProvider)
+    return provider._build_ohlc_from_ticks(ticks.copy(), interval)
+
+
+def assert_same(agg, ticks, interval):
+    expected = pandas_ohlc(ticks, interval)
+    pd.testing.assert_frame_equal(agg.bars(), expected, )
+
+
+@pytest.mark.parametrize("interval", INTERVALS)
+def test_full_build_matches_resample(interval):
+    ticks = make_ticks()
+    agg = BarAggregator(interval)
+    agg.update(ticks)
+    assert_same(agg, ticks, interval)
+
+
+@pytest.mark.parametrize("interval", INTERVALS)
+def test_growing_window_matches_resample(interval):
+    ticks = make_ticks()
+    agg = BarAggregator(interval)
+    for end in range(200, len(ticks) + 1, 137):
+        window = ticks.iloc[:end]
+        agg.update(window)
+        assert_same(agg, window, interval)
+
+
+@pytest.mark.parametrize("interval", INTERVALS)
+def test_sliding_window_matches_resample(interval):
+    ticks = make_ticks()
+    agg = BarAggregator(interval)
+    for end in range(500, len(ticks) + 1, 61):
+        window = ticks.iloc[end - 500:end]
+        agg.update(window)
+        assert_same(agg, window, interval)
+
+
+def test_unsorted_naive_ticks_and_nan_price():
+    ticks = make_ticks(n=800, tz=None)
+    ticks.loc[ticks.index[::50], "price"] = np.nan
+    shuffled = ticks.iloc[::-1].reset_index(drop=True)
+
+    agg = BarAggregator("5T")
+    agg.update(shuffled)
+    assert_same(agg, shuffled, "5T")
+
+
+def test_no_new_ticks_returns_none():
+    ticks = make_ticks(n=500)
+    agg = BarAggregator("1T")
+    assert agg.update(ticks) is not None
+    assert agg.update(ticks) is None
+
+
+def test_update_reports_first_changed_bar():
+    ticks = make_ticks(n=1000)
+    agg = BarAggregator("1T")
+    agg.update(ticks.iloc[:600])
+    last_open = agg.bars()["time"].iloc[-1]
+
+    changed = agg.update(ticks.iloc[:700])
+    assert changed == last_open
+    assert agg.bars(since=changed)["time"].iloc[0] == last_open
+
+
+@pytest.mark.parametrize("interval", ["5T", "15T", "1H"])
+def test_roll_up_matches_resample_from_ticks(interval):
+    ticks = make_ticks()
+    agg = BarAggregator("1T")
+    agg.update(ticks)
+
+    rolled = roll_up_bars(agg.bars(), interval)
+    pd.testing.assert_frame_equal(rolled, pandas_ohlc(ticks, interval))
@@ -0,0 +1,98 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import gzip
+
+import pandas as pd
+import pytest
+from src.providers import capture
+from src.providers.capture import CaptureWriter, ReplayMarket, decode_frame, encode_frame, read_capture
+from src.providers.fake_provider import FakeVnStockProvider, FaultInjector
+from src.providers.upstream_gateway import UpstreamGateway
+from src.providers.vnstock_provider import TICK_CACHE
+from src.providers.xnoapi_provider import XnoAPIProvider
+from src.utils.synthetic_market import synthetic_ticks
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    writer = CaptureWriter(tmp_path)
+    monkeypatch.setattr(capture, "CAPTURE", writer)
+    yield writer
+    writer.close()
+
+
+def test_frame_roundtrip_keeps_dtypes_and_timezone():
+    ticks = synthetic_ticks(200)
+    ticks.loc[5, "time"] = pd.NaT
+    assert decode_frame(encode_frame(ticks)).equals(ticks)
+
+    daily = pd.DataFrame({"time": pd.date_range("2025-12-01", periods=3), "close": [1.5, 2.0, None]})
+    assert decode_frame(encode_frame(daily)).equals(daily)
+
+
+def test_xno_responses_are_captured(writer, monkeypatch):
+    class FakeQuote:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def price_depth(self):
+            return pd.DataFrame({"price": [25.0, 25.05], "acc_volume": [100, 200]})
+
+    monkeypatch.setattr("src.providers.xnoapi_provider.Quote", FakeQuote)
+    xno = XnoAPIProvider.__new__(XnoAPIProvider)
+    depth = xno._quote_price_depth("FPT")
+    writer.close()
+
+    (path,) = (writer.root / "price_depth" / "FPT").glob("*.jsonl.gz")
+    (entry,) = read_capture(path)
+    assert entry["kind"] == "price_depth" and entry["symbol"] == "FPT"
+    assert decode_frame(entry["frame"]).equals(depth)
+    assert writer.written == 1 and writer.dropped == 0
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    writer = CaptureWriter(tmp_path, queue_size=1)
+    writer._thread = object()        # thread chưa chạy → queue không được rút
+    writer.write("ticks", "FPT", pd.DataFrame({"price": [1.0]}))
+    writer.write("ticks", "FPT", pd.DataFrame({"price": [2.0]}))
+    writer._thread = None
+    assert writer.dropped == 1
+
+
+def test_truncated_file_keeps_flushed_records(tmp_path):
+    path = tmp_path / "x.jsonl.gz"
+    with gzip.open(path, "wt") as f:
+        f.write('{"ts": 1, "frame": null}\n{"ts": 2, "frame": null}\n')
+    path.write_bytes(path.read_bytes()[:-6])
+    assert [e["ts"] for e in read_capture(path)][:1] == [1]
+
+
+def test_replay_feeds_captured_ticks_through_provider(writer):
+    early, late = synthetic_ticks(50, seed=1), synthetic_ticks(300, seed=2)
+    capture.record("ticks", "FPT", early, limit=50)
+    writer.close()
+    cut = max(e["ts"] for p in writer.root.glob("ticks/FPT/*") for e in read_capture(p))
+    capture.record("ticks", "FPT", late, limit=300)
+    writer.close()
+
+    pinned = ReplayMarket(writer.root, at=pd.Timestamp(cut, unit="s", tz="UTC").isoformat())
+    assert pinned.intraday("FPT", 1000).equals(early)
+    assert ReplayMarket(writer.root, at="2100-01-01").intraday("FPT", 10).equals(late.tail(10).reset_index(drop=True))
+    assert pinned.price_depth("FPT") is None
+
+    provider = FakeVnStockProvider(pinned, FaultInjector(latency=0, jitter=0, error_rate=0), source="REPLAY_TEST")
+    provider.gateway = UpstreamGateway("replay_test", rate=0, burst=1)
+    TICK_CACHE.invalidate(("FPT", "REPLAY_TEST"))
+    candles = provider.intraday("FPT", 1000)
+    assert candles["volume"].sum() == early["volume"].sum()
+
+
+def test_invalid_symbol_never_leaves_capture_root(writer, tmp_path):
+    capture.record("ticks", "../../escape", pd.DataFrame({"price": [1.0]}))
+    writer.close()
+    assert writer.written == 0
+    assert [p.name for p in tmp_path.iterdir()] == []
+    with pytest.raises(ValueError):
+        ReplayMarket(tmp_path, at="2100-01-01").intraday("../x", 10)
@@ -0,0 +1,75 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.deps import Container, get_poller
+from src.api.v1.poller import router as poller_router
+from src.config import Config
+from src.services.market_poller import MarketDataPoller
+
+
+class FakePoller:
+    def __init__(self):
+        self.provider = self.xno = None
+        self.started = self.stopped = 0
+        self.running = False
+
+    def start(self):
+        self.started += 1
+
+    def shutdown(self):
+        self.stopped += 1
+
+    def stats(self):
+        return {"running": self.running}
+
+    def subscribe(self, symbols):
+        return sorted(symbols)
+
+
+def test_container_builds_once():
+    container = Container()
+    calls = []
+    first = container._get("x", lambda: calls.append(1) or object())
+    assert container._get("x", object) is first
+    assert calls == [1]
+
+    poller = container.poller()
+    assert isinstance(poller, MarketDataPoller)
+    assert container.poller() is poller
+
+
+def test_container_override_and_lifecycle(monkeypatch):
+    container = Container()
+    fake, provider, xno = FakePoller(), object(), object()
+    container.override("poller", fake)
+    container.override("provider", provider)
+    container.override("xno", xno)
+
+    monkeypatch.setattr(Config, "POLLER_ENABLED", True)
+    container.startup()
+    assert fake.started == 1
+    assert fake.provider is provider and fake.xno is xno
+
+    container.shutdown()
+    assert fake.stopped == 1
+
+    container.reset()
+    assert container.poller() is not fake
+
+
+def test_route_dependency_override():
+    app = FastAPI()
+    app.include_router(poller_router, prefix="/api/v1")
+    fake = FakePoller()
+    app.dependency_overrides[get_poller] = lambda: fake
+
+    client = TestClient(app)
+    assert client.post("/api/v1/poller/subscribe", params={"symbols": "vnm,FPT"}).json() == {
+        "running": False,
+        "symbols": ["FPT", "VNM"],
+    }
+    assert client.get("/api/v1/poller").json()["running"] is False
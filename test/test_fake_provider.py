@@ -0,0 +1,93 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+
+import pytest
+from src.api.deps import Container
+from src.config import Config
+from src.providers.async_provider import AsyncXnoAPIProvider
+from src.providers.fake_provider import FakeMarket, FakeVnStockProvider, FakeXnoAPIProvider, FaultInjector
+from src.providers.upstream_gateway import UpstreamGateway
+from src.providers.vnstock_provider import TICK_CACHE
+from src.providers.xnoapi_provider import DEPTH_CACHE
+
+
+@pytest.fixture
+def market():
+    return FakeMarket(day="2025-12-15", ticks=2000, seed=7, data_dir="")
+
+
+def test_market_is_deterministic_per_symbol(market):
+    other = FakeMarket(day="2025-12-15", ticks=2000, seed=7, data_dir="")
+    assert market.ticks("FPT").equals(other.ticks("FPT"))
+    assert not market.ticks("FPT")["price"].equals(market.ticks("VNM")["price"])
+    assert len(market.intraday("FPT", 100)) == 100
+
+    daily = market.history("FPT", "2025-12-01", "2025-12-15", "1D")
+    assert len(daily) == 11
+    # Depth tính từ tick → tổng khối lượng khớp
+    assert market.price_depth("FPT")["acc_volume"].sum() == market.ticks("FPT")["volume"].sum()
+
+
+def test_recorded_ticks_replace_synthetic(tmp_path):
+    ticks = FakeMarket(day="2025-12-15", ticks=50, data_dir="").ticks("FPT")
+    ticks.to_csv(tmp_path / "HPG.csv", index=False)
+    recorded = FakeMarket(day="2025-12-15", data_dir=str(tmp_path)).ticks("HPG")
+    assert recorded["price"].tolist() == ticks["price"].tolist()
+    assert len(recorded) == 52
+
+
+def test_providers_go_through_real_code_paths(market):
+    provider = FakeVnStockProvider(market, FaultInjector(latency=0, jitter=0, error_rate=0), source="FAKE_TEST")
+    provider.gateway = UpstreamGateway("fake_test", rate=0, burst=1)
+    TICK_CACHE.invalidate(("FPT", "FAKE_TEST"))
+
+    candles = provider.intraday("FPT", 500)
+    assert list(candles.columns) == ["time", "open", "high", "low", "close", "volume"]
+    assert provider.gateway.calls == 1
+
+    xno = FakeXnoAPIProvider(market, FaultInjector(latency=0, jitter=0, error_rate=0))
+    assert len(xno.foreign_trading("ZZZ_FAKE")) == FakeMarket.FOREIGN_DAYS
+    assert xno.price_depth("ZZZ_FAKE")[0].keys() >= {"price", "acc_volume"}
+
+
+def test_fault_injection_counts_as_upstream_error(market):
+    provider = FakeVnStockProvider(market, FaultInjector(latency=0, jitter=0, error_rate=1.0), source="FAKE_ERR")
+    provider.gateway = UpstreamGateway("fake_err", rate=0, burst=1, failure_threshold=1)
+    TICK_CACHE.invalidate(("FPT", "FAKE_ERR"))
+
+    assert provider.intraday("FPT", 100) is None
+    assert provider.gateway.errors == 1
+    assert provider.gateway.breaker.stats()["state"] != "closed"
+
+
+def test_async_cache_miss_is_single_flight(market):
+    xno = FakeXnoAPIProvider(market, FaultInjector(latency=0.1, jitter=0, error_rate=0))
+    xno.gateway = UpstreamGateway("fake_async", rate=0, burst=1)
+    DEPTH_CACHE.invalidate("SFL")
+    provider = AsyncXnoAPIProvider(xno)
+
+    async def burst():
+        return await asyncio.gather(*(provider.price_depth("SFL") for _ in range(8)))
+
+    results = asyncio.run(burst())
+    assert xno.gateway.calls == 1
+    assert all(r == results[0] and r for r in results)
+    assert provider._inflight == {}
+
+
+def test_container_selects_fake_providers(monkeypatch):
+    monkeypatch.setattr(Config, "FAKE_PROVIDER", True)
+    container = Container()
+    provider, xno = container.provider(), container.xno()
+    assert isinstance(provider, FakeVnStockProvider) and isinstance(xno, FakeXnoAPIProvider)
+    assert provider.market is xno.market
+
+
+def test_recorded_ticks_reject_path_traversal(tmp_path):
+    (tmp_path / "secret.csv").write_text("time,price,volume\n2025-12-15 09:15:00,1,100\n")
+    market = FakeMarket(day="2025-12-15", data_dir=str(tmp_path / "data"))
+    with pytest.raises(ValueError):
+        market.ticks("../secret")
@@ -0,0 +1,188 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.config import PROJECT_ROOT, Config, _env_path
+from src.providers.history_store import HistoryStore
+from src.providers.range_planner import RangePlanner
+from src.providers.vnstock_provider import VnStockProvider
+
+
+def make_daily(start, end):
+    time = pd.date_range(start, end, freq="B")
+    close = np.linspace(10, 20, len(time))
+    return pd.DataFrame({
+        "time": time,
+        "open": close - 0.1,
+        "high": close + 0.2,
+        "low": close - 0.3,
+        "close": close,
+        "volume": np.arange(len(time), dtype=np.int64) * 100,
+    })
+
+
+def test_write_read_roundtrip_and_pruning(tmp_path):
+    store = HistoryStore(tmp_path)
+    df = make_daily("2024-01-01", "2024-06-30")
+    store.write("FPT", "1d", df)
+
+    assert sorted(p.name for p in (tmp_path / "FPT" / "1d").iterdir()) == [
+        "2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"
+    ]
+
+    out = store.read("FPT", "1d", "2024-02-10", "2024-03-15")
+    expected = df[(df["time"] >= "2024-02-10") & (df["time"] < "2024-03-16")].reset_index(drop=True)
+    pd.testing.assert_frame_equal(out, expected, check_dtype=False)
+    assert out["volume"].dtype == np.int64
+
+
+def test_write_merges_and_overwrites(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.write("FPT", "1d", make_daily("2024-01-01", "2024-01-20"))
+
+    update = make_daily("2024-01-15", "2024-02-10")
+    update["close"] += 1
+    store.write("FPT", "1d", update)
+
+    out = store.read("FPT", "1d", "2024-01-01", "2024-02-10")
+    assert out["time"].is_unique and out["time"].is_monotonic_increasing
+    assert len(out) == len(make_daily("2024-01-01", "2024-02-10"))
+    assert out.loc[out["time"] == "2024-01-15", "close"].item() == update["close"].iloc[0]
+
+
+def test_coverage_and_missing(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.mark_covered("FPT", "1d", "2024-01-01", "2024-01-31")
+    store.mark_covered("FPT", "1d", "2024-03-01", "2024-03-31")
+    store.mark_covered("FPT", "1d", "2024-02-01", "2024-02-10")
+
+    assert store.coverage("FPT", "1d") == [(date(2024, 1, 1), date(2024, 2, 10)), (date(2024, 3, 1), date(2024, 3, 31))]
+    assert store.missing("FPT", "1d", "2023-12-20", "2024-04-05") == [
+        (date(2023, 12, 20), date(2023, 12, 31)),
+        (date(2024, 2, 11), date(2024, 2, 29)),
+        (date(2024, 4, 1), date(2024, 4, 5)),
+    ]
+    assert store.missing("FPT", "1d", "2024-01-05", "2024-02-01") == []
+
+
+def test_provider_fetches_only_missing_ranges(tmp_path):
+    full = make_daily("2024-01-01", "2024-12-31")
+    calls = []
+
+    def fetch(symbol, start, end, interval):
+        calls.append((start, end))
+        return full[(full["time"] >= start) & (full["time"] <= end)].reset_index(drop=True)
+
+    provider = VnStockProvider.__new__(VnStockProvider)
+    provider.store = HistoryStore(tmp_path)
+    provider._fetch_history = fetch
+    calls.clear()
+
+    first = provider.history("FPT", "2024-03-01", "2024-05-31", "1d")
+    again = provider.history("FPT", "2024-03-01", "2024-05-31", "1d")
+    wider = provider.history("FPT", "2024-02-01", "2024-06-30", "1d")
+
+    # Khoảng thiếu được thu về ngày giao dịch (01/06/2024 thứ 7, 30/06/2024 chủ nhật)
+    assert calls[0] == ("2024-03-01", "2024-05-31")
+    assert sorted(calls[1:]) == [("2024-02-01", "2024-02-29"), ("2024-06-03", "2024-06-28")]
+    pd.testing.assert_frame_equal(first, again)
+    expected = full[(full["time"] >= "2024-02-01") & (full["time"] <= "2024-06-30")].reset_index(drop=True)
+    pd.testing.assert_frame_equal(wider, expected, check_dtype=False)
+
+
+def test_planner_skips_non_trading_gaps(tmp_path):
+    store = HistoryStore(tmp_path)
+    planner = RangePlanner(store)
+    store.mark_covered("FPT", "1d", "2024-01-01", "2024-02-07")
+    store.mark_covered("FPT", "1d", "2024-02-15", "2024-03-31")
+
+    # 08/02 – 14/02/2024: Tết + cuối tuần → không có ngày giao dịch
+    plan = planner.plan("FPT", "1d", "2024-01-15", "2024-03-15", now=datetime(2024, 6, 1, 10, 0))
+    assert plan == {"fetch": [], "skip": [(date(2024, 2, 8), date(2024, 2, 14))]}
+
+    plan = planner.plan("FPT", "1d", "2024-03-20", "2024-04-21", now=datetime(2024, 6, 1, 10, 0))
+    assert plan["fetch"] == [(date(2024, 4, 1), date(2024, 4, 19), (date(2024, 4, 1), date(2024, 4, 21)))]
+
+
+def test_planner_keeps_today_live(tmp_path):
+    store = HistoryStore(tmp_path)
+    full = make_daily("2024-06-03", "2024-06-07")
+
+    def fetch(symbol, start, end, interval):
+        return full[(full["time"] >= start) & (full["time"] <= end)].reset_index(drop=True)
+
+    df, _ = RangePlanner(store).load("FPT", "1d", "2024-06-03", "2024-06-07", fetch, now=datetime(2024, 6, 7, 10, 0))
+    assert len(df) == 5
+    # Hôm nay (07/06) đang trong phiên: không lưu, không đánh dấu đã có
+    assert len(store.read("FPT", "1d", "2024-06-03", "2024-06-07")) == 4
+    assert store.missing("FPT", "1d", "2024-06-03", "2024-06-07") == [(date(2024, 6, 7), date(2024, 6, 7))]
+
+    # Sau 15h dữ liệu hôm nay đã chốt → lưu luôn
+    RangePlanner(store).load("FPT", "1d", "2024-06-03", "2024-06-07", fetch, now=datetime(2024, 6, 7, 15, 30))
+    assert len(store.read("FPT", "1d", "2024-06-03", "2024-06-07")) == 5
+    assert store.missing("FPT", "1d", "2024-06-03", "2024-06-07") == []
+
+
+def test_store_rejects_path_traversal(tmp_path):
+    store = HistoryStore(tmp_path / "store")
+    calls = []
+
+    def fetch(symbol, start, end, interval):
+        calls.append(symbol)
+
+    for symbol, interval in (("../../escape", "1d"), ("FPT", "../1d"), ("FPT", "1d/../../x")):
+        with pytest.raises(ValueError):
+            RangePlanner(store).load(symbol, interval, "2025-10-11", "2025-10-12", fetch)
+    assert calls == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_empty_or_short_fetch_is_not_marked_covered(tmp_path):
+    store = HistoryStore(tmp_path)
+    full = make_daily("2025-03-03", "2025-03-07")
+    responses = [full.iloc[:0], full.iloc[:2], full]
+    calls = []
+
+    def fetch(symbol, start, end, interval):
+        calls.append((start, end))
+        return responses[len(calls) - 1]
+
+    now = datetime(2025, 6, 2, 10, 0)
+    df, _ = RangePlanner(store).load("FPT", "1d", "2025-03-03", "2025-03-07", fetch, now=now)
+    assert df.empty
+    assert store.coverage("FPT", "1d") == []
+
+    # Upstream chỉ trả 2 ngày đầu → phần còn lại vẫn là gap
+    RangePlanner(store).load("FPT", "1d", "2025-03-03", "2025-03-07", fetch, now=now)
+    assert store.missing("FPT", "1d", "2025-03-03", "2025-03-07") == [(date(2025, 3, 5), date(2025, 3, 7))]
+
+    df, _ = RangePlanner(store).load("FPT", "1d", "2025-03-03", "2025-03-07", fetch, now=now)
+    assert len(df) == 5 and calls[-1] == ("2025-03-05", "2025-03-07")
+    assert store.missing("FPT", "1d", "2025-03-03", "2025-03-07") == []
+
+
+def test_unwritable_store_still_returns_fetched_rows(tmp_path, monkeypatch):
+    store = HistoryStore(tmp_path)
+
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(store, "write", read_only)
+    monkeypatch.setattr(store, "mark_covered", read_only)
+    fetch = lambda symbol, start, end, interval: make_daily(start, end)
+    now = datetime(2025, 6, 2, 10, 0)
+
+    df, _ = RangePlanner(store).load("FPT", "1d", "2025-03-01", "2025-03-09", fetch, now=now)
+    assert len(df) == 5
+
+
+def test_store_dir_does_not_depend_on_cwd(monkeypatch):
+    assert Path(Config.HISTORY_STORE_DIR).is_absolute()
+    monkeypatch.setenv("HISTORY_STORE_DIR", "data/history")
+    assert _env_path("HISTORY_STORE_DIR", "x") == str(PROJECT_ROOT / "data" / "history")
@@ -0,0 +1,140 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategies.incremental import RollingEMA, RollingExtreme, RollingSMA, DailyVWAP
+from src.strategies.order_block import OrderBlockStrategy
+from src.strategies.smc import SMCStrategy
+from src.strategies.wyckoff import WyckoffStrategy
+
+
+def make_bars(n=480, seed=14, tz="Asia/Ho_Chi_Minh"):
+    """Nến 1 phút giả lập qua 2 phiên: xu hướng tăng, có nến volume đột biến"""
+    rng = np.random.default_rng(seed)
+    day1 = pd.date_range("2025-12-15 09:15", periods=n // 2, freq="1min")
+    day2 = pd.date_range("2025-12-16 09:15", periods=n - n // 2, freq="1min")
+    time = day1.append(day2).tz_localize(tz)
+
+    close = 25 + np.cumsum(rng.normal(0.01, 0.08, n))
+    open_ = close - rng.normal(0, 0.06, n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 0.02, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 0.06, n))
+    volume = rng.integers(10, 60, n) * 100
+    spikes = rng.random(n) < 0.2
+    volume[spikes] *= rng.integers(2, 6, spikes.sum())
+
+    return pd.DataFrame({
+        "time": time,
+        "open": open_.round(2),
+        "high": high.round(2),
+        "low": low.round(2),
+        "close": close.round(2),
+        "volume": volume,
+    })
+
+
+WARMUP = 200
+
+
+def batch_frame(df):
+    """pandas_ta.vwap cần DatetimeIndex để neo theo ngày"""
+    return df.set_index(pd.DatetimeIndex(df["time"]).rename(None))
+
+
+@pytest.mark.parametrize("window,mode", [(5, "max"), (8, "max"), (30, "min")])
+def test_rolling_extreme_matches_pandas(window, mode):
+    values = make_bars()["high"]
+    rolling = RollingExtreme(window, mode)
+    got = [rolling.update(v) for v in values]
+    expected = getattr(values.rolling(window), mode)()
+    assert got == [None if np.isnan(v) else v for v in expected]
+
+
+def test_running_sma_and_vwap_match_pandas():
+    df = make_bars()
+    sma = RollingSMA(20)
+    got = [sma.update(v) for v in df["volume"]]
+    expected = df["volume"].rolling(20).mean()
+    assert got == [None if np.isnan(v) else v for v in expected]
+
+    vwap = DailyVWAP()
+    got = [vwap.update(r["time"], r["high"], r["low"], r["close"], r["volume"]) for r in df.to_dict("records")]
+    frame = batch_frame(df)
+    wp = (frame["high"] + frame["low"] + frame["close"]) / 3 * frame["volume"]
+    day = frame.index.date
+    expected = wp.groupby(day).cumsum() / frame["volume"].groupby(day).cumsum()
+    assert got == expected.tolist()
+
+
+@pytest.mark.parametrize("length", [50, 200])
+def test_rolling_ema_matches_sma_seeded_ewm(length):
+    close = make_bars()["close"]
+    ema = RollingEMA(length)
+    got = [ema.update(v) for v in close]
+
+    seeded = close.copy()
+    seeded.iloc[length - 1] = close.iloc[:length].mean()
+    seeded.iloc[:length - 1] = np.nan
+    expected = seeded.ewm(span=length, adjust=False).mean()
+    assert got == [None if np.isnan(v) else v for v in expected]
+
+
+@pytest.mark.parametrize("strategy_cls,inputs", [
+    (SMCStrategy, {}),
+    (SMCStrategy, {"rvol": 1.2, "bos_window": 5}),
+    (OrderBlockStrategy, {}),
+    (OrderBlockStrategy, {"volume_mult": 1.2}),
+    (WyckoffStrategy, {}),
+    (WyckoffStrategy, {"range_window": 20, "rvol": 1.2}),
+])
+def test_update_matches_apply(strategy_cls, inputs):
+    """Sau mỗi nến: apply() trên các nến đến hiện tại == tail(3) tín hiệu đã phát"""
+    df = make_bars()
+    streaming = strategy_cls()
+    streaming.reset(inputs)
+
+    emitted = []
+    for k, bar in enumerate(df.to_dict("records"), 1):
+        emitted.extend(streaming.update(bar))
+        # pandas_ta trả None khi chưa đủ nến cho EMA200 → chỉ so từ đó
+        if k >= WARMUP:
+            batch = strategy_cls().apply(batch_frame(df.iloc[:k]), dict(inputs))["signals"]
+            assert batch == emitted[-3:]
+
+    assert emitted, "dữ liệu test phải sinh ra tín hiệu"
+    assert strategy_cls().replay(df, inputs) == emitted
+
+
+@pytest.mark.parametrize("strategy_cls", [SMCStrategy, OrderBlockStrategy, WyckoffStrategy])
+def test_apply_signal_limit(strategy_cls):
+    """signal_limit=None → apply() trả mọi tín hiệu lịch sử, giống replay()"""
+    df = make_bars()
+    emitted = strategy_cls().replay(df)
+    frame = batch_frame(df)
+
+    assert strategy_cls().apply(frame, {"signal_limit": None})["signals"] == emitted
+    assert strategy_cls().apply(frame, {"signal_limit": 1})["signals"] == emitted[-1:]
+
+
+def test_smc_update_respects_warmup():
+    """BOS trước min_bars nến: apply() trên prefix không có tín hiệu → update() cũng không"""
+    df = make_bars(n=160)
+    for i in (30, 100):
+        df.loc[i, "open"] = df["high"].iloc[:i].max()
+        df.loc[i, "close"] = df.loc[i, "high"] = df.loc[i, "open"] + 1
+        df.loc[i, "volume"] *= 20
+    df.loc[120, ["open", "high", "low", "close"]] = 0.0
+
+    streaming = SMCStrategy()
+    streaming.reset()
+    emitted = []
+    for k, bar in enumerate(df.to_dict("records"), 1):
+        emitted.extend(streaming.update(bar))
+        batch = SMCStrategy().apply(batch_frame(df.iloc[:k]), {})["signals"]
+        assert batch == emitted[-3:]
+
+    assert df["time"].iloc[100].isoformat() in [s["time"] for s in emitted]
+    assert df["time"].iloc[30].isoformat() not in [s["time"] for s in emitted]
@@ -0,0 +1,70 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.utils import log_utils
+from src.utils.log_utils import ErrorSampler, bind_context, log_upstream_error, set_request_id
+
+
+@pytest.fixture
+def captured():
+    stream = io.StringIO()
+    log_utils.setup_logging(level="DEBUG", fmt="json", stream=stream)
+    yield lambda: [json.loads(line) for line in stream.getvalue().splitlines()]
+    log_utils.shutdown_logging()
+
+
+def test_json_lines_carry_request_id_and_fields(captured):
+    log = logging.getLogger("src.test")
+    token = set_request_id("req-1")
+    try:
+        log.info("loaded %s", "FPT", extra={"symbol": "FPT", "candles": 120})
+        # Thread pool không tự copy context → bind_context giữ request_id
+        with ThreadPoolExecutor(1) as pool:
+            pool.submit(bind_context(log.debug, "in worker")).result()
+    finally:
+        log_utils.REQUEST_ID.reset(token)
+    log.info("outside")
+    log_utils.shutdown_logging()
+
+    first, worker, outside = captured()
+    assert first["msg"] == "loaded FPT"
+    assert first["request_id"] == "req-1"
+    assert first["symbol"] == "FPT" and first["candles"] == 120
+    assert worker["request_id"] == "req-1" and worker["level"] == "DEBUG"
+    assert outside["request_id"] == "-"
+
+
+def test_error_sampler_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log_utils.time, "monotonic", lambda: now[0])
+    sampler = ErrorSampler(window=10)
+
+    assert sampler.allow("k") == 0
+    assert sampler.allow("k") is None
+    assert sampler.allow("k") is None
+    assert sampler.allow("other") == 0
+    now[0] += 11
+    assert sampler.allow("k") == 2
+
+
+def test_log_upstream_error_is_sampled(captured):
+    log = logging.getLogger("src.test")
+    sampler = ErrorSampler(window=60)
+    results = [
+        log_upstream_error(log, "intraday", ConnectionError("down"), sampler=sampler, symbol=s)
+        for s in ("FPT", "VNM", "HPG")
+    ]
+    log_utils.shutdown_logging()
+
+    assert results == [True, False, False]
+    (line,) = captured()
+    assert line["level"] == "WARNING"
+    assert line["event"] == "intraday" and line["error"] == "ConnectionError"
+    assert line["symbol"] == "FPT"
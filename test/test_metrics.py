@@ -0,0 +1,80 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from src.providers.upstream_cache import UpstreamCache
+from src.providers.upstream_gateway import UpstreamGateway
+from src.utils.metrics import REGISTRY, UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_SECONDS, Counter, Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("test_latency_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        h.observe(value, "fetch")
+
+    lines = h.render()
+    assert 'test_latency_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="fetch",le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="fetch",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="fetch"} 4' in lines
+    assert h.snapshot("fetch") == (4, pytest.approx(6.05))
+
+    with h.time("build"):
+        pass
+    assert h.snapshot("build")[0] == 1
+
+
+def test_counter_label_escaping():
+    c = Counter("test_errors_total", "test", ("error",))
+    c.inc('bad "value"')
+    c.inc('bad "value"', amount=2)
+    assert c.render()[-1] == 'test_errors_total{error="bad \\"value\\""} 3'
+
+
+def test_gateway_records_latency_errors_retries(monkeypatch):
+    monkeypatch.setattr("src.providers.upstream_gateway.backoff_delay", lambda attempt: 0)
+    g = UpstreamGateway("metrics_test", rate=0, burst=1, failure_threshold=10)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("down")
+        return "ok"
+
+    assert g.retry(flaky, retries=2) == "ok"
+    assert UPSTREAM_SECONDS.snapshot("metrics_test")[0] == 3
+    assert UPSTREAM_ERRORS.value("metrics_test", "ConnectionError") == 2
+    assert UPSTREAM_RETRIES.value("metrics_test") == 2
+
+
+def test_registry_renders_cache_gauges():
+    cache = UpstreamCache("metrics_cache_test", maxsize=4, ttl=60)
+    cache.put("a", 1)
+    cache.get("a")
+
+    text = REGISTRY.render()
+    assert 'upstream_cache_size{cache="metrics_cache_test"} 1' in text
+    assert 'upstream_cache_hits_total{cache="metrics_cache_test"} 1' in text
+    assert "# TYPE pipeline_stage_duration_seconds histogram" in text
+
+
+def test_sse_routes_excluded_from_request_latency():
+    pytest.importorskip("pandas_ta")  # src.main → strategies
+    from fastapi.responses import StreamingResponse
+    from fastapi.testclient import TestClient
+    from src.main import app
+    from src.utils.metrics import HTTP_REQUEST_SECONDS
+
+    async def frames():
+        yield b"data: 1\n\n"
+
+    app.add_api_route("/__test_sse", lambda: StreamingResponse(frames(), media_type="text/event-stream"))
+    app.add_api_route("/__test_plain", lambda: {"ok": True})
+    client = TestClient(app)
+    assert client.get("/__test_sse").text == "data: 1\n\n"
+    assert client.get("/__test_plain").json() == {"ok": True}
+
+    assert HTTP_REQUEST_SECONDS.snapshot("GET", "/__test_sse", "200")[0] == 0
+    assert HTTP_REQUEST_SECONDS.snapshot("GET", "/__test_plain", "200")[0] == 1
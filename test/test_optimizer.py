@@ -0,0 +1,77 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+import pandas as pd
+import pytest
+from src.services.backtest.optimizer import ParameterOptimizer, _fold_metrics, pack_frame, unpack_frame
+from src.utils.synthetic_market import synthetic_candles
+
+
+def test_pack_unpack_roundtrip():
+    df = synthetic_candles(120, seed=14)
+    shm, (name, n, tz) = pack_frame(df)
+    try:
+        out = unpack_frame(shm, n, tz)
+        assert out["time"].tolist() == df["time"].tolist()
+        for col in ["open", "high", "low", "close", "volume"]:
+            np.testing.assert_array_equal(out[col].to_numpy(), df[col].to_numpy(dtype=float))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_param_sets_grid_and_random():
+    grid = {"bos_window": [5, 8, 12], "rvol": [1.2, 1.5]}
+    assert len(ParameterOptimizer("smc", grid).param_sets()) == 6
+
+    picks = ParameterOptimizer("smc", grid, mode="random", samples=4, seed=1).param_sets()
+    assert len(picks) == 4
+    assert len({tuple(p.items()) for p in picks}) == 4
+    assert all(p["bos_window"] in grid["bos_window"] and p["rvol"] in grid["rvol"] for p in picks)
+
+
+def test_invalid_grid():
+    with pytest.raises(ValueError):
+        ParameterOptimizer("smc", {"bos_window": 5})
+    with pytest.raises(ValueError):
+        ParameterOptimizer("unknown", {"bos_window": [5]})
+
+
+def test_run_walk_forward():
+    df = synthetic_candles(2000, seed=14, start="2025-01-02")
+    grid = {"range_window": [20, 30], "rvol": [1.5, 2.0]}
+
+    result = ParameterOptimizer("wyckoff", grid, splits=2, workers=2, rr_min=1.5).run({"AAA": df})
+
+    assert result["combinations"] == 4
+    assert [r["rank"] for r in result["results"]] == [1, 2, 3, 4]
+    assert len(result["walk_forward"]) == 2
+    for r in result["results"]:
+        assert len(r["folds"]) == 3
+        assert sum(f["trades"] for f in r["folds"]) == r["summary"]["trades"]
+
+
+def test_fold_metrics_naive_and_aware_times():
+    trades = [{"entry_time": pd.Timestamp("2025-01-02 09:30"), "pnl": 10.0},
+              {"entry_time": pd.Timestamp("2025-01-03 10:00"), "pnl": -4.0}]
+    edge = pd.Timestamp("2025-01-03").value
+    bounds = [(pd.Timestamp("2025-01-01").value, edge), (edge, pd.Timestamp("2025-01-04").value)]
+
+    naive = _fold_metrics(trades, bounds, 1000)
+    assert [f["net_pnl"] for f in naive] == [10.0, -4.0]
+
+    aware = [{**t, "entry_time": t["entry_time"].tz_localize("UTC")} for t in trades]
+    assert _fold_metrics(aware, bounds, 1000) == naive
+
+
+def test_run_walk_forward_naive_frame():
+    df = synthetic_candles(1200, seed=14, start="2025-01-02", tz=None)
+    grid = {"range_window": [20, 30]}
+
+    result = ParameterOptimizer("wyckoff", grid, splits=2, workers=1, rr_min=1.5).run({"AAA": df})
+
+    for r in result["results"]:
+        assert "errors" not in r
+        assert sum(f["trades"] for f in r["folds"]) == r["summary"]["trades"]
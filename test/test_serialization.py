@@ -0,0 +1,55 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+
+import numpy as np
+import pandas as pd
+from src.utils.serialization import candle_payload, candles_to_columns, iso_times
+from src.api.responses import FastJSONResponse
+
+
+def make_candles(tz="Asia/Ho_Chi_Minh"):
+    time = pd.date_range("2024-01-02 09:15", periods=4, freq="1min", tz=tz)
+    return pd.DataFrame({
+        "time": time,
+        "open": [10.0, 10.1, np.nan, 10.3],
+        "high": [10.2, 10.3, 10.4, 10.5],
+        "low": [9.9, 10.0, 10.1, 10.2],
+        "close": [10.1, 10.2, 10.3, 10.4],
+        "volume": np.array([100, 200, 300, 400], dtype=np.int64),
+    })
+
+
+def test_iso_times_matches_isoformat():
+    for tz in (None, "UTC", "Asia/Ho_Chi_Minh"):
+        series = make_candles(tz)["time"]
+        assert iso_times(series) == [t.isoformat() for t in series]
+
+
+def test_iso_times_sub_second_and_nat():
+    series = pd.Series(pd.to_datetime(["2024-01-02 09:15:00.5", None]))
+    assert iso_times(series) == ["2024-01-02T09:15:00.500000", None]
+
+
+def test_columnar_payload():
+    df = make_candles()
+    columns = candles_to_columns(df)
+
+    assert list(columns) == ["time", "open", "high", "low", "close", "volume"]
+    assert columns["open"] == [10.0, 10.1, None, 10.3]
+    assert columns["volume"] == [100, 200, 300, 400]
+    assert columns["time"][0] == "2024-01-02T09:15:00+07:00"
+    assert candle_payload(df, "columnar") == {"columns": columns}
+
+
+def test_records_payload_unchanged():
+    df = make_candles().dropna()
+    assert candle_payload(df) == {"records": df.to_dict("records")}
+
+
+def test_fast_json_response_renders_pandas_values():
+    df = make_candles()
+    body = FastJSONResponse({"last": df["time"].iloc[-1], "volume": df["volume"].iloc[0]}).body
+    assert json.loads(body) == {"last": "2024-01-02T09:18:00+07:00", "volume": 100}
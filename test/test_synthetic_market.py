@@ -0,0 +1,37 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+from src.utils.synthetic_market import LOT_SIZE, round_to_tick, synthetic_candles, synthetic_ticks, tick_size
+
+
+def test_tick_size_bands():
+    assert list(tick_size([9.99, 10.0, 49.95, 50.0])) == [0.01, 0.05, 0.05, 0.1]
+    assert list(round_to_tick([9.996, 25.03, 61.06])) == [10.0, 25.05, 61.1]
+
+
+def test_ticks_follow_hose_shape():
+    ticks = synthetic_ticks(2000, seed=1)
+    assert ticks.equals(synthetic_ticks(2000, seed=1))
+    assert len(ticks) == 2002
+    assert np.allclose(ticks["price"], round_to_tick(ticks["price"]))
+    assert (ticks["volume"] % LOT_SIZE == 0).all()
+    assert ticks["time"].is_monotonic_increasing
+
+    clock = ticks["time"].dt.strftime("%H:%M")
+    assert (ticks["match_type"].iloc[[0, -1]] == ["ATO", "ATC"]).all()
+    assert clock.iloc[0] == "09:15" and clock.iloc[-1] == "14:45"
+    # Nghỉ trưa không có tick
+    assert not clock.between("11:30", "12:59").any()
+
+
+def test_candles_skip_lunch_and_roll_to_next_trading_day():
+    candles = synthetic_candles(300)
+    times = candles["time"]
+    assert times.is_monotonic_increasing
+    assert not times.dt.strftime("%H:%M").between("11:30", "12:59").any()
+    # 2025-12-15 là thứ Hai; 1 ngày có 225 phút khớp liên tục
+    assert times.dt.date.nunique() == 2
+    assert (candles["high"] >= candles[["open", "close"]].max(axis=1)).all()
+    assert (candles["low"] <= candles[["open", "close"]].min(axis=1)).all()
@@ -0,0 +1,73 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import time
+
+import pytest
+from src.config import Config
+from src.services.trade.trade_service import STUCK_SCANS, TradeService
+
+
+@pytest.fixture
+def service():
+    service = TradeService(stock_service=object(), engine=object(), builder=object())
+    yield service
+    service.shutdown()
+
+
+def test_scan_dedupes_symbols(service, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def generate_signal(symbol, *args, **kwargs):
+        with lock:
+            calls.append(symbol)
+        return {"status": "no_setup", "reason": "test"}
+
+    monkeypatch.setattr(service, "generate_signal", generate_signal)
+    result = service.scan_signals(["FPT", "VNM", "FPT"], "smc")
+
+    assert sorted(calls) == ["FPT", "VNM"]
+    assert result["total_scanned"] == 2
+    assert [item["symbol"] for item in result["no_setup"]] == ["FPT", "VNM"]
+
+
+def test_scan_explicit_zero_timeout_is_respected(service, monkeypatch):
+    def generate_signal(symbol, *args, **kwargs):
+        time.sleep(0.3)
+        return {"status": "no_setup"}
+
+    monkeypatch.setattr(service, "generate_signal", generate_signal)
+    result = service.scan_signals(["FPT"], "smc", total_timeout=0)
+
+    assert result["partial"] is True
+    assert result["timeouts"][0]["symbol"] == "FPT"
+    assert result["elapsed_ms"] < 250
+
+
+def test_second_scan_completes_after_stuck_workers(service, monkeypatch):
+    monkeypatch.setattr(Config, "SCAN_MAX_WORKERS", 2)
+    monkeypatch.setattr(Config, "SCAN_MAX_STUCK", 0)
+    release = threading.Event()
+
+    def hang(symbol, *args, **kwargs):
+        release.wait(5)
+        return {"status": "no_setup"}
+
+    monkeypatch.setattr(service, "generate_signal", hang)
+    first = service.scan_signals(["FPT", "VNM"], "smc", symbol_timeout=0.1)
+    assert [item["symbol"] for item in first["timeouts"]] == ["FPT", "VNM"]
+    assert len(STUCK_SCANS) >= 2
+
+    # Cả 2 worker của pool cũ vẫn kẹt → scan sau chạy trên pool mới
+    monkeypatch.setattr(service, "generate_signal", lambda symbol, *a, **k: {"status": "no_setup"})
+    second = service.scan_signals(["HPG"], "smc", total_timeout=2)
+    assert second["partial"] is False and second["no_setup"][0]["symbol"] == "HPG"
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while STUCK_SCANS and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not STUCK_SCANS
@@ -0,0 +1,80 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import date, datetime
+
+from src.utils import trading_calendar
+from src.utils.market_time_utils import is_market_open
+from src.utils.trading_calendar import (
+    HOLIDAY_YEARS,
+    cache_ttl,
+    check_holiday_years,
+    closed_through,
+    count_trading_days,
+    is_trading_day,
+    load_holidays,
+    market_phase,
+    next_live_time,
+    previous_trading_day,
+    trading_span,
+)
+
+
+def test_weekends_and_holidays():
+    assert is_trading_day("2025-01-24")            # thứ 6
+    assert not is_trading_day("2025-01-25")        # thứ 7
+    assert not is_trading_day("2025-01-29")        # Tết
+    assert not is_trading_day("2025-09-02")        # Quốc khánh
+
+
+def test_trading_span_and_count():
+    # Tết Ất Tỵ: 27/01 – 31/01/2025
+    assert trading_span("2025-01-25", "2025-02-02") is None
+    assert trading_span("2025-01-25", "2025-02-05") == (date(2025, 2, 3), date(2025, 2, 5))
+    assert count_trading_days("2025-01-20", "2025-02-07") == 10
+
+
+def test_previous_trading_day():
+    assert previous_trading_day("2025-02-03") == date(2025, 1, 24)
+    assert previous_trading_day("2025-01-21") == date(2025, 1, 20)
+
+
+def test_market_phase_and_open():
+    assert market_phase(datetime(2025, 1, 24, 8, 59)) == "pre_open"
+    assert market_phase(datetime(2025, 1, 24, 9, 5)) == "ato"
+    assert market_phase(datetime(2025, 1, 24, 11, 30)) == "lunch_break"
+    assert market_phase(datetime(2025, 1, 24, 14, 40)) == "atc"
+    assert market_phase(datetime(2025, 1, 24, 14, 50)) == "put_through"
+    assert market_phase(datetime(2025, 1, 24, 15, 0)) == "closed"
+    assert market_phase(datetime(2025, 1, 25, 10, 0)) == "non_trading_day"
+
+    assert is_market_open(datetime(2025, 1, 24, 10, 0)) == (True, "")
+    assert is_market_open(datetime(2025, 1, 24, 12, 0))[0] is False
+    assert is_market_open(datetime(2025, 1, 29, 10, 0))[0] is False    # Tết
+
+
+def test_next_live_and_closed_through():
+    assert next_live_time(datetime(2025, 1, 24, 12, 0)) == datetime(2025, 1, 24, 13, 0)
+    assert next_live_time(datetime(2025, 1, 24, 15, 30)) == datetime(2025, 2, 3, 9, 0)
+    assert closed_through(datetime(2025, 1, 24, 10, 0)) == date(2025, 1, 23)
+    assert closed_through(datetime(2025, 1, 24, 15, 0)) == date(2025, 1, 24)
+
+
+def test_cache_ttl():
+    assert cache_ttl(2.0, datetime(2025, 1, 24, 10, 0)) == 2.0
+    assert cache_ttl(2.0, datetime(2025, 1, 24, 12, 59), max_ttl=300) == 60.0
+    assert cache_ttl(2.0, datetime(2025, 1, 25, 10, 0), max_ttl=300) == 300
+
+
+def test_holidays_file_and_missing_year_warning(tmp_path, monkeypatch):
+    path = tmp_path / "holidays.txt"
+    path.write_text("# lịch thử\n2030-01-01  # Tết Dương lịch\n\n2030-04-30\n", encoding="utf-8")
+    assert load_holidays(path) == ["2030-01-01", "2030-04-30"]
+    assert {2024, 2025, 2026} <= HOLIDAY_YEARS
+
+    monkeypatch.setattr(trading_calendar, "_warned_years", set())
+    assert check_holiday_years("2025-06-01", "2026-03-01") == []
+    assert check_holiday_years("2026-12-01", "2028-01-05") == [2027, 2028]
+    # Mỗi năm chỉ cảnh báo 1 lần
+    assert check_holiday_years("2028-02-01") == []
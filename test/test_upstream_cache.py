@@ -0,0 +1,86 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import time
+from src.providers.upstream_cache import UpstreamCache
+
+
+def test_hit_and_miss_counters():
+    cache = UpstreamCache("test", maxsize=4, ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return "ticks"
+
+    assert cache.get_or_load("FPT", loader) == "ticks"
+    assert cache.get_or_load("FPT", loader) == "ticks"
+    assert len(calls) == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ttl_expiry():
+    cache = UpstreamCache("test", maxsize=4, ttl=0.05)
+    cache.put("FPT", 1)
+    assert cache.get("FPT") == 1
+    time.sleep(0.1)
+    assert cache.get("FPT") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction():
+    cache = UpstreamCache("test", maxsize=2, ttl=60)
+    cache.put("A", 1)
+    cache.put("B", 2)
+    cache.get("A")          # B thành least recently used
+    cache.put("C", 3)
+
+    assert cache.get("B") is None
+    assert cache.get("A") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_accept_rejects_smaller_entry():
+    cache = UpstreamCache("test", maxsize=4, ttl=60)
+    cache.put("FPT", (100, "small"))
+    value = cache.get_or_load(
+        "FPT", lambda: (1000, "big"), accept=lambda entry: entry[0] >= 1000
+    )
+    assert value == (1000, "big")
+
+
+def test_single_flight():
+    cache = UpstreamCache("test", maxsize=4, ttl=60)
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(1)
+        return "ticks"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("FPT", loader)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["ticks"] * 8
+
+
+def test_none_is_not_cached():
+    cache = UpstreamCache("test", maxsize=4, ttl=60)
+    assert cache.get_or_load("FPT", lambda: None) is None
+    assert cache.get_or_load("FPT", lambda: "ticks") == "ticks"
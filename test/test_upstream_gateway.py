@@ -0,0 +1,167 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+import requests
+from src.config import Config
+from src.providers.async_provider import retry_async
+from src.providers.upstream_gateway import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimitTimeout,
+    TokenBucket,
+    UpstreamGateway,
+    install_http_timeout,
+)
+from src.utils.safe_path import InvalidInputError
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=50, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    start = time.monotonic()
+    wait = bucket.acquire()
+    assert wait > 0
+    assert time.monotonic() - start >= wait * 0.9
+
+
+def test_token_bucket_timeout():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.1)
+    assert bucket.stats()["rejected"] == 1
+
+
+def test_breaker_opens_then_half_open_probe():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.before()
+        breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+    time.sleep(0.06)
+    breaker.before()                    # probe
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before()                # chỉ 1 probe
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_gateway_fails_fast_and_skips_retry():
+    gw = UpstreamGateway("test", rate=0, burst=1, failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    # 2 lỗi → breaker mở, lần retry kế tiếp fail fast và dừng chuỗi retry
+    with pytest.raises(CircuitOpenError):
+        gw.retry(flaky, retries=5)
+    assert len(calls) == 2
+    with pytest.raises(CircuitOpenError):
+        gw.call(flaky)
+    assert len(calls) == 2
+    assert gw.stats()["breaker"]["state"] == "open"
+
+
+def test_gateway_success_resets_failures():
+    gw = UpstreamGateway("test", rate=0, burst=1, failure_threshold=2, reset_timeout=60)
+    with pytest.raises(ConnectionError):
+        gw.call(lambda: (_ for _ in ()).throw(ConnectionError("x")))
+    assert gw.stats()["breaker"]["failures"] == 1
+    assert gw.call(lambda: 42) == 42
+    assert gw.stats()["breaker"]["failures"] == 0
+
+
+def test_bad_input_errors_leave_breaker_closed():
+    gw = UpstreamGateway("test", rate=0, burst=1, failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    def lookup(error):
+        calls.append(1)
+        raise error
+
+    not_found = requests.HTTPError("404", response=requests.Response())
+    not_found.response.status_code = 404
+    for error in (InvalidInputError("symbol"), not_found, InvalidInputError("interval")):
+        with pytest.raises(type(error)):
+            gw.retry(lookup, error, retries=3)
+    # Không retry, không tính vào breaker
+    assert len(calls) == 3
+    breaker = gw.stats()["breaker"]
+    assert breaker["state"] == "closed" and breaker["failures"] == 0
+
+    with pytest.raises(TimeoutError):
+        gw.retry(lookup, TimeoutError("slow"), retries=0)
+    assert gw.stats()["breaker"]["failures"] == 1
+
+
+def test_broken_payload_opens_breaker():
+    """Upstream trả trang HTML lỗi → JSON decode ValueError vẫn là lỗi upstream"""
+    gw = UpstreamGateway("test", rate=0, burst=1, failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return json.loads("<html>502 Bad Gateway</html>")
+
+    with pytest.raises(CircuitOpenError):
+        gw.retry(fetch, retries=3)
+    assert len(calls) == 2
+    assert gw.stats()["breaker"]["state"] == "open"
+
+
+
+def test_sync_and_async_retry_share_policy(monkeypatch):
+    """gateway.retry và retry_async cùng số lần thử (UPSTREAM_RETRY) và cùng điều kiện dừng"""
+    monkeypatch.setattr(Config, "UPSTREAM_RETRY", 3)
+    monkeypatch.setattr(Config, "UPSTREAM_RETRY_BASE_DELAY", 0)
+    gw = UpstreamGateway("test", rate=0, burst=1, failure_threshold=100, reset_timeout=60)
+    calls = {"sync": 0, "async": 0}
+
+    def flaky(mode, error):
+        calls[mode] += 1
+        raise error
+
+    with pytest.raises(ConnectionError):
+        gw.retry(flaky, "sync", ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        asyncio.run(retry_async(gw.call, flaky, "async", ConnectionError("down")))
+    assert calls == {"sync": 4, "async": 4}
+
+    with pytest.raises(InvalidInputError):
+        gw.retry(flaky, "sync", InvalidInputError("symbol"))
+    with pytest.raises(InvalidInputError):
+        asyncio.run(retry_async(gw.call, flaky, "async", InvalidInputError("symbol")))
+    assert calls == {"sync": 5, "async": 5}
+
+def test_http_timeout_frees_hung_request():
+    """Upstream nhận kết nối nhưng không trả lời → requests timeout thay vì treo thread"""
+    server = socket.create_server(("127.0.0.1", 0))
+    accepted = []
+    threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+    url = f"http://127.0.0.1:{server.getsockname()[1]}/"
+    try:
+        install_http_timeout(0.2)
+        start = time.monotonic()
+        with pytest.raises(requests.Timeout):
+            requests.get(url)
+        assert time.monotonic() - start < 2
+    finally:
+        install_http_timeout(Config.UPSTREAM_HTTP_TIMEOUT)
+        for conn, _ in accepted:
+            conn.close()
+        server.close()